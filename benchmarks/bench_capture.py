@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Benchmark de las capturas binarias de tramas
+Mide las tramas por segundo del CaptureWriter (directo y a través de un master
+TCP real) y la búsqueda por tiempo y dispositivo del CaptureReader.
+"""
+
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import timeit
+
+# Permitir ejecutar el script directamente desde la raíz del repositorio
+root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if root not in sys.path:
+    sys.path.insert(0, root)
+
+from src.protocols.modbus.capture import CaptureReader, CaptureWriter
+from src.protocols.modbus.master_tcp import ModbusMasterTCP
+from src.protocols.modbus.slave_tcp import ModbusSlaveTCP
+
+
+def make_frames(count, devices, seed=4):
+    """Tramas MBAP de tamaños variados repartidas entre dispositivos"""
+    rng = random.Random(seed)
+    frames = []
+    for _ in range(count):
+        size = rng.choice((12, 12, 12, 259))
+        frames.append((rng.randrange(devices), rng.choice(('ENVIADO', 'RECIBIDO')), rng.randbytes(size)))
+    return frames
+
+
+def cross_check(directory, count=50000, devices=6):
+    """Escribir, reabrir (con y sin índice guardado, y anexando) y comparar"""
+    path = os.path.join(directory, 'check.cap')
+    frames = make_frames(count, devices)
+    names = [f"10.0.0.{i}:502" for i in range(devices)]
+    stamps = []
+    with CaptureWriter(path, chunk_size=1 << 20) as writer:
+        for device, direction, data in frames[:count // 2]:
+            stamps.append(time.monotonic_ns())
+            writer.write(names[device], direction, data, timestamp_ns=stamps[-1])
+    with CaptureWriter(path, chunk_size=1 << 20) as writer:  # Anexar a la captura existente
+        for device, direction, data in frames[count // 2:]:
+            stamps.append(time.monotonic_ns())
+            writer.write(names[device], direction, data, timestamp_ns=stamps[-1])
+
+    failures = 0
+    for attempt in ('índice guardado', 'índice reconstruido'):
+        if attempt == 'índice reconstruido':
+            os.remove(path + '.idx')
+        with CaptureReader(path) as reader:
+            records = list(reader)
+            expected = [(names[d], direction, data) for d, direction, data in frames]
+            if [(r.device, r.direction, r.data) for r in records] != expected or len(reader) != count:
+                failures += 1
+            # Búsqueda por tiempo y dispositivo contra un filtrado lineal
+            start, end = stamps[count // 3] / 1e9, stamps[2 * count // 3] / 1e9
+            wanted = [(names[d], direction, data) for (d, direction, data), stamp in zip(frames, stamps)
+                      if start * 1e9 <= stamp < end * 1e9 and d == 2 and direction == 'RECIBIDO']
+            found = [(r.device, r.direction, r.data)
+                     for r in reader.read(start, end, device=names[2], direction='RECIBIDO')]
+            if found != wanted:
+                failures += 1
+    print(f"Verificación cruzada: {count} tramas, {failures} diferencias")
+    return failures == 0
+
+
+def bench_writer(directory, count=200000):
+    """Tramas por segundo escritas directamente en la captura"""
+    path = os.path.join(directory, 'bench.cap')
+    frames = make_frames(count, 50)
+    with CaptureWriter(path, append=False) as writer:
+        ids = [writer.device_id(f"unidad {i}") for i in range(50)]
+        started = time.perf_counter()
+        for device, direction, data in frames:
+            writer.write(ids[device], direction, data)
+        elapsed = time.perf_counter() - started
+    size = os.path.getsize(path)
+    print(f"CaptureWriter: {count / elapsed:,.0f} tramas/s, {size / count:.1f} bytes/trama")
+    return path
+
+
+def bench_reader(path):
+    """Apertura y búsquedas sobre la captura del benchmark de escritura"""
+    started = time.perf_counter()
+    reader = CaptureReader(path)
+    opened = time.perf_counter() - started
+    first, last = reader.time_range()
+    middle = (first + last) / 2
+    seek = timeit.timeit(lambda: next(reader.read(start=middle)), number=200) / 200
+    device = timeit.timeit(lambda: sum(1 for _ in reader.read(device="unidad 7")), number=3) / 3
+    total = timeit.timeit(lambda: sum(1 for _ in reader), number=1)
+    print(f"CaptureReader: apertura {opened * 1e3:.1f}ms, búsqueda por tiempo {seek * 1e6:.0f}us, "
+          f"un dispositivo {device * 1e3:.0f}ms, recorrido completo {total * 1e3:.0f}ms ({len(reader)} tramas)")
+    reader.close()
+
+
+def bench_master(directory, requests=5000):
+    """Peticiones FC03 por segundo de un master TCP con y sin captura"""
+    slave = ModbusSlaveTCP(port=15390)
+    threading.Thread(target=slave.start, daemon=True).start()
+    time.sleep(0.3)
+    master = ModbusMasterTCP(port=15390)
+    master.connect()
+    results = []
+    with CaptureWriter(os.path.join(directory, 'master.cap'), append=False) as writer:
+        for capture in (None, writer):
+            master.set_capture(capture)
+            started = time.perf_counter()
+            for _ in range(requests):
+                master.read_holding_registers(0, 10)
+            results.append(requests / (time.perf_counter() - started))
+        frames = writer.frames
+    master.set_capture(None)
+    master.disconnect()
+    slave.stop()
+    print(f"Master TCP FC03: sin captura {results[0]:,.0f} req/s, con captura {results[1]:,.0f} req/s "
+          f"({frames} tramas grabadas)")
+
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as directory:
+        ok = cross_check(directory)
+        path = bench_writer(directory)
+        bench_reader(path)
+        bench_master(directory)
+    sys.exit(0 if ok else 1)
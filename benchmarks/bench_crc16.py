@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Benchmark y verificación cruzada del CRC16 Modbus
+Compara la tabla (y la vía en C si está disponible) con el cálculo bit a bit
+original de ModbusMasterRTU/ModbusSlaveRTU sobre tramas aleatorias.
+"""
+
+import os
+import random
+import sys
+import timeit
+
+# Permitir ejecutar el script directamente desde la raíz del repositorio
+root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if root not in sys.path:
+    sys.path.insert(0, root)
+
+from src.protocols.modbus import crc16 as crc_module
+
+
+def crc16_bitwise(data):
+    """Implementación bit a bit previa, como referencia"""
+    crc = 0xFFFF
+    for byte in data:
+        crc ^= byte
+        for _ in range(8):
+            if crc & 0x0001:
+                crc = (crc >> 1) ^ 0xA001
+            else:
+                crc = crc >> 1
+    return crc & 0xFFFF
+
+
+def cross_check(samples=5000, seed=7):
+    """Verificar que todas las variantes coinciden con la referencia"""
+    rng = random.Random(seed)
+    implementations = {'tabla': crc_module._crc16_table, 'crc16': crc_module.crc16}
+    failures = 0
+    for _ in range(samples):
+        frame = rng.randbytes(rng.randint(0, 256))
+        expected = crc16_bitwise(frame)
+        for name, function in implementations.items():
+            if function(frame) != expected:
+                failures += 1
+                print(f"Diferencia en {name}: {frame.hex()}")
+        # Cálculo incremental en dos partes
+        cut = rng.randint(0, len(frame))
+        if crc_module.crc16(frame[cut:], crc_module.crc16(frame[:cut])) != expected:
+            failures += 1
+            print(f"Diferencia incremental: {frame.hex()}")
+    # Vector conocido: 01 03 00 00 00 0A -> C5 CD
+    if crc_module.crc16_bytes(bytes.fromhex('01030000000a')) != bytes.fromhex('c5cd'):
+        failures += 1
+    print(f"Verificación cruzada: {samples} tramas, {failures} diferencias")
+    return failures == 0
+
+
+def bench(sizes=(8, 64, 256), number=2000):
+    """Microsegundos por trama de cada implementación"""
+    print(f"Vía en C disponible: {crc_module.HAS_C_CRC}")
+    print(f"{'bytes':>6} {'bit a bit':>12} {'tabla':>12} {'crc16':>12}")
+    for size in sizes:
+        frame = bytes(range(256))[:size]
+        results = []
+        for function in (crc16_bitwise, crc_module._crc16_table, crc_module.crc16):
+            seconds = timeit.timeit(lambda: function(frame), number=number)
+            results.append(seconds / number * 1e6)
+        print(f"{size:>6} {results[0]:>10.2f}us {results[1]:>10.2f}us {results[2]:>10.2f}us")
+
+
+if __name__ == "__main__":
+    ok = cross_check()
+    bench()
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Benchmark del monitor de datos (modelo/vista)
+Mide cuánto tarda un refresco de RegisterTableModel con 5000 registros en una
+QTableView visible, según la fracción de valores que cambió. Usa la plataforma
+offscreen de Qt, así que no necesita pantalla.
+"""
+
+import os
+import random
+import sys
+import time
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+# Permitir ejecutar el script directamente desde la raíz del repositorio
+root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if root not in sys.path:
+    sys.path.insert(0, root)
+
+from PySide6.QtWidgets import QApplication, QTableView
+
+# Importar el módulo directamente: src.gui carga la GUI completa y la base de plantillas
+sys.path.insert(0, os.path.join(root, 'src', 'gui', 'panels'))
+from register_table_model import RegisterTableModel
+
+
+def main(registers=5000, refreshes=20):
+    app = QApplication.instance() or QApplication(sys.argv)
+    model = RegisterTableModel()
+    model.set_rows({'key': i, 'address': i} for i in range(registers))
+    view = QTableView()
+    view.setModel(model)
+    view.resize(600, 800)
+    view.show()
+
+    rng = random.Random(5)
+    values = {i: rng.randrange(65536) for i in range(registers)}
+    model.update_values(values)
+    app.processEvents()
+
+    print(f"{registers} registros, QTableView visible")
+    for fraction in (0.0, 0.01, 0.05, 0.25, 1.0):
+        elapsed = 0.0
+        for _ in range(refreshes):
+            for key in rng.sample(range(registers), int(registers * fraction)):
+                values[key] = rng.randrange(65536)
+            started = time.perf_counter()
+            model.update_values(values)
+            app.processEvents()
+            elapsed += time.perf_counter() - started
+        print(f"  {fraction:>5.0%} de valores cambiados: {elapsed / refreshes * 1e3:6.2f}ms por refresco")
+
+
+if __name__ == "__main__":
+    main()
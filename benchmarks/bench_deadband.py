@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Benchmark del reporte por excepción
+Compara el filtrado de una lectura de 2000 valores de ingeniería contra su
+deadband con un bucle Python por valor y con ChangeFilter (NumPy), y cuenta
+cuántos valores llegan a la GUI con y sin filtro.
+"""
+
+import os
+import sys
+import timeit
+
+import numpy as np
+
+# Permitir ejecutar el script directamente desde la raíz del repositorio
+root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if root not in sys.path:
+    sys.path.insert(0, root)
+
+from src.core.deadband import ChangeFilter, Deadband
+
+
+def make_readings(count, cycles, seed=3):
+    """Señales casi constantes con ruido pequeño y algunos saltos"""
+    rng = np.random.default_rng(seed)
+    base = rng.uniform(0, 100, count)
+    noise = rng.normal(0, 0.05, (cycles, count))
+    steps = (rng.random((cycles, count)) < 0.01) * rng.uniform(-20, 20, (cycles, count))
+    return base + noise + np.cumsum(steps, axis=0)
+
+
+class PythonFilter:
+    """Referencia: el mismo criterio con un bucle por valor"""
+
+    def __init__(self, keys, deadbands, spans):
+        self.keys = keys
+        self.deadbands = deadbands
+        self.spans = spans
+        self.last = {}
+
+    def select(self, values):
+        reported = {}
+        for key, value, band, span in zip(self.keys, values, self.deadbands, self.spans):
+            last = self.last.get(key)
+            threshold = max(band.absolute, band.percent / 100.0 * (span if span is not None else abs(last or 0)))
+            if last is None or abs(value - last) > threshold:
+                self.last[key] = value
+                reported[key] = value
+        return reported
+
+
+def main(count=2000, cycles=300):
+    keys = [f"P{i:04d}" for i in range(count)]
+    deadbands = [Deadband(0.2) if i % 2 else Deadband(percent=0.5) for i in range(count)]
+    spans = [100.0 if i % 4 == 0 else None for i in range(count)]
+    readings = make_readings(count, cycles)
+    valid = np.ones(count, dtype=bool)
+
+    vectorized = ChangeFilter(keys, deadbands, spans)
+    python = PythonFilter(keys, deadbands, spans)
+    failures = 0
+    reported = 0
+    for values in readings:
+        expected = python.select(values.tolist())
+        got = vectorized.select(values, valid)
+        failures += expected != got
+        reported += len(got)
+    print(f"Verificación cruzada: {cycles} lecturas, {failures} diferencias")
+    print(f"Valores entregados: {reported} de {count * cycles} ({reported / (count * cycles):.1%})")
+
+    values = readings[-1].tolist()
+    vector = readings[-1]
+    python_time = min(timeit.repeat(lambda: python.select(values), number=50, repeat=3)) / 50
+    numpy_time = min(timeit.repeat(lambda: vectorized.select(vector, valid), number=50, repeat=3)) / 50
+    print(f"Filtrar {count} valores: Python {python_time * 1e6:.0f}us, ChangeFilter {numpy_time * 1e6:.0f}us")
+    return failures == 0
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Benchmark del histórico SQLite
+Mide el costo de record_batch() en el hilo que sondea, las muestras por segundo
+que confirma el hilo escritor y la memoria de una exportación CSV por bloques.
+"""
+
+import os
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+
+# Permitir ejecutar el script directamente desde la raíz del repositorio
+root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if root not in sys.path:
+    sys.path.insert(0, root)
+
+from src.core.historian import Historian
+
+
+def make_batches(pollers, tags, cycles, start=1_700_000_000.0, period=0.1):
+    """Lotes como los de results_ready: un lote por ciclo con todos los tags de un dispositivo"""
+    batches = [[] for _ in range(pollers)]
+    for cycle in range(cycles):
+        timestamp = start + cycle * period
+        for poller in range(pollers):
+            batches[poller].append([(f"vfd{poller}", f"P{tag:03d}", float(cycle + tag), timestamp)
+                                    for tag in range(tags)])
+    return batches
+
+
+def cross_check(directory):
+    """Valores consultados y exportados iguales a los grabados, también tras reabrir"""
+    path = os.path.join(directory, 'check.db')
+    batches = make_batches(2, 20, 50)
+    with Historian(path) as historian:
+        for poller in batches:
+            for batch in poller[:25]:
+                historian.record_batch(batch)
+    with Historian(path) as historian:  # Reabrir: los IDs de tags deben conservarse
+        for poller in batches:
+            for batch in poller[25:]:
+                historian.record_batch(batch)
+        historian.flush()
+        failures = 0
+        series = historian.query("vfd1", "P007")
+        if series != [(1_700_000_000.0 + c * 0.1, float(c + 7)) for c in range(50)]:
+            failures += 1
+        if historian.get_statistics()['tags'] != 40:
+            failures += 1
+        rows = historian.export_csv(os.path.join(directory, 'check.csv'), chunk_size=333)
+        if rows != 2 * 20 * 50:
+            failures += 1
+    print(f"Verificación cruzada: {failures} diferencias")
+    return failures == 0
+
+
+def bench_write(directory, pollers=4, tags=250, cycles=200):
+    """Polling simulado: varios hilos entregan lotes y el escritor los confirma"""
+    path = os.path.join(directory, 'bench.db')
+    batches = make_batches(pollers, tags, cycles)
+    total = pollers * tags * cycles
+    historian = Historian(path)
+    caller = [0.0] * pollers
+
+    def poll(index):
+        for batch in batches[index]:
+            started = time.perf_counter()
+            historian.record_batch(batch)
+            caller[index] += time.perf_counter() - started
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=poll, args=(i,)) for i in range(pollers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    enqueued = time.perf_counter() - started
+    historian.flush(timeout=120.0)
+    elapsed = time.perf_counter() - started
+    stats = historian.get_statistics()
+    historian.close()
+    per_batch = sum(caller) / (pollers * cycles) * 1e6
+    print(f"Escritura: {total} muestras, {total / elapsed:,.0f} muestras/s confirmadas "
+          f"({stats['commits']} commits, {stats['dropped']} descartadas)")
+    print(f"  record_batch() de {tags} valores: {per_batch:.0f}us en el hilo que sondea; "
+          f"todo encolado en {enqueued:.2f}s")
+    return path, total / elapsed
+
+
+def bench_export(directory, path):
+    """Memoria pico de exportar todo el histórico a CSV por bloques"""
+    historian = Historian(path)
+    tracemalloc.start()
+    started = time.perf_counter()
+    rows = historian.export_csv(os.path.join(directory, 'bench.csv'), chunk_size=20000)
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    historian.close()
+    print(f"Exportación CSV: {rows} filas en {elapsed:.2f}s, memoria pico {peak / 2**20:.1f} MiB")
+
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as directory:
+        ok = cross_check(directory)
+        path, rate = bench_write(directory)
+        bench_export(directory, path)
+    sys.exit(0 if ok and rate >= 50000 else 1)
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Benchmark del almacén de logs
+Llena un LogStore con 1.000.000 de entradas (más que su capacidad, para que el
+anillo descarte) y compara las consultas filtradas por nivel, dispositivo y
+origen contra un recorrido lineal de todas las entradas.
+"""
+
+import os
+import random
+import sys
+import time
+
+# Permitir ejecutar el script directamente desde la raíz del repositorio
+root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if root not in sys.path:
+    sys.path.insert(0, root)
+
+from src.core.log_store import LogStore, parse_level
+
+LEVEL_WEIGHTS = (('DEBUG', 60), ('INFO', 35), ('WARNING', 4), ('ERROR', 1))
+
+
+def make_entries(count, devices=50, seed=7):
+    """Tráfico típico: casi todo DEBUG/INFO, pocos errores, muchos dispositivos"""
+    rng = random.Random(seed)
+    names, weights = zip(*LEVEL_WEIGHTS)
+    levels = rng.choices(names, weights, k=count)
+    sources = ('Master', 'Slave', 'poll', 'connection')
+    return [(level, f"mensaje {i}", sources[i % len(sources)],
+             f"dev{rng.randrange(devices)}" if i % 3 else None, float(i))
+            for i, level in enumerate(levels)]
+
+
+def linear_query(store, min_level=None, device=None, source=None):
+    """Referencia: recorrer todas las entradas vigentes"""
+    level = parse_level(min_level) if min_level is not None else None
+    result = []
+    for entry in store.entries(range(store.oldest_seq, store.last_seq + 1)):
+        if level is not None and entry.level < level:
+            continue
+        if device is not None and entry.device != device:
+            continue
+        if source is not None and entry.source != source:
+            continue
+        result.append(entry.seq)
+    return result
+
+
+def cross_check(store, filters):
+    failures = 0
+    for kwargs in filters:
+        if list(store.query(**kwargs)) != linear_query(store, **kwargs):
+            failures += 1
+            print(f"  Diferencia en {kwargs}")
+    after = store.last_seq - 1000
+    tail = [seq for seq in linear_query(store, min_level='WARNING') if seq > after]
+    failures += list(store.query(min_level='WARNING', after=after)) != tail
+    return failures
+
+
+def timed(function, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main(capacity=1_000_000, extra=200_000):
+    entries = make_entries(capacity + extra)
+    store = LogStore(capacity)
+    start = time.perf_counter()
+    store.extend(entries)
+    elapsed = time.perf_counter() - start
+    print(f"Agregar {len(entries)} entradas: {elapsed:.2f}s ({len(entries) / elapsed:,.0f}/s), "
+          f"vigentes {len(store)}")
+
+    filters = [
+        {'min_level': 'ERROR'},
+        {'min_level': 'WARNING'},
+        {'device': 'dev7'},
+        {'source': 'connection'},
+        {'min_level': 'ERROR', 'device': 'dev7'},
+        {'min_level': 'INFO', 'source': 'Master'},
+    ]
+    failures = cross_check(store, filters)
+    print(f"Verificación cruzada: {len(filters) + 1} consultas, {failures} diferencias")
+
+    for kwargs in filters:
+        indexed, result = timed(lambda: store.query(**kwargs))
+        linear, _ = timed(lambda: linear_query(store, **kwargs), repeat=1)
+        print(f"{str(kwargs):45s} {len(result):>7} entradas: índice {indexed * 1e3:8.2f}ms, "
+              f"lineal {linear * 1e3:8.1f}ms ({linear / indexed:,.0f}x)")
+
+    # Refresco incremental como el de LogViewer: solo lo llegado desde el último
+    last = store.last_seq
+    store.extend(make_entries(500, seed=11))
+    incremental, result = timed(lambda: store.query(min_level='WARNING', after=last))
+    print(f"Consulta incremental (500 nuevas, WARNING+): {len(result)} entradas en {incremental * 1e6:.0f}us")
+    return failures == 0
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Benchmark del framer MBAP
+1) Flujo en memoria troceado al azar: verifica que no se pierde ninguna ADU.
+2) Loopback TCP con master en pipeline contra el slave: peticiones por segundo
+   y respuestas perdidas.
+"""
+
+import os
+import random
+import struct
+import sys
+import threading
+import time
+
+# Permitir ejecutar el script directamente desde la raíz del repositorio
+root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if root not in sys.path:
+    sys.path.insert(0, root)
+
+from src.protocols.modbus.mbap_framer import MBAPFramer
+from src.protocols.modbus.master_tcp import ModbusMasterTCP
+from src.protocols.modbus.slave_tcp import ModbusSlaveTCP
+
+
+def build_stream(count, seed=1234):
+    """Generar count ADUs de tamaño aleatorio concatenadas"""
+    rng = random.Random(seed)
+    adus = []
+    for tid in range(count):
+        pdu = bytes([3]) + rng.randbytes(rng.randint(1, 252))
+        adus.append(struct.pack('>HHHB', tid % 65536, 0, len(pdu) + 1, 1) + pdu)
+    return adus, b"".join(adus)
+
+
+def bench_split_stream(count=200000):
+    """Alimentar el framer con trozos de tamaño aleatorio (coalescencia y cortes)"""
+    adus, stream = build_stream(count)
+    rng = random.Random(99)
+    framer = MBAPFramer()
+    received = 0
+    mismatches = 0
+
+    start = time.perf_counter()
+    pos = 0
+    while pos < len(stream):
+        size = rng.randint(1, 1500)
+        framer.feed(stream[pos:pos + size])
+        pos += size
+        for adu in framer.frames():
+            if adu != adus[received]:
+                mismatches += 1
+            received += 1
+    elapsed = time.perf_counter() - start
+
+    print(f"Flujo troceado: {received}/{count} ADUs, {mismatches} distintas, "
+          f"{received / elapsed:,.0f} ADUs/s")
+    return received == count and mismatches == 0
+
+
+def bench_loopback(total=20000, depth=16, port=15502):
+    """Master en pipeline contra el slave por loopback"""
+    slave = ModbusSlaveTCP(port=port)
+    slave.set_log_callback(lambda message: None)
+    threading.Thread(target=slave.start, daemon=True).start()
+    time.sleep(0.3)
+
+    master = ModbusMasterTCP(port=port, max_in_flight=depth)
+    master.set_log_callback(lambda message: None)
+
+    requests = [
+        struct.pack('>HHHBBHH', master._get_next_transaction_id(), 0, 6, 1, 3, i % 100, 10)
+        for i in range(total)
+    ]
+
+    start = time.perf_counter()
+    responses = []
+    for i in range(0, total, 1000):
+        responses.extend(master.send_requests(requests[i:i + 1000]))
+    elapsed = time.perf_counter() - start
+
+    lost = sum(1 for response in responses if response is None)
+    print(f"Loopback (pipeline {depth}): {total - lost}/{total} respuestas, "
+          f"{total / elapsed:,.0f} peticiones/s")
+
+    master.disconnect()
+    slave.stop()
+    return lost == 0
+
+
+if __name__ == "__main__":
+    ok = bench_split_stream()
+    ok = bench_loopback() and ok
+    sys.exit(0 if ok else 1)
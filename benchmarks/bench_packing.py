@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Benchmark del empaquetado de bits (FC01/FC02/FC15)
+Compara los bucles bit a bit previos de masters y slaves con pack_bits,
+unpack_bits y BitBank sobre 2000 bits.
+"""
+
+import os
+import random
+import sys
+import timeit
+
+# Permitir ejecutar el script directamente desde la raíz del repositorio
+root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if root not in sys.path:
+    sys.path.insert(0, root)
+
+from src.protocols.modbus.packing import pack_bits, unpack_bits
+from src.protocols.modbus.register_bank import BitBank
+
+
+def pack_loop(values):
+    """Empaquetado previo (write_multiple_coils / handle_read_coils)"""
+    packed = bytearray((len(values) + 7) // 8)
+    for i, value in enumerate(values):
+        if value:
+            packed[i // 8] |= (1 << (i % 8))
+    return bytes(packed)
+
+
+def unpack_loop(data, count):
+    """Desempaquetado previo (read_coils / handle_write_multiple_coils)"""
+    values = []
+    for i in range(count):
+        byte_index = i // 8
+        if byte_index < len(data):
+            values.append(bool(data[byte_index] & (1 << (i % 8))))
+        else:
+            values.append(False)
+    return values
+
+
+def cross_check(samples=2000, seed=11):
+    """Verificar que las variantes en bloque coinciden con los bucles"""
+    rng = random.Random(seed)
+    bank = BitBank(10000)
+    reference = [False] * 10000
+    failures = 0
+    for _ in range(samples):
+        count = rng.randint(1, 2000)
+        values = [rng.random() < 0.5 for _ in range(count)]
+        packed = pack_loop(values)
+        if pack_bits(values) != packed or unpack_bits(packed, count) != values:
+            failures += 1
+        start = rng.randint(0, 10000 - count)
+        bank.write_bytes(start, packed, count)
+        reference[start:start + count] = values
+        if bank.read_bytes(start, count) != packed or bank[start:start + count] != values:
+            failures += 1
+    if bank.tolist() != reference:
+        failures += 1
+    print(f"Verificación cruzada: {samples} bloques, {failures} diferencias")
+    return failures == 0
+
+
+def bench(count=2000, number=2000):
+    """Microsegundos por operación sobre count bits"""
+    values = [random.random() < 0.5 for _ in range(count)]
+    packed = pack_loop(values)
+    bank = BitBank(10000)
+
+    cases = [
+        ("pack (FC15 master)", lambda: pack_loop(values), lambda: pack_bits(values)),
+        ("unpack (FC01 master)", lambda: unpack_loop(packed, count), lambda: unpack_bits(packed, count)),
+        ("slave FC01 lectura", lambda: pack_loop(reference_list[3:3 + count]),
+         lambda: bank.read_bytes(3, count)),
+        ("slave FC15 escritura", lambda: unpack_loop(packed, count), lambda: bank.write_bytes(3, packed, count)),
+    ]
+    print(f"{count} bits:")
+    for name, before, after in cases:
+        old = timeit.timeit(before, number=number) / number * 1e6
+        new = timeit.timeit(after, number=number) / number * 1e6
+        print(f"  {name:<22} bucle {old:>8.1f}us  bloque {new:>7.2f}us  x{old / new:.0f}")
+
+
+reference_list = [random.random() < 0.5 for _ in range(10000)]
+
+
+if __name__ == "__main__":
+    ok = cross_check()
+    bench()
+    sys.exit(0 if ok else 1)
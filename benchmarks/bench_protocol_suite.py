@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+"""
+Suite de benchmarks del protocolo Modbus sin hardware
+ModbusMasterTCP contra ModbusSlaveTCP por loopback, y ModbusMasterRTU contra
+ModbusSlaveRTU por un par de pseudo-terminales (os.openpty) unidos por un puente.
+Por cada función mide latencia p50/p99, peticiones por segundo, CPU del proceso
+por petición (master y slave corren en el mismo proceso) y memoria asignada con
+tracemalloc; en RTU la latencia incluye el silencio t3.5 entre tramas. Los
+resultados se comparan con una línea base en JSON para que las regresiones se vean.
+
+    python benchmarks/bench_protocol_suite.py                   # comparar con la línea base
+    python benchmarks/bench_protocol_suite.py --save-baseline   # registrar una nueva
+"""
+
+import argparse
+import json
+import os
+import platform
+import select
+import sys
+import threading
+import time
+import tracemalloc
+import tty
+
+# Permitir ejecutar el script directamente desde la raíz del repositorio
+root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if root not in sys.path:
+    sys.path.insert(0, root)
+
+from src.protocols.modbus.master_rtu import ModbusMasterRTU
+from src.protocols.modbus.master_tcp import ModbusMasterTCP
+from src.protocols.modbus.replay import percentile
+from src.protocols.modbus.slave_rtu import ModbusSlaveRTU
+from src.protocols.modbus.slave_tcp import ModbusSlaveTCP
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline_protocol.json')
+
+# Métricas comparadas con la línea base (más alto es peor)
+COMPARED = ('p50_us', 'p99_us', 'cpu_us', 'alloc_bytes')
+
+# (nombre, llamada al master, verificación del resultado) con los valores de prueba de los slaves
+CASES = [
+    ("FC01 x16", lambda m: m.read_coils(0, 16), lambda r: r[:4] == [True, False, True, False]),
+    ("FC02 x16", lambda m: m.read_discrete_inputs(0, 16), lambda r: r[:4] == [True, False, False, True]),
+    ("FC03 x10", lambda m: m.read_holding_registers(0, 10), lambda r: r[:2] == [1000, 1100]),
+    ("FC03 x125", lambda m: m.read_holding_registers(0, 125), lambda r: len(r) == 125 and r[0] == 1000),
+    ("FC04 x10", lambda m: m.read_input_registers(0, 10), lambda r: r[:2] == [100, 110]),
+    ("FC05", lambda m: m.write_single_coil(500, True), bool),
+    ("FC06", lambda m: m.write_single_register(500, 1234), bool),
+    ("FC15 x32", lambda m: m.write_multiple_coils(600, [True, False] * 16), bool),
+    ("FC16 x60", lambda m: m.write_multiple_registers(700, list(range(60))), bool),
+]
+
+
+# === TRANSPORTES ===
+
+class TCPLoopback:
+    """Slave TCP en un hilo y master conectado por 127.0.0.1"""
+
+    name = 'tcp'
+
+    def __init__(self, port=15392):
+        self.slave = ModbusSlaveTCP(port=port)
+        self.thread = threading.Thread(target=self.slave.start, daemon=True)
+        self.thread.start()
+        time.sleep(0.3)
+        self.master = ModbusMasterTCP(port=port)
+        self.master.connect()
+
+    def close(self):
+        self.master.disconnect()
+        self.slave.stop()
+        self.thread.join(timeout=2.0)
+
+
+class PtyBridge:
+    """
+    Dos pseudo-terminales unidos como un cable null-modem: lo que se escribe en
+    una se lee en la otra. Cada extremo tiene ruta (/dev/pts/N) y se abre con
+    pyserial como cualquier puerto serie.
+    """
+
+    def __init__(self):
+        self._ends = []
+        self.paths = []
+        for _ in range(2):
+            master_fd, slave_fd = os.openpty()
+            tty.setraw(slave_fd)
+            os.set_blocking(master_fd, False)
+            self._ends.append((master_fd, slave_fd))
+            self.paths.append(os.ttyname(slave_fd))
+        self._running = True
+        self._thread = threading.Thread(target=self._pump, name='pty-bridge', daemon=True)
+        self._thread.start()
+
+    def _pump(self):
+        a, b = self._ends[0][0], self._ends[1][0]
+        peer = {a: b, b: a}
+        while self._running:
+            readable, _, _ = select.select([a, b], [], [], 0.1)
+            for fd in readable:
+                try:
+                    data = os.read(fd, 4096)
+                except (BlockingIOError, OSError):
+                    continue
+                while data:
+                    try:
+                        data = data[os.write(peer[fd], data):]
+                    except BlockingIOError:
+                        select.select([], [peer[fd]], [], 0.1)
+
+    def close(self):
+        self._running = False
+        self._thread.join(timeout=1.0)
+        for master_fd, slave_fd in self._ends:
+            os.close(master_fd)
+            os.close(slave_fd)
+
+
+class RTUPty:
+    """Slave y master RTU en los dos extremos de un PtyBridge"""
+
+    name = 'rtu'
+
+    def __init__(self, baudrate=115200):
+        self.bridge = PtyBridge()
+        self.slave = ModbusSlaveRTU(self.bridge.paths[0], baudrate=baudrate)
+        self.slave.start()
+        self.master = ModbusMasterRTU(self.bridge.paths[1], baudrate=baudrate)
+        self.master.timeout = 1.0
+        self.master.connect()
+
+    def close(self):
+        self.master.disconnect()
+        # Dejar que el hilo del slave salga de su bucle antes de cerrar el puerto
+        self.slave.running = False
+        time.sleep(0.1)
+        self.slave.stop()
+        self.bridge.close()
+
+
+TRANSPORTS = {'tcp': TCPLoopback, 'rtu': RTUPty}
+
+
+# === MEDICIÓN ===
+
+def measure(master, call, check, requests, alloc_requests):
+    """Latencias, throughput, CPU y memoria de `requests` llamadas a una función"""
+    for _ in range(max(5, requests // 20)):  # Calentamiento
+        call(master)
+
+    latencies = []
+    errors = 0
+    clock = time.perf_counter
+    cpu_start = time.process_time()
+    wall_start = clock()
+    for _ in range(requests):
+        started = clock()
+        result = call(master)
+        latencies.append(clock() - started)
+        if not check(result):
+            errors += 1
+    wall = clock() - wall_start
+    cpu = time.process_time() - cpu_start
+
+    # tracemalloc ralentiza todo: pasada aparte y más corta
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    tracemalloc.reset_peak()
+    for _ in range(alloc_requests):
+        call(master)
+    after, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    latencies.sort()
+    return {
+        'p50_us': round(percentile(latencies, 0.50) * 1e6, 1),
+        'p99_us': round(percentile(latencies, 0.99) * 1e6, 1),
+        'rate': round(requests / wall, 1),
+        'cpu_us': round(cpu / requests * 1e6, 1),
+        # Pico de memoria viva durante la pasada, por encima de la inicial
+        'alloc_bytes': peak - before,
+        'retained_bytes': max(0, after - before),
+        'errors': errors,
+    }
+
+
+def run(transports, requests, rtu_requests):
+    results = {}
+    for name in transports:
+        transport = TRANSPORTS[name]()
+        count = requests if name == 'tcp' else rtu_requests
+        try:
+            results[name] = {label: measure(transport.master, call, check, count, max(20, count // 10))
+                             for label, call, check in CASES}
+        finally:
+            transport.close()
+    return results
+
+
+# === LÍNEA BASE ===
+
+def environment():
+    return {'python': platform.python_version(), 'machine': platform.machine(),
+            'system': platform.system(), 'cpus': os.cpu_count()}
+
+
+def compare(results, baseline, tolerance):
+    """Regresiones respecto de la línea base: (transporte, función, métrica, base, actual)"""
+    regressions = []
+    for transport, cases in results.items():
+        for label, metrics in cases.items():
+            reference = baseline.get('results', {}).get(transport, {}).get(label)
+            if not reference:
+                continue
+            for metric in COMPARED:
+                base, current = reference.get(metric), metrics[metric]
+                # Margen absoluto para que valores casi nulos no disparen alarmas
+                if base is not None and current > base * (1 + tolerance) + (64 if metric == 'alloc_bytes' else 5):
+                    regressions.append((transport, label, metric, base, current))
+    return regressions
+
+
+def report(results, baseline):
+    reference = baseline.get('results', {}) if baseline else {}
+    for transport, cases in results.items():
+        print(f"\n{transport.upper()}")
+        print(f"{'función':<11} {'p50 us':>9} {'p99 us':>9} {'req/s':>9} {'CPU us':>8} "
+              f"{'mem B':>8} {'errores':>8} {'p50 base':>9}")
+        for label, m in cases.items():
+            base = reference.get(transport, {}).get(label, {}).get('p50_us', '-')
+            print(f"{label:<11} {m['p50_us']:>9} {m['p99_us']:>9} {m['rate']:>9,.0f} {m['cpu_us']:>8} "
+                  f"{m['alloc_bytes']:>8} {m['errors']:>8} {base:>9}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks del protocolo Modbus (TCP loopback y RTU por pty)")
+    parser.add_argument('--transport', choices=('tcp', 'rtu', 'all'), default='all')
+    parser.add_argument('--requests', type=int, default=2000, help="peticiones por función en TCP")
+    parser.add_argument('--rtu-requests', type=int, default=200, help="peticiones por función en RTU")
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--save-baseline', action='store_true', help="guardar los resultados como línea base")
+    parser.add_argument('--tolerance', type=float, default=0.5,
+                        help="empeoramiento relativo admitido antes de marcar regresión")
+    args = parser.parse_args()
+
+    transports = ('tcp', 'rtu') if args.transport == 'all' else (args.transport,)
+    results = run(transports, args.requests, args.rtu_requests)
+
+    baseline = None
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+    report(results, baseline)
+
+    errors = sum(m['errors'] for cases in results.values() for m in cases.values())
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump({'environment': environment(), 'results': results}, f, indent=2, ensure_ascii=False)
+            f.write('\n')
+        print(f"\nLínea base guardada en {args.baseline}")
+        return 0 if not errors else 1
+
+    regressions = compare(results, baseline, args.tolerance) if baseline else []
+    if baseline and baseline.get('environment') != environment():
+        print(f"\nAviso: la línea base se registró en otro entorno ({baseline.get('environment')})")
+    for transport, label, metric, base, current in regressions:
+        print(f"REGRESIÓN {transport} {label} {metric}: {base} -> {current}")
+    print(f"\n{len(regressions)} regresiones, {errors} respuestas incorrectas")
+    return 0 if not regressions and not errors else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
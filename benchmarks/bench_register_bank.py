@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Benchmark de los bancos de registros de los slaves
+Compara la respuesta FC03 construida registro a registro desde una lista con
+el corte + byteswap de RegisterBank, y la memoria de ambos almacenamientos.
+"""
+
+import os
+import random
+import sys
+import timeit
+import tracemalloc
+
+# Permitir ejecutar el script directamente desde la raíz del repositorio
+root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if root not in sys.path:
+    sys.path.insert(0, root)
+
+from src.protocols.modbus.register_bank import RegisterBank
+from src.protocols.modbus.slave_tcp import ModbusSlaveTCP
+
+
+def read_list(registers, start, count):
+    """Construcción previa: to_bytes por registro sobre un bytearray creciente"""
+    response = bytearray()
+    for i in range(count):
+        response.extend(registers[start + i].to_bytes(2, byteorder='big'))
+    return bytes(response)
+
+
+def cross_check(samples=2000, seed=3):
+    """Verificar que el banco produce los mismos bytes que la lista"""
+    rng = random.Random(seed)
+    values = [rng.randrange(65536) for _ in range(10000)]
+    bank = RegisterBank(10000)
+    bank[0:10000] = values
+    failures = 0
+    for _ in range(samples):
+        count = rng.randint(1, 125)
+        start = rng.randint(0, 10000 - count)
+        payload = read_list(values, start, count)
+        if bank.read_bytes(start, count) != payload:
+            failures += 1
+        # Ida y vuelta por write_bytes (FC16)
+        bank.write_bytes(start, payload)
+        if bank[start:start + count] != values[start:start + count]:
+            failures += 1
+    print(f"Verificación cruzada: {samples} lecturas, {failures} diferencias")
+    return failures == 0
+
+
+def memory(size=10000):
+    """Bytes asignados por cada almacenamiento de size registros"""
+    results = []
+    for factory in (lambda: [random.randrange(65536) for _ in range(size)], lambda: RegisterBank(size)):
+        tracemalloc.start()
+        storage = factory()
+        current, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        results.append(current)
+        del storage
+    print(f"Memoria ({size} registros): lista {results[0] / 1024:.0f} KiB, RegisterBank {results[1] / 1024:.0f} KiB")
+
+
+def bench(counts=(1, 10, 125), number=20000):
+    """Microsegundos por respuesta FC03 completa del slave TCP"""
+    slave = ModbusSlaveTCP()
+    slave.set_log_callback(lambda message: None)
+    values = list(range(10000))
+
+    print(f"{'regs':>5} {'lista':>10} {'banco':>10} {'process_request':>16}")
+    for count in counts:
+        request = bytes.fromhex('000100000006010300000000')
+        request = request[:10] + count.to_bytes(2, 'big')
+        results = [
+            timeit.timeit(lambda: read_list(values, 0, count), number=number),
+            timeit.timeit(lambda: slave.holding_registers.read_bytes(0, count), number=number),
+            timeit.timeit(lambda: slave.process_request(request), number=number),
+        ]
+        print(f"{count:>5} " + " ".join(f"{seconds / number * 1e6:>8.2f}us" for seconds in results[:2])
+              + f" {results[2] / number * 1e6:>14.2f}us")
+
+
+if __name__ == "__main__":
+    ok = cross_check()
+    memory()
+    bench()
+    sys.exit(0 if ok else 1)
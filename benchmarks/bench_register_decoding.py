@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Benchmark de la decodificación de registros en los masters
+Compara el struct.unpack('>H') por registro previo de read_holding_registers /
+read_input_registers con las variantes en bloque, a 125 registros por respuesta.
+"""
+
+import os
+import random
+import struct
+import sys
+import timeit
+
+# Permitir ejecutar el script directamente desde la raíz del repositorio
+root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if root not in sys.path:
+    sys.path.insert(0, root)
+
+from src.protocols.modbus.packing import pack_registers, unpack_registers
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+_STRUCTS = {}
+
+
+def decode_loop(payload):
+    """Decodificación previa: un struct.unpack por registro sobre un corte nuevo"""
+    values = []
+    for i in range(len(payload) // 2):
+        values.append(struct.unpack('>H', payload[i*2:2 + i*2])[0])
+    return values
+
+
+def decode_struct(payload):
+    """struct.Struct precompilado por cantidad de registros"""
+    count = len(payload) // 2
+    decoder = _STRUCTS.get(count)
+    if decoder is None:
+        decoder = _STRUCTS[count] = struct.Struct(f'>{count}H')
+    return list(decoder.unpack_from(payload))
+
+
+def cross_check(samples=2000, seed=5):
+    """Verificar que todas las variantes coinciden con la decodificación previa"""
+    rng = random.Random(seed)
+    failures = 0
+    for _ in range(samples):
+        values = [rng.randrange(65536) for _ in range(rng.randint(0, 125))]
+        payload = struct.pack(f'>{len(values)}H', *values)
+        expected = decode_loop(payload)
+        if expected != values or pack_registers(values) != payload:
+            failures += 1
+        if unpack_registers(payload) != expected or list(unpack_registers(payload, as_array=True)) != expected:
+            failures += 1
+        if decode_struct(payload) != expected:
+            failures += 1
+    print(f"Verificación cruzada: {samples} respuestas, {failures} diferencias")
+    return failures == 0
+
+
+def bench(count=125, number=20000):
+    """Microsegundos por respuesta de count registros"""
+    payload = bytes(random.randrange(256) for _ in range(2 * count))
+    response = bytearray(9) + payload  # Como llega al master: MBAP + función + byte count
+
+    cases = [
+        ("struct por registro (previo)", lambda: decode_loop(payload)),
+        ("struct.Struct precompilado", lambda: decode_struct(payload)),
+        ("unpack_registers -> list", lambda: unpack_registers(response[9:])),
+        ("unpack_registers -> array", lambda: unpack_registers(response[9:], as_array=True)),
+    ]
+    if numpy is not None:
+        cases.append(("numpy.frombuffer('>u2')", lambda: numpy.frombuffer(response, dtype='>u2', offset=9)))
+
+    baseline = None
+    print(f"{count} registros por respuesta:")
+    for name, function in cases:
+        micros = min(timeit.repeat(function, number=number, repeat=5)) / number * 1e6
+        baseline = baseline or micros
+        print(f"  {name:<30} {micros:>8.2f}us  x{baseline / micros:.1f}")
+
+
+if __name__ == "__main__":
+    ok = cross_check()
+    bench()
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Benchmark de carga del slave Modbus TCP con varios clientes simultáneos
+Cada cliente es un ModbusMasterTCP en su propio hilo que lee holding registers
+en bucle; se reportan las peticiones por segundo totales por número de clientes.
+"""
+
+import os
+import sys
+import threading
+import time
+
+# Permitir ejecutar el script directamente desde la raíz del repositorio
+root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if root not in sys.path:
+    sys.path.insert(0, root)
+
+from src.protocols.modbus.master_tcp import ModbusMasterTCP
+from src.protocols.modbus.slave_tcp import ModbusSlaveTCP
+
+
+def run_clients(port, clients, duration):
+    """Lanzar `clients` masters en paralelo durante `duration` segundos"""
+    counts = [0] * clients
+    errors = [0] * clients
+    stop = threading.Event()
+    barrier = threading.Barrier(clients + 1)
+
+    def client_loop(index):
+        master = ModbusMasterTCP(port=port)
+        master.set_log_callback(lambda message: None)
+        master.connect()
+        barrier.wait()
+        while not stop.is_set():
+            values = master.read_holding_registers(0, 10)
+            if values and values[0] == 1000:
+                counts[index] += 1
+            else:
+                errors[index] += 1
+        master.disconnect()
+
+    threads = [threading.Thread(target=client_loop, args=(i,), daemon=True) for i in range(clients)]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    start = time.perf_counter()
+    time.sleep(duration)
+    stop.set()
+    elapsed = time.perf_counter() - start
+    for thread in threads:
+        thread.join()
+    return sum(counts) / elapsed, sum(errors)
+
+
+def main(port=15503, duration=2.0, client_counts=(1, 2, 4, 8, 16, 32)):
+    slave = ModbusSlaveTCP(port=port, max_clients=max(client_counts))
+    slave.set_log_callback(lambda message: None)
+    server = threading.Thread(target=slave.start, daemon=True)
+    server.start()
+    time.sleep(0.3)
+
+    print(f"{'clientes':>8} {'peticiones/s':>14} {'errores':>8}")
+    for clients in client_counts:
+        rate, errors = run_clients(port, clients, duration)
+        print(f"{clients:>8} {rate:>14,.0f} {errors:>8}")
+
+    slave.stop()
+    server.join(timeout=2.0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Benchmark de las trazas Modbus
+Compara el patrón previo _log(f"...") + log_callback con Tracer: nivel
+desactivado, evento guardado solo en el anillo, y entrega en segundo plano.
+"""
+
+import os
+import sys
+import timeit
+
+# Permitir ejecutar el script directamente desde la raíz del repositorio
+root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if root not in sys.path:
+    sys.path.insert(0, root)
+
+from src.protocols.modbus.slave_tcp import ModbusSlaveTCP
+from src.protocols.modbus.tracing import DEBUG, INFO, TraceHub, Tracer
+
+
+class EagerLogger:
+    """Patrón previo: el f-string se arma siempre y el callback recibe el texto"""
+
+    def __init__(self, callback):
+        self.log_callback = callback
+
+    def _log(self, message):
+        if self.log_callback:
+            self.log_callback(f"Master: {message}")
+        else:
+            print(f"Master: {message}")
+
+
+def cross_check():
+    """Verificar formato, anillo, niveles y entrega de tramas"""
+    hub = TraceHub(capacity=5)
+    hub.forward_to_logging = False
+    tracer = Tracer("Master", level=DEBUG, hub=hub)
+    received, frames = [], []
+    tracer.set_log_sink(received.append)
+    tracer.set_frame_sink(lambda direction, frame: frames.append((direction, frame)))
+
+    buffer = bytearray(b'\x01\x03')
+    tracer.debug("Datos: %s, código %02x", buffer, 0x83)
+    buffer[0] = 0xFF  # El texto diferido no debe ver cambios posteriores del buffer
+    tracer.frame("ENVIADO", b'\x00\x01')
+    tracer.set_level(INFO)
+    tracer.debug("no debe registrarse")
+    tracer.warning("Timeout esperando respuesta")
+    tracer.frame("RECIBIDO", b'\x00\x02')  # Sin DEBUG: solo al frame sink
+    for index in range(10):
+        tracer.info("evento %s", index)
+    hub.flush()
+    hub.stop()
+
+    failures = 0
+    if received[:3] != ["Master: Datos: 0103, código 83", "Master: ENVIADO: 0001",
+                        "Master: Timeout esperando respuesta"]:
+        failures += 1
+    if frames != [("ENVIADO", b'\x00\x01'), ("RECIBIDO", b'\x00\x02')]:
+        failures += 1
+    if [event.text for event in hub.recent()] != [f"Master: evento {i}" for i in range(5, 10)]:
+        failures += 1
+    if any("no debe" in text for text in received):
+        failures += 1
+    print(f"Verificación cruzada: {failures} diferencias")
+    return failures == 0
+
+
+def bench(number=200000):
+    """Nanosegundos por llamada de una traza típica de petición"""
+    values = list(range(125))
+    eager = EagerLogger(lambda message: None)
+
+    quiet_hub = TraceHub()
+    quiet_hub.forward_to_logging = False
+    disabled = Tracer("Master", level=INFO, hub=quiet_hub)
+    ring_only = Tracer("Master", level=DEBUG, hub=quiet_hub)
+
+    delivered_hub = TraceHub()
+    delivered = Tracer("Master", level=DEBUG, hub=delivered_hub)
+    delivered.set_log_sink(lambda message: None)
+
+    cases = [
+        ("_log(f-string) previo", lambda: eager._log(f"Valores leídos: {values}")),
+        ("Tracer, DEBUG desactivado", lambda: disabled.debug("Valores leídos: %s", values)),
+        ("Tracer, solo anillo", lambda: ring_only.debug("Valores leídos: %s", values)),
+        ("Tracer, entrega en fondo", lambda: delivered.debug("Valores leídos: %s", values)),
+        ("frame() desactivado", lambda: disabled.frame("ENVIADO", b'\x00\x01\x00\x00\x00\x06\x01\x03')),
+    ]
+    print("Traza 'Valores leídos' con 125 registros (hilo que llama):")
+    for name, function in cases:
+        nanos = min(timeit.repeat(function, number=number, repeat=3)) / number * 1e9
+        print(f"  {name:<28} {nanos:>8.0f}ns")
+    delivered_hub.flush(timeout=30.0)
+    delivered_hub.stop()
+
+
+def bench_slave(number=20000):
+    """Microsegundos por petición FC03 de 125 registros en el slave TCP"""
+    request = bytes.fromhex('00010000000601030000007d')
+    slave = ModbusSlaveTCP()
+    slave._trace.hub.forward_to_logging = False
+    for level in ('DEBUG', 'INFO'):
+        slave.set_trace_level(level)
+        micros = min(timeit.repeat(lambda: slave.process_request(request), number=number, repeat=3)) / number * 1e6
+        print(f"  slave FC03 con nivel {level:<7} {micros:>6.2f}us")
+
+
+if __name__ == "__main__":
+    ok = cross_check()
+    bench()
+    bench_slave()
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Benchmark del codec de valores de ingeniería
+Compara la conversión valor a valor en Python (demultiplex + struct + escala +
+límites) con CompiledCodec sobre los planes de lectura de cientos de variadores.
+"""
+
+import os
+import random
+import struct
+import sys
+import timeit
+
+# Permitir ejecutar el script directamente desde la raíz del repositorio
+root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if root not in sys.path:
+    sys.path.insert(0, root)
+
+from src.core.value_codec import ValueSpec, compile_codec
+from src.protocols.modbus.read_planner import plan_reads
+
+_FORMATS = {'uint16': '>H', 'int16': '>h', 'uint32': '>I', 'int32': '>i', 'float32': '>f'}
+
+
+def make_parameters(count=60, seed=7):
+    """Parámetros de un variador con tipos, escalas y rangos variados"""
+    rng = random.Random(seed)
+    specs, items, address = [], [], 0
+    for index in range(count):
+        data_type = rng.choice(('uint16', 'uint16', 'int16', 'int32', 'float32'))
+        word_order = rng.choice(('big', 'little'))
+        bounded = rng.random() < 0.5
+        spec = ValueSpec(f"p{index}", data_type, rng.choice((1.0, 0.1, 0.01)),
+                         -1000.0 if bounded else None, 1000.0 if bounded else None, word_order)
+        specs.append(spec)
+        items.append((spec.key, address, spec.size))
+        address += spec.size + rng.choice((0, 0, 1, 4))
+    return specs, items
+
+
+def decode_python(plan, specs, block_values):
+    """Conversión valor a valor: un struct.unpack y aritmética en Python por parámetro"""
+    results = {}
+    raw = plan.demultiplex(block_values)
+    for spec in specs:
+        registers = raw[spec.key]
+        if registers is None:
+            results[spec.key] = None
+            continue
+        if spec.size == 1:
+            data = struct.pack('>H', registers)
+        elif spec.word_order == 'big':
+            data = struct.pack('>HH', registers[0], registers[1])
+        else:
+            data = struct.pack('>HH', registers[1], registers[0])
+        value = struct.unpack(_FORMATS[spec.data_type], data)[0] * spec.scale
+        if spec.minimum is not None:
+            value = max(spec.minimum, value)
+        if spec.maximum is not None:
+            value = min(spec.maximum, value)
+        results[spec.key] = value
+    return results
+
+
+def random_blocks(plan, rng):
+    """Respuestas aleatorias para cada bloque, evitando NaN en los float32"""
+    blocks = []
+    for block in plan.blocks:
+        blocks.append([rng.randrange(0x7F00) for _ in range(block.count)])
+    return blocks
+
+
+def cross_check(samples=500, seed=9):
+    """Verificar que el codec coincide con la conversión valor a valor"""
+    rng = random.Random(seed)
+    specs, items = make_parameters()
+    plan = plan_reads(items, 3)
+    codec = compile_codec(plan, specs)
+    failures = 0
+    for _ in range(samples):
+        blocks = random_blocks(plan, rng)
+        if rng.random() < 0.1:
+            blocks[rng.randrange(len(blocks))] = None
+        expected = decode_python(plan, specs, blocks)
+        actual = codec.decode(blocks)
+        values, valid = codec.decode_batch([blocks])
+        batch = {key: value if ok else None for key, value, ok in zip(codec.keys, values[0].tolist(), valid[0])}
+        if any(batch[key] != actual[key] for key in codec.keys):
+            failures += 1
+        for key, value in expected.items():
+            other = actual[key]
+            if (value is None) != (other is None) or (value is not None and abs(value - other) > 1e-6 * max(1.0, abs(value))):
+                failures += 1
+    print(f"Verificación cruzada: {samples} lecturas, {failures} diferencias")
+    return failures == 0
+
+
+def bench(drives=300, number=20):
+    """Milisegundos para convertir una lectura de todos los variadores"""
+    rng = random.Random(1)
+    specs, items = make_parameters()
+    plan = plan_reads(items, 3)
+    codec = compile_codec(plan, specs)
+    readings = [random_blocks(plan, rng) for _ in range(drives)]
+
+    python = timeit.timeit(lambda: [decode_python(plan, specs, blocks) for blocks in readings], number=number)
+    vector = timeit.timeit(lambda: [codec.decode(blocks) for blocks in readings], number=number)
+    arrays = timeit.timeit(lambda: [codec.decode_vector(blocks) for blocks in readings], number=number)
+    batch = timeit.timeit(lambda: codec.decode_batch(readings), number=number)
+    print(f"{drives} variadores x {len(specs)} parámetros ({plan.request_count} bloques):")
+    print(f"  valor a valor        {python / number * 1e3:>8.2f}ms")
+    print(f"  codec -> dict        {vector / number * 1e3:>8.2f}ms  x{python / vector:.1f}")
+    print(f"  codec -> vector      {arrays / number * 1e3:>8.2f}ms  x{python / arrays:.1f}")
+    print(f"  codec en lote        {batch / number * 1e3:>8.2f}ms  x{python / batch:.1f}")
+
+
+if __name__ == "__main__":
+    ok = cross_check()
+    bench()
+    sys.exit(0 if ok else 1)
@@ -12,6 +12,8 @@ from ..protocols.base_protocol.device_interface import DeviceInterface
 from ..config.config_manager import ConfigManager
 # Usar el DeviceManager centralizado para evitar duplicación de responsabilidades
 from .device_manager import DeviceManager as CoreDeviceManager
+from .poll_scheduler import PollScheduler
+from .historian import Historian
 
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
@@ -38,6 +40,13 @@ class CommunicationEngine(QObject):
         self.plugin_loader = PluginLoader()  # Descubre plugins en /protocols/
         self.config_manager = ConfigManager()  # Gestor de configuración
         self.loaded_protocols: Dict[str, ProtocolInterface] = {}
+        # Sondeo periódico de dispositivos fuera del hilo de la GUI
+        self.poll_scheduler = PollScheduler()
+        self.poll_scheduler.poll_error.connect(
+            lambda device_id, message: self.error_occurred.emit("poll_error", f"{device_id}: {message}")
+        )
+        # Histórico de valores sondeados (opcional, ver enable_history)
+        self.historian: Optional[Historian] = None
 
         # Cargar plugins automáticamente al iniciar
         self._load_plugins()
@@ -98,6 +107,7 @@ class CommunicationEngine(QObject):
         try:
             success = self.device_manager.disconnect_device(device_id)
             if success:
+                self.poll_scheduler.remove_device(device_id)
                 self.device_disconnected.emit(device_id)
             return success
         except Exception as e:
@@ -105,5 +115,47 @@ class CommunicationEngine(QObject):
             self.error_occurred.emit("disconnection_error", f"Error desconectando {device_id}: {e}")
             return False
 
+    
+    def start_polling(self, device_id: str, scan_class='normal', owner=None) -> bool:
+        """Sondear los registros de un dispositivo con la clase de escaneo indicada.
+
+        owner identifica al consumidor, para que stop_polling quite solo sus tags.
+        """
+        device = self.device_manager.get_device(device_id)
+        if device is None:
+            self.error_occurred.emit("poll_error", f"Dispositivo {device_id} no encontrado")
+            return False
+        if not self.poll_scheduler.add_device_registers(device, scan_class, owner):
+            return False
+        self.poll_scheduler.start()
+        return True
+    
+    def stop_polling(self, device_id: Optional[str] = None, owner=None):
+        """Dejar de sondear un dispositivo o, sin argumento, detener todo el sondeo.
+
+        Con owner solo se quitan los tags que agregó ese consumidor.
+        """
+        if device_id is None:
+            self.poll_scheduler.stop()
+        elif owner is None:
+            self.poll_scheduler.remove_device(device_id)
+        else:
+            self.poll_scheduler.remove_device(device_id, owner)
+
+    def enable_history(self, db_path: str = "history.db") -> Historian:
+        """Guardar en SQLite todos los valores que entregue el sondeo"""
+        if self.historian is None:
+            self.historian = Historian(db_path)
+            self.historian.attach(self.poll_scheduler)
+            logger.info(f"Histórico activado en {db_path}")
+        return self.historian
+
+    def disable_history(self):
+        """Dejar de historizar y confirmar las muestras pendientes"""
+        if self.historian is not None:
+            self.historian.detach(self.poll_scheduler)
+            self.historian.close()
+            self.historian = None
+
 
 # Se utiliza el DeviceManager definido en src/core/device_manager.py
\ No newline at end of file
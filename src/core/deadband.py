@@ -0,0 +1,154 @@
+# src/core/deadband.py
+import logging
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+from .value_codec import ValueSpec
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Deadband:
+    """Cambio mínimo para reportar un valor, en unidades de ingeniería (ya escalado).
+
+    absolute: diferencia mínima respecto del último valor reportado.
+    percent: porcentaje del rango del parámetro (rango_max - rango_min) o, si no tiene
+    rango, del último valor reportado. Si se definen ambos, manda el mayor.
+    Sin deadband (0, 0) se reporta cualquier cambio.
+    """
+    absolute: float = 0.0
+    percent: float = 0.0
+
+    def __post_init__(self):
+        if self.absolute < 0 or self.percent < 0:
+            raise ValueError(f"Deadband inválido: {self.absolute}, {self.percent}%")
+
+
+def span_of(spec: Optional[ValueSpec]) -> Optional[float]:
+    """Rango de ingeniería de un parámetro, si su plantilla lo define"""
+    if spec is None or spec.minimum is None or spec.maximum is None:
+        return None
+    return spec.maximum - spec.minimum
+
+
+class ChangeFilter:
+    """
+    Detección de cambios por excepción para los valores de un plan de lecturas.
+    Responsabilidad: a partir del vector de valores de una lectura, decidir con
+    unas pocas operaciones de NumPy qué claves cambiaron más que su deadband
+    respecto del último valor reportado. El último valor solo avanza al reportar,
+    así una deriva lenta termina reportándose al superar el deadband.
+    Un valor que pasa a inválido se reporta una vez (como None) y vuelve a
+    reportarse al recuperarse.
+    """
+
+    def __init__(self, keys: Iterable[Any], deadbands: Optional[Sequence[Optional[Deadband]]] = None,
+                 spans: Optional[Sequence[Optional[float]]] = None):
+        self.keys: List[Any] = list(keys)
+        count = len(self.keys)
+        deadbands = list(deadbands) if deadbands is not None else [None] * count
+        spans = list(spans) if spans is not None else [None] * count
+        self._index = {key: index for index, key in enumerate(self.keys)}
+        self._absolute = np.array([band.absolute if band else 0.0 for band in deadbands], dtype=np.float64)
+        self._fraction = np.array([band.percent / 100.0 if band else 0.0 for band in deadbands], dtype=np.float64)
+        self._span = np.array([np.nan if span is None else abs(span) for span in spans], dtype=np.float64)
+        self._has_span = ~np.isnan(self._span)
+        self._any_percent = bool(self._fraction.any())
+        self._last = np.full(count, np.nan)
+        self._reported_valid = np.zeros(count, dtype=bool)
+        # Valores que no son escalares (bloques de varios registros sin decodificar)
+        self._objects: Dict[Any, Any] = {}
+        self._force = True
+
+    def reset(self) -> None:
+        """Reportar todos los valores en la próxima lectura (refresco de integridad)"""
+        self._force = True
+
+    def update(self, values: np.ndarray, valid: np.ndarray) -> np.ndarray:
+        """Índices de self.keys a reportar para una lectura, actualizando lo último reportado"""
+        if self._force:
+            changed = np.ones(len(self.keys), dtype=bool)
+            self._force = False
+        else:
+            threshold = self._absolute
+            if self._any_percent:
+                reference = np.where(self._has_span, self._span, np.abs(self._last))
+                threshold = np.maximum(threshold, self._fraction * reference)
+            with np.errstate(invalid='ignore'):
+                moved = np.abs(values - self._last) > threshold
+            changed = (moved & valid) | (valid != self._reported_valid)
+        reported = changed & valid
+        self._last[reported] = values[reported]
+        self._reported_valid[changed] = valid[changed]
+        return np.flatnonzero(changed)
+
+    def select(self, values: np.ndarray, valid: np.ndarray,
+               others: Optional[Dict[Any, Any]] = None) -> Dict[Any, Any]:
+        """Valores a reportar de un vector alineado con self.keys (None si inválido).
+
+        others: valores adicionales sin deadband (p. ej. CompiledCodec.decode_raw),
+        que se reportan si cambian en algo.
+        """
+        force = self._force
+        changed = self.update(values, valid)
+        keys = self.keys
+        reported = {keys[index]: (value if ok else None)
+                    for index, value, ok in zip(changed.tolist(), values[changed].tolist(),
+                                                valid[changed].tolist())}
+        if others:
+            reported.update(self._changed_objects(others, force))
+        return reported
+
+    def filter_mapping(self, results: Dict[Any, Any]) -> Dict[Any, Any]:
+        """Valores a reportar de un dict clave -> valor como el de ReadPlan.demultiplex.
+
+        Las claves de self.keys se comparan en bloque con su deadband; el resto
+        (listas de registros sin decodificar) se reportan si cambian en algo.
+        """
+        count = len(self.keys)
+        values = np.zeros(count, dtype=np.float64)
+        valid = np.zeros(count, dtype=bool)
+        index = self._index
+        others = {}
+        for key, value in results.items():
+            position = index.get(key)
+            if position is None:
+                others[key] = value
+            elif value is not None:
+                values[position] = value
+                valid[position] = True
+
+        force = self._force
+        changed = self.update(values, valid)
+        keys = self.keys
+        # Se entrega el valor original (bool, int) y no su copia en float
+        reported = {keys[position]: results.get(keys[position]) for position in changed.tolist()}
+        if others:
+            reported.update(self._changed_objects(others, force))
+        return reported
+
+    def _changed_objects(self, others: Dict[Any, Any], force: bool) -> Dict[Any, Any]:
+        reported = {}
+        last = self._objects
+        for key, value in others.items():
+            if force or key not in last or last[key] != value:
+                last[key] = value
+                reported[key] = value
+        return reported
+
+    def __len__(self):
+        return len(self.keys)
+
+
+def compile_filter(keys: Iterable[Any], deadbands: Dict[Any, Optional[Deadband]],
+                   specs: Optional[Dict[Any, ValueSpec]] = None) -> ChangeFilter:
+    """Filtro para las claves dadas, con el deadband y el rango de cada una"""
+    keys = list(keys)
+    specs = specs or {}
+    change_filter = ChangeFilter(keys, [deadbands.get(key) for key in keys],
+                                 [span_of(specs.get(key)) for key in keys])
+    logger.debug(f"Filtro de cambios compilado: {len(keys)} valores")
+    return change_filter
@@ -0,0 +1,346 @@
+# src/core/historian.py
+import csv
+import logging
+import queue
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Muestras por transacción del hilo escritor (group commit)
+DEFAULT_BATCH_SIZE = 20000
+
+# Tiempo máximo que una muestra espera en memoria antes de confirmarse
+DEFAULT_FLUSH_INTERVAL = 0.5
+
+# Muestras pendientes admitidas; por encima se descartan en vez de bloquear el sondeo
+DEFAULT_MAX_PENDING = 1_000_000
+
+# Filas por bloque al exportar o consultar
+DEFAULT_CHUNK_SIZE = 50000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tags (
+    id INTEGER PRIMARY KEY,
+    device_id TEXT NOT NULL,
+    key TEXT NOT NULL,
+    UNIQUE (device_id, key)
+);
+CREATE TABLE IF NOT EXISTS samples (
+    tag_id INTEGER NOT NULL,
+    ts INTEGER NOT NULL,
+    value REAL,
+    PRIMARY KEY (tag_id, ts)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS samples_ts ON samples (ts);
+"""
+
+_FLUSH = object()
+_STOP = object()
+
+
+def _to_micros(timestamp: float) -> int:
+    return round(timestamp * 1_000_000)
+
+
+class Historian:
+    """
+    Histórico de valores sondeados en SQLite.
+    Responsabilidad: guardar las muestras (device_id, clave, valor, timestamp) que
+    entrega PollScheduler sin frenar a los hilos que sondean: record_batch() solo
+    resuelve el ID entero del tag y encola; un hilo escritor agrupa lo pendiente
+    en una transacción por lote sobre una base en modo WAL.
+    """
+
+    def __init__(self, db_path: str = "history.db", batch_size: int = DEFAULT_BATCH_SIZE,
+                 flush_interval: float = DEFAULT_FLUSH_INTERVAL,
+                 max_pending: int = DEFAULT_MAX_PENDING):
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+
+        self._queue: "queue.SimpleQueue" = queue.SimpleQueue()
+        self._pending = 0
+        self._pending_lock = threading.Lock()
+
+        # (device_id, clave) -> ID entero; los tags nuevos se insertan en el hilo escritor
+        self._tag_ids: Dict[Tuple[str, str], int] = {}
+        self._tag_names: Dict[int, Tuple[str, str]] = {}
+        self._new_tags: List[Tuple[int, str, str]] = []
+        self._tags_lock = threading.Lock()
+
+        self.written = 0
+        self.dropped = 0
+        self.commits = 0
+
+        connection = self._connect()
+        try:
+            connection.executescript(_SCHEMA)
+            for tag_id, device_id, key in connection.execute("SELECT id, device_id, key FROM tags"):
+                self._tag_ids[(device_id, key)] = tag_id
+                self._tag_names[tag_id] = (device_id, key)
+        finally:
+            connection.close()
+        self._next_tag_id = max(self._tag_names, default=0) + 1
+
+        self._thread = threading.Thread(target=self._run, name='historian-writer', daemon=True)
+        self._thread.start()
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.db_path, timeout=30.0)
+        connection.execute("PRAGMA journal_mode=WAL")
+        # Con WAL, NORMAL sigue siendo consistente ante caídas y evita un fsync por commit
+        connection.execute("PRAGMA synchronous=NORMAL")
+        return connection
+
+    # === ESCRITURA ===
+
+    def tag_id(self, device_id: str, key: Any) -> int:
+        """ID entero de un tag, asignándolo si es nuevo"""
+        name = (str(device_id), str(key))
+        tag_id = self._tag_ids.get(name)
+        if tag_id is None:
+            with self._tags_lock:
+                tag_id = self._tag_ids.get(name)
+                if tag_id is None:
+                    tag_id = self._next_tag_id
+                    self._next_tag_id += 1
+                    self._new_tags.append((tag_id,) + name)
+                    self._tag_names[tag_id] = name
+                    self._tag_ids[name] = tag_id
+        return tag_id
+
+    def record(self, device_id: str, key: Any, value: Any, timestamp: Optional[float] = None) -> bool:
+        """Guardar una muestra"""
+        return self.record_batch([(device_id, key, value, time.time() if timestamp is None else timestamp)])
+
+    def record_batch(self, batch: Sequence[Tuple[str, Any, Any, float]]) -> bool:
+        """Guardar un lote de results_ready: lista de (device_id, clave, valor, timestamp).
+
+        Nunca bloquea; si el escritor acumula más de max_pending muestras, el lote se descarta.
+        """
+        rows = []
+        tag_ids = self._tag_ids
+        for device_id, key, value, timestamp in batch:
+            # Valores no numéricos (p. ej. bloques sin decodificar) no se historizan
+            if value is None or isinstance(value, (list, tuple, dict, str, bytes)):
+                continue
+            tag_id = tag_ids.get((device_id, key)) if type(key) is str else None
+            if tag_id is None:
+                tag_id = self.tag_id(device_id, key)
+            rows.append((tag_id, _to_micros(timestamp), float(value)))
+        if not rows:
+            return True
+        with self._pending_lock:
+            if self._pending + len(rows) > self.max_pending:
+                self.dropped += len(rows)
+                return False
+            self._pending += len(rows)
+        self._queue.put(rows)
+        return True
+
+    def attach(self, scheduler) -> None:
+        """Historizar todos los lotes que emita un PollScheduler"""
+        scheduler.results_ready.connect(self.record_batch)
+
+    def detach(self, scheduler) -> None:
+        try:
+            scheduler.results_ready.disconnect(self.record_batch)
+        except (RuntimeError, TypeError):
+            pass
+
+    def flush(self, timeout: float = 10.0) -> bool:
+        """Esperar a que todo lo encolado hasta ahora esté confirmado en la base"""
+        if not self._thread.is_alive():
+            return False
+        done = threading.Event()
+        self._queue.put((_FLUSH, done))
+        return done.wait(timeout)
+
+    def close(self) -> None:
+        """Confirmar lo pendiente y detener el hilo escritor"""
+        if self._thread.is_alive():
+            self._queue.put((_STOP, None))
+            self._thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _run(self):
+        """Hilo escritor: una transacción por lote de muestras pendientes"""
+        connection = self._connect()
+        try:
+            while True:
+                item = self._queue.get()
+                rows: List[tuple] = []
+                markers = []
+                stop = False
+                # Acumular hasta batch_size muestras o flush_interval segundos
+                deadline = time.monotonic() + self.flush_interval
+                while True:
+                    if type(item) is list:
+                        rows.extend(item)
+                    elif item[0] is _FLUSH:
+                        markers.append(item[1])
+                        break
+                    else:
+                        stop = True
+                        break
+                    if len(rows) >= self.batch_size:
+                        break
+                    try:
+                        item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                    except queue.Empty:
+                        break
+                self._commit(connection, rows)
+                for marker in markers:
+                    marker.set()
+                if stop:
+                    break
+        finally:
+            connection.close()
+
+    def _commit(self, connection: sqlite3.Connection, rows: List[tuple]):
+        with self._tags_lock:
+            new_tags, self._new_tags = self._new_tags, []
+        if not rows and not new_tags:
+            return
+        try:
+            with connection:
+                if new_tags:
+                    connection.executemany("INSERT OR IGNORE INTO tags (id, device_id, key) VALUES (?, ?, ?)",
+                                           new_tags)
+                # La misma marca de tiempo de un tag reemplaza a la anterior
+                connection.executemany("INSERT OR REPLACE INTO samples (tag_id, ts, value) VALUES (?, ?, ?)",
+                                       rows)
+            self.written += len(rows)
+            self.commits += 1
+        except sqlite3.Error as e:
+            logger.error(f"Error guardando {len(rows)} muestras en el histórico: {e}")
+            self.dropped += len(rows)
+            with self._tags_lock:
+                self._new_tags = new_tags + self._new_tags
+        finally:
+            with self._pending_lock:
+                self._pending -= len(rows)
+
+    def get_statistics(self) -> Dict[str, Any]:
+        return {
+            'tags': len(self._tag_ids),
+            'written': self.written,
+            'pending': self._pending,
+            'dropped': self.dropped,
+            'commits': self.commits,
+        }
+
+    # === CONSULTA Y EXPORTACIÓN ===
+
+    def _tag_filter(self, tags: Optional[Iterable[Tuple[str, Any]]]) -> Optional[List[int]]:
+        if tags is None:
+            return None
+        return [self._tag_ids[name] for name in ((str(d), str(k)) for d, k in tags) if name in self._tag_ids]
+
+    def iter_chunks(self, start: Optional[float] = None, end: Optional[float] = None,
+                    tags: Optional[Iterable[Tuple[str, Any]]] = None,
+                    chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[List[Tuple[float, str, str, float]]]:
+        """Muestras en [start, end) ordenadas por tiempo, en bloques de chunk_size filas.
+
+        Cada fila es (timestamp, device_id, clave, valor). La memoria usada no depende
+        del tamaño del histórico: el cursor avanza bloque a bloque.
+        """
+        where, params = [], []
+        if start is not None:
+            where.append("ts >= ?")
+            params.append(_to_micros(start))
+        if end is not None:
+            where.append("ts < ?")
+            params.append(_to_micros(end))
+        tag_ids = self._tag_filter(tags)
+        if tag_ids is not None:
+            if not tag_ids:
+                return
+            where.append(f"tag_id IN ({','.join('?' * len(tag_ids))})")
+            params.extend(tag_ids)
+        sql = "SELECT ts, tag_id, value FROM samples"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY ts, tag_id"
+
+        connection = sqlite3.connect(self.db_path, timeout=30.0)
+        try:
+            cursor = connection.execute(sql, params)
+            names = self._tag_names
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                yield [(ts / 1_000_000,) + names[tag_id] + (value,) for ts, tag_id, value in rows]
+        finally:
+            connection.close()
+
+    def query(self, device_id: str, key: Any, start: Optional[float] = None,
+              end: Optional[float] = None) -> List[Tuple[float, float]]:
+        """Serie (timestamp, valor) de un tag"""
+        return [(row[0], row[3]) for chunk in self.iter_chunks(start, end, [(device_id, key)])
+                for row in chunk]
+
+    def export_csv(self, path: str, start: Optional[float] = None, end: Optional[float] = None,
+                   tags: Optional[Iterable[Tuple[str, Any]]] = None,
+                   chunk_size: int = DEFAULT_CHUNK_SIZE) -> int:
+        """Exportar a CSV por bloques; devuelve las filas escritas"""
+        count = 0
+        with open(path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(['timestamp', 'device_id', 'key', 'value'])
+            for chunk in self.iter_chunks(start, end, tags, chunk_size):
+                writer.writerows((datetime.fromtimestamp(ts).isoformat(timespec='microseconds'),
+                                  device_id, key, value) for ts, device_id, key, value in chunk)
+                count += len(chunk)
+        logger.info(f"Histórico exportado a {path}: {count} filas")
+        return count
+
+    def export_parquet(self, path: str, start: Optional[float] = None, end: Optional[float] = None,
+                       tags: Optional[Iterable[Tuple[str, Any]]] = None,
+                       chunk_size: int = DEFAULT_CHUNK_SIZE) -> Optional[int]:
+        """Exportar a Parquet (un row group por bloque); requiere pyarrow.
+
+        Devuelve las filas escritas, o None si pyarrow no está instalado.
+        """
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            logger.error("Exportar a Parquet requiere pyarrow (pip install pyarrow)")
+            return None
+
+        schema = pa.schema([('timestamp', pa.timestamp('us', tz='UTC')), ('device_id', pa.string()),
+                            ('key', pa.string()), ('value', pa.float64())])
+        count = 0
+        with pq.ParquetWriter(path, schema) as writer:
+            for chunk in self.iter_chunks(start, end, tags, chunk_size):
+                columns = list(zip(*chunk))
+                writer.write_table(pa.table([
+                    pa.array([round(ts * 1_000_000) for ts in columns[0]], pa.timestamp('us', tz='UTC')),
+                    pa.array(columns[1], pa.string()),
+                    pa.array(columns[2], pa.string()),
+                    pa.array(columns[3], pa.float64()),
+                ], schema=schema))
+                count += len(chunk)
+        logger.info(f"Histórico exportado a {path}: {count} filas")
+        return count
+
+    def purge_before(self, timestamp: float) -> int:
+        """Borrar las muestras anteriores a timestamp; devuelve cuántas se borraron"""
+        connection = self._connect()
+        try:
+            with connection:
+                return connection.execute("DELETE FROM samples WHERE ts < ?", (_to_micros(timestamp),)).rowcount
+        finally:
+            connection.close()
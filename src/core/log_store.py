@@ -0,0 +1,283 @@
+# src/core/log_store.py
+import logging
+import threading
+import time
+from bisect import bisect_right
+from itertools import chain
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Entradas que conserva el almacén; las más antiguas se descartan
+DEFAULT_CAPACITY = 1_000_000
+
+# Nombres de nivel aceptados (mismos valores numéricos que el módulo logging)
+LEVELS = {
+    'DEBUG': logging.DEBUG,
+    'INFO': logging.INFO,
+    'WARNING': logging.WARNING,
+    'ERROR': logging.ERROR,
+    'CRITICAL': logging.CRITICAL,
+}
+
+
+def parse_level(level) -> int:
+    """Nivel numérico desde un número o un nombre ('INFO', 'warning', ...)"""
+    if isinstance(level, str):
+        try:
+            return LEVELS[level.upper()]
+        except KeyError:
+            raise ValueError(f"Nivel de log desconocido: {level}")
+    return int(level)
+
+
+class LogEntry(NamedTuple):
+    """Una entrada del almacén; seq crece de a uno y nunca se reutiliza"""
+    seq: int
+    timestamp: float
+    level: int
+    source: str
+    device: Optional[str]
+    message: str
+
+    @property
+    def level_name(self) -> str:
+        return logging.getLevelName(self.level)
+
+
+class _SeqIndex:
+    """Secuencias ascendentes de las entradas con un mismo valor (nivel, dispositivo u origen).
+
+    Las entradas descartadas por el anillo siempre son las más antiguas, así que
+    salen por la cabeza; la lista se compacta cuando la cabeza pasa la mitad.
+    """
+
+    __slots__ = ('seqs', 'head')
+
+    def __init__(self):
+        self.seqs: List[int] = []
+        self.head = 0
+
+    def __len__(self):
+        return len(self.seqs) - self.head
+
+    def append(self, seq: int) -> None:
+        self.seqs.append(seq)
+
+    def evict(self) -> None:
+        self.head += 1
+        if self.head > 1024 and self.head * 2 > len(self.seqs):
+            del self.seqs[:self.head]
+            self.head = 0
+
+    def after(self, seq: int) -> List[int]:
+        """Secuencias mayores que seq"""
+        return self.seqs[bisect_right(self.seqs, seq, self.head):]
+
+    def count_after(self, seq: int) -> int:
+        return len(self.seqs) - bisect_right(self.seqs, seq, self.head)
+
+
+class LogStore:
+    """
+    Almacén de logs acotado e indexado.
+    Responsabilidad: guardar hasta `capacity` entradas en un anillo y mantener
+    índices por nivel, dispositivo y origen, de modo que una consulta filtrada
+    recorra solo las entradas del índice más selectivo y no todo el almacén.
+    Es seguro entre hilos: los logs pueden llegar desde el hilo de trazas.
+    """
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY):
+        if capacity <= 0:
+            raise ValueError(f"Capacidad inválida: {capacity}")
+        self.capacity = capacity
+        self._lock = threading.Lock()
+        # Campos por posición del anillo (crecen hasta capacity y luego se reutilizan)
+        self._timestamps: List[float] = []
+        self._levels: List[int] = []
+        self._sources: List[str] = []
+        self._devices: List[Optional[str]] = []
+        self._messages: List[str] = []
+        self._next_seq = 0
+        # Primera secuencia vigente tras clear()
+        self._base = 0
+        self._by_level: Dict[int, _SeqIndex] = {}
+        self._by_source: Dict[str, _SeqIndex] = {}
+        self._by_device: Dict[Optional[str], _SeqIndex] = {}
+
+    # === ESCRITURA ===
+
+    def append(self, level, message: str, source: str = "system",
+               device: Optional[str] = None, timestamp: Optional[float] = None) -> int:
+        """Agregar una entrada; devuelve su secuencia"""
+        with self._lock:
+            return self._append(parse_level(level), message, source, device,
+                                time.time() if timestamp is None else timestamp)
+
+    def extend(self, entries: Iterable[Tuple[Any, str, str, Optional[str], Optional[float]]]) -> int:
+        """Agregar un lote de (nivel, mensaje, origen, dispositivo, timestamp) con un solo bloqueo"""
+        now = time.time()
+        with self._lock:
+            for level, message, source, device, timestamp in entries:
+                self._append(parse_level(level), message, source, device,
+                             now if timestamp is None else timestamp)
+            return self._next_seq - 1
+
+    def _append(self, level: int, message: str, source: str, device: Optional[str],
+                timestamp: float) -> int:
+        seq = self._next_seq
+        position = seq % self.capacity
+        if seq < self.capacity:
+            self._timestamps.append(timestamp)
+            self._levels.append(level)
+            self._sources.append(source)
+            self._devices.append(device)
+            self._messages.append(message)
+        else:
+            if seq - self.capacity >= self._base:
+                # La entrada descartada es la más antigua de cada uno de sus índices
+                self._by_level[self._levels[position]].evict()
+                self._by_source[self._sources[position]].evict()
+                self._by_device[self._devices[position]].evict()
+            self._timestamps[position] = timestamp
+            self._levels[position] = level
+            self._sources[position] = source
+            self._devices[position] = device
+            self._messages[position] = message
+        for index, key in ((self._by_level, level), (self._by_source, source), (self._by_device, device)):
+            seqs = index.get(key)
+            if seqs is None:
+                seqs = index[key] = _SeqIndex()
+            seqs.append(seq)
+        self._next_seq = seq + 1
+        return seq
+
+    def clear(self) -> None:
+        """Descartar todas las entradas (las secuencias siguen creciendo)"""
+        with self._lock:
+            self._base = self._next_seq
+            self._by_level, self._by_source, self._by_device = {}, {}, {}
+
+    # === LECTURA ===
+
+    @property
+    def oldest_seq(self) -> int:
+        """Secuencia más antigua que sigue en el almacén"""
+        return max(self._next_seq - self.capacity, self._base)
+
+    @property
+    def last_seq(self) -> int:
+        """Secuencia de la última entrada (-1 si nunca hubo entradas)"""
+        return self._next_seq - 1
+
+    def __len__(self):
+        return self._next_seq - self.oldest_seq
+
+    def entry(self, seq: int) -> Optional[LogEntry]:
+        """Entrada por secuencia, o None si ya se descartó"""
+        if seq < self.oldest_seq or seq >= self._next_seq:
+            return None
+        position = seq % self.capacity
+        entry = LogEntry(seq, self._timestamps[position], self._levels[position],
+                         self._sources[position], self._devices[position], self._messages[position])
+        # Si mientras se leía el anillo pasó por encima, la entrada ya no es válida
+        return entry if seq >= self.oldest_seq else None
+
+    def entries(self, seqs: Iterable[int]) -> List[LogEntry]:
+        """Entradas de varias secuencias (omite las descartadas)"""
+        with self._lock:
+            return [entry for entry in map(self.entry, seqs) if entry is not None]
+
+    def query(self, min_level=None, device: Optional[str] = None, source: Optional[str] = None,
+              text: Optional[str] = None, after: int = -1) -> Sequence[int]:
+        """Secuencias de las entradas que cumplen el filtro, en orden, posteriores a `after`.
+
+        El costo es proporcional a las entradas del índice más selectivo (nivel
+        mínimo, dispositivo u origen); sin filtros devuelve un range.
+        """
+        with self._lock:
+            after = max(after, self.oldest_seq - 1)
+            level = parse_level(min_level) if min_level is not None else None
+            candidates: List[Tuple[int, str, Any]] = []
+            if device is not None:
+                index = self._by_device.get(device)
+                if index is None:
+                    return []
+                candidates.append((index.count_after(after), 'device', index))
+            if source is not None:
+                index = self._by_source.get(source)
+                if index is None:
+                    return []
+                candidates.append((index.count_after(after), 'source', index))
+            if level is not None:
+                present = [(key, index) for key, index in self._by_level.items() if len(index)]
+                levels = [index for key, index in present if key >= level]
+                if len(levels) == len(present):
+                    level = None  # El nivel mínimo no excluye nada
+                else:
+                    candidates.append((sum(index.count_after(after) for index in levels), 'level', levels))
+
+            if not candidates:
+                seqs: Sequence[int] = range(after + 1, self._next_seq)
+                kind = None
+            else:
+                _, kind, chosen = min(candidates, key=lambda item: item[0])
+                if kind == 'level':
+                    # Unir secuencias ya ordenadas: sorted() aprovecha los tramos ordenados
+                    seqs = sorted(chain.from_iterable(index.after(after) for index in chosen))
+                else:
+                    seqs = chosen.after(after)
+
+            capacity = self.capacity
+            if device is not None and kind != 'device':
+                devices = self._devices
+                seqs = [seq for seq in seqs if devices[seq % capacity] == device]
+            if source is not None and kind != 'source':
+                sources = self._sources
+                seqs = [seq for seq in seqs if sources[seq % capacity] == source]
+            if level is not None and kind != 'level':
+                levels_by_position = self._levels
+                seqs = [seq for seq in seqs if levels_by_position[seq % capacity] >= level]
+            if text:
+                needle = text.lower()
+                messages = self._messages
+                seqs = [seq for seq in seqs if needle in messages[seq % capacity].lower()]
+            return seqs
+
+    def devices(self) -> List[Optional[str]]:
+        with self._lock:
+            return [device for device, index in self._by_device.items() if len(index)]
+
+    def sources(self) -> List[str]:
+        with self._lock:
+            return [source for source, index in self._by_source.items() if len(index)]
+
+    # === INTEGRACIÓN CON LAS TRAZAS MODBUS ===
+
+    def record_trace(self, event) -> None:
+        """Listener de TraceHub: guardar un TraceEvent con su origen"""
+        text = event.text
+        prefix = f"{event.source}: "
+        if text.startswith(prefix):
+            text = text[len(prefix):]
+        self.append(event.level, text, event.source, None, event.timestamp)
+
+    def attach_trace_hub(self, hub=None) -> None:
+        """Recibir las trazas de los masters y slaves Modbus (hub por defecto si no se indica)"""
+        if hub is None:
+            from ..protocols.modbus.tracing import get_default_hub
+            hub = get_default_hub()
+        hub.add_listener(self.record_trace)
+
+
+_default_store = None
+_default_store_lock = threading.Lock()
+
+
+def get_default_log_store() -> LogStore:
+    """Almacén de logs compartido por la aplicación"""
+    global _default_store
+    with _default_store_lock:
+        if _default_store is None:
+            _default_store = LogStore()
+        return _default_store
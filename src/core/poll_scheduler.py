@@ -0,0 +1,420 @@
+# src/core/poll_scheduler.py
+import heapq
+import itertools
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+from PySide6.QtCore import QObject, Signal
+
+from ..protocols.modbus.read_planner import DEFAULT_MAX_GAP, FUNCTION_BY_TABLE, plan_reads
+from .deadband import Deadband, compile_filter
+from .value_codec import ValueSpec, compile_codec, specs_from_template
+
+# Clases de escaneo predefinidas (segundos); también se acepta un período numérico
+SCAN_CLASSES = {
+    'fast': 0.1,
+    'normal': 1.0,
+    'slow': 10.0,
+}
+
+
+# Valor por omisión de remove_device: quitar los grupos de todos los dueños
+_ALL_OWNERS = object()
+
+
+def register_key(register: Dict[str, Any]) -> Any:
+    """Clave con la que se entregan los valores de un registro de `device.registers`"""
+    return register.get('name') or f"{register.get('function', '4x')} @ {register.get('address', 0)}"
+
+
+class PollTag:
+    """Un valor a sondear: clave, función de lectura, dirección, registros que ocupa
+    y, opcionalmente, cómo convertirlo a valor de ingeniería y su deadband."""
+
+    __slots__ = ('key', 'function_code', 'address', 'size', 'spec', 'deadband')
+
+    def __init__(self, key, function_code: int, address: int, size: int = 1,
+                 spec: Optional[ValueSpec] = None, deadband: Optional[Deadband] = None):
+        self.key = key
+        self.function_code = function_code
+        self.address = address
+        self.size = size
+        self.spec = spec
+        self.deadband = deadband
+
+
+class PollGroup:
+    """Tags de un dispositivo que comparten período, leídos con un único plan."""
+
+    def __init__(self, device, period: float, max_gap: int, report_by_exception: bool = False,
+                 integrity_period: Optional[float] = None):
+        self.device = device
+        self.period = period
+        self.max_gap = max_gap
+        self.tags: Dict[Any, PollTag] = {}
+        self.plans = []
+        self.codecs = []
+        self.filters = []
+        self.report_by_exception = report_by_exception
+        self.integrity_period = integrity_period
+        self.next_integrity = 0.0
+        self.deadline = 0.0
+        self.busy = False
+        self.active = True
+        self.overruns = 0
+        self.suppressed = 0
+
+    def rebuild(self):
+        """Recalcular el plan de lecturas tras agregar o quitar tags"""
+        by_function: Dict[int, list] = {}
+        for tag in self.tags.values():
+            by_function.setdefault(tag.function_code, []).append((tag.key, tag.address, tag.size))
+        self.plans = [plan_reads(items, function_code, self.max_gap)
+                      for function_code, items in sorted(by_function.items())]
+        # Los planes con tags tipados se decodifican en bloque con NumPy
+        self.codecs = []
+        for plan in self.plans:
+            specs = [self.tags[key].spec for key in plan.demux if self.tags[key].spec is not None]
+            self.codecs.append(compile_codec(plan, specs) if specs else None)
+        # Con reporte por excepción, cada plan filtra sus valores contra su deadband
+        self.filters = []
+        if self.report_by_exception:
+            deadbands = {key: tag.deadband for key, tag in self.tags.items()}
+            specs = {key: tag.spec for key, tag in self.tags.items() if tag.spec is not None}
+            for plan, codec in zip(self.plans, self.codecs):
+                if codec is not None:
+                    keys = codec.keys
+                else:
+                    keys = [key for key in plan.demux if self.tags[key].size == 1]
+                self.filters.append(compile_filter(keys, deadbands, specs))
+        else:
+            self.filters = [None] * len(self.plans)
+
+    def integrity_due(self, now: float) -> bool:
+        """True si toca reportar todos los valores aunque no hayan cambiado"""
+        if not self.integrity_period or now < self.next_integrity:
+            return False
+        self.next_integrity = now + self.integrity_period
+        return True
+
+
+class PollScheduler(QObject):
+    """
+    Planificador de sondeo de dispositivos.
+    Responsabilidad: leer periódicamente los tags de cada dispositivo según su clase de escaneo.
+    Las lecturas se ejecutan fuera del hilo de la GUI: las de dispositivos TCP en un
+    pool de hilos y las de dispositivos RTU en el hilo de E/S de su puerto serie, de
+    modo que cada bus se sondea en paralelo con los demás. Los resultados de todos
+    se entregan agrupados en lotes mediante la señal results_ready.
+    """
+
+    # Lote de resultados: lista de (device_id, clave, valor, timestamp); con
+    # reporte por excepción solo incluye los valores que superaron su deadband
+    results_ready = Signal(list)
+    # Señal: (device_id, mensaje_error)
+    poll_error = Signal(str, str)
+
+    def __init__(self, max_workers: int = 8, batch_interval: float = 0.05,
+                 max_gap: int = DEFAULT_MAX_GAP, report_by_exception: bool = False,
+                 integrity_period: Optional[float] = None):
+        super().__init__()
+        self.logger = logging.getLogger(__name__)
+        self.max_workers = max_workers
+        self.batch_interval = batch_interval
+        self.max_gap = max_gap
+        self.report_by_exception = report_by_exception
+        self.integrity_period = integrity_period
+
+        # Grupos por (device_id, período, dueño): cada consumidor (histórico,
+        # monitor...) agrega y quita sus tags sin tocar los de los demás
+        self._groups: Dict[Tuple[str, float, Any], PollGroup] = {}
+        self._heap: List[Tuple[float, int, PollGroup]] = []
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+
+        # Un dispositivo atiende una transacción a la vez: sus grupos se serializan
+        self._device_locks: Dict[str, threading.Lock] = {}
+
+        self._batch: List[Tuple[str, Any, Any, float]] = []
+        self._batch_lock = threading.Lock()
+
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._thread: Optional[threading.Thread] = None
+        self._running = False
+
+    # === CONFIGURACIÓN DE TAGS ===
+
+    @staticmethod
+    def scan_period(scan_class) -> float:
+        """Período en segundos de una clase de escaneo ('fast', 'normal', 'slow' o número)"""
+        if isinstance(scan_class, str):
+            return SCAN_CLASSES[scan_class]
+        period = float(scan_class)
+        if period <= 0:
+            raise ValueError(f"Período de escaneo inválido: {scan_class}")
+        return period
+
+    def add_tag(self, device, key, address: int, function_code: int = 3,
+                scan_class='normal', size: int = 1, spec: Optional[ValueSpec] = None,
+                deadband: Optional[Deadband] = None, owner=None) -> None:
+        """Agregar un tag de un dispositivo a su clase de escaneo.
+
+        Con spec, el tag se entrega como valor de ingeniería y ocupa los registros de su tipo.
+        El deadband (en las mismas unidades) solo se aplica con reporte por excepción.
+        owner identifica al consumidor que pidió el tag (ver remove_device).
+        """
+        if spec is not None:
+            size = max(size, spec.size)
+        period = self.scan_period(scan_class)
+        with self._condition:
+            group_key = (device.device_id, period, owner)
+            group = self._groups.get(group_key)
+            if group is None:
+                group = PollGroup(device, period, self.max_gap,
+                                  self.report_by_exception, self.integrity_period)
+                group.deadline = time.monotonic()
+                group.next_integrity = group.deadline + (self.integrity_period or 0.0)
+                self._groups[group_key] = group
+                self._device_locks.setdefault(device.device_id, threading.Lock())
+                heapq.heappush(self._heap, (group.deadline, next(self._sequence), group))
+            group.tags[key] = PollTag(key, function_code, address, size, spec, deadband)
+            group.rebuild()
+            self._condition.notify()
+
+    def add_device_registers(self, device, scan_class='normal', owner=None) -> int:
+        """Sondear la lista `registers` de un dispositivo ({'function', 'address'}).
+
+        Cada registro puede declarar su propia 'scan_class' y un deadband
+        ('deadband' absoluto y/o 'deadband_percent'). Devuelve los tags agregados.
+        """
+        added = 0
+        for register in getattr(device, 'registers', None) or []:
+            function = register.get('function', '4x')
+            try:
+                function_code = int(FUNCTION_BY_TABLE.get(str(function).lower(), function))
+                address = int(register.get('address', 0))
+            except (TypeError, ValueError):
+                continue
+            if function_code not in (1, 2, 3, 4):
+                continue
+            key = register_key(register)
+            deadband = None
+            if register.get('deadband') or register.get('deadband_percent'):
+                deadband = Deadband(float(register.get('deadband', 0.0)),
+                                    float(register.get('deadband_percent', 0.0)))
+            self.add_tag(device, key, address, function_code,
+                         register.get('scan_class', scan_class), int(register.get('count', 1)),
+                         deadband=deadband, owner=owner)
+            added += 1
+        return added
+
+    def add_template_parameters(self, device, parametros, scan_class='normal',
+                                data_types: Optional[Dict[str, str]] = None,
+                                word_order: str = 'big',
+                                deadband=None, owner=None) -> int:
+        """Sondear parámetros de plantilla VFD (holding registers) por su nombre.
+
+        Los valores se entregan escalados con factor_escala y limitados a su rango.
+        deadband es un Deadband para todos los parámetros o un dict nombre -> Deadband,
+        en unidades de factor_escala; el porcentaje se toma del rango de la plantilla.
+        """
+        parametros = list(parametros)
+        specs = specs_from_template(parametros, data_types, word_order)
+        for param, spec in zip(parametros, specs):
+            band = deadband.get(param.nombre_parametro) if isinstance(deadband, dict) else deadband
+            self.add_tag(device, param.nombre_parametro, int(param.direccion_modbus), 3,
+                         scan_class, spec=spec, deadband=band, owner=owner)
+        return len(parametros)
+
+    def remove_tag(self, device_id: str, key) -> None:
+        """Quitar un tag de todas las clases de escaneo del dispositivo"""
+        with self._condition:
+            for group_key, group in list(self._groups.items()):
+                if group_key[0] == device_id and key in group.tags:
+                    del group.tags[key]
+                    if group.tags:
+                        group.rebuild()
+                    else:
+                        group.active = False
+                        del self._groups[group_key]
+
+    def remove_device(self, device_id: str, owner=_ALL_OWNERS) -> None:
+        """Dejar de sondear un dispositivo; con owner, solo los tags de ese consumidor"""
+        with self._condition:
+            for group_key in [k for k in self._groups
+                              if k[0] == device_id and (owner is _ALL_OWNERS or k[2] == owner)]:
+                self._groups.pop(group_key).active = False
+            if not any(k[0] == device_id for k in self._groups):
+                self._device_locks.pop(device_id, None)
+
+    def set_report_by_exception(self, enabled: bool, integrity_period: Optional[float] = None) -> None:
+        """Entregar solo los valores que cambiaron más que su deadband.
+
+        integrity_period: cada cuántos segundos reportar igualmente todos los valores
+        de cada grupo (None para no hacerlo).
+        """
+        with self._condition:
+            self.report_by_exception = enabled
+            self.integrity_period = integrity_period
+            now = time.monotonic()
+            for group in self._groups.values():
+                group.report_by_exception = enabled
+                group.integrity_period = integrity_period
+                group.next_integrity = now + (integrity_period or 0.0)
+                group.rebuild()
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """Grupos activos y lecturas que no alcanzaron su período"""
+        with self._condition:
+            buses = {id(bus): bus for bus in (self._bus_of(group.device) for group in self._groups.values())
+                     if bus is not None}
+            return {
+                'groups': len(self._groups),
+                'tags': sum(len(group.tags) for group in self._groups.values()),
+                'overruns': sum(group.overruns for group in self._groups.values()),
+                'suppressed': sum(group.suppressed for group in self._groups.values()),
+                'serial_buses': len(buses),
+            }
+
+    # === CICLO DE SONDEO ===
+
+    def start(self) -> None:
+        """Iniciar el hilo planificador y el pool de lectura"""
+        if self._running:
+            return
+        self._running = True
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                            thread_name_prefix='poll')
+        self._thread = threading.Thread(target=self._run, name='poll-scheduler', daemon=True)
+        self._thread.start()
+        self.logger.info(f"PollScheduler iniciado con {self.max_workers} hilos de lectura")
+
+    def stop(self) -> None:
+        """Detener el sondeo y esperar a las lecturas en curso"""
+        if not self._running:
+            return
+        with self._condition:
+            self._running = False
+            self._condition.notify()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+        if self._executor:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        self._flush()
+        self.logger.info("PollScheduler detenido")
+
+    def _run(self):
+        """Despachar los grupos vencidos y entregar lotes de resultados"""
+        next_flush = time.monotonic() + self.batch_interval
+        while True:
+            due = []
+            with self._condition:
+                if not self._running:
+                    break
+                now = time.monotonic()
+                while self._heap and self._heap[0][0] <= now:
+                    _, _, group = heapq.heappop(self._heap)
+                    if group.active:
+                        due.append(group)
+
+                wait = next_flush - now
+                if self._heap:
+                    wait = min(wait, self._heap[0][0] - now)
+                if not due and wait > 0:
+                    self._condition.wait(wait)
+
+            now = time.monotonic()
+            for group in due:
+                self._dispatch(group, now)
+
+            if now >= next_flush:
+                self._flush()
+                next_flush = now + self.batch_interval
+
+    def _dispatch(self, group: PollGroup, now: float):
+        """Enviar un grupo al pool y reprogramar su siguiente lectura"""
+        if group.busy:
+            # La lectura anterior aún no termina: no acumular otra
+            group.overruns += 1
+        else:
+            device = group.device
+            available = getattr(device, 'is_available', None)
+            if available is None or available():
+                group.busy = True
+                bus = self._bus_of(device)
+                if bus is not None:
+                    # Dispositivo RTU en un bus compartido: el hilo del puerto ejecuta
+                    # el plan completo, y cada puerto avanza en paralelo con los demás
+                    future = bus.submit(self._poll_group, group)
+                    future.add_done_callback(lambda _, group=group: setattr(group, 'busy', False))
+                else:
+                    self._executor.submit(self._poll_group, group)
+
+        # Mantener la cadencia; si hay atraso de más de un período, no recuperar lecturas perdidas
+        group.deadline += group.period
+        if group.deadline < now:
+            group.deadline = now + group.period
+        with self._condition:
+            if group.active:
+                heapq.heappush(self._heap, (group.deadline, next(self._sequence), group))
+
+    @staticmethod
+    def _bus_of(device):
+        """Bus serie compartido del dispositivo (SerialBus) o None si no usa uno"""
+        master = getattr(device, '_master_instance', None)
+        bus = getattr(master, 'bus', None)
+        return bus if hasattr(bus, 'submit') else None
+
+    def _poll_group(self, group: PollGroup):
+        """Leer un grupo en un hilo del pool"""
+        device = group.device
+        device_id = device.device_id
+        try:
+            lock = self._device_locks.get(device_id)
+            if lock is None:
+                return
+            with lock:
+                results = {}
+                integrity = group.integrity_due(time.monotonic())
+                for plan, codec, change_filter in zip(group.plans, group.codecs, group.filters):
+                    if change_filter is None:
+                        if codec is None:
+                            results.update(device.read_plan(plan))
+                        else:
+                            results.update(codec.decode(device.read_plan_blocks(plan)))
+                        continue
+                    if integrity:
+                        change_filter.reset()
+                    blocks = device.read_plan_blocks(plan)
+                    if codec is None:
+                        changed = change_filter.filter_mapping(plan.demultiplex(blocks))
+                    else:
+                        values, valid = codec.decode_vector(blocks)
+                        changed = change_filter.select(values, valid, codec.decode_raw(blocks))
+                    group.suppressed += len(plan.demux) - len(changed)
+                    results.update(changed)
+            if not results:
+                return
+            timestamp = time.time()
+            with self._batch_lock:
+                self._batch.extend((device_id, key, value, timestamp)
+                                   for key, value in results.items())
+        except Exception as e:
+            self.logger.error(f"Error sondeando {device_id}: {e}")
+            self.poll_error.emit(device_id, str(e))
+        finally:
+            group.busy = False
+
+    def _flush(self):
+        """Emitir los resultados acumulados como un único lote"""
+        with self._batch_lock:
+            if not self._batch:
+                return
+            batch = self._batch
+            self._batch = []
+        self.results_ready.emit(batch)
@@ -0,0 +1,209 @@
+# src/core/value_codec.py
+import logging
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from ..protocols.modbus.read_planner import ReadPlan
+
+logger = logging.getLogger(__name__)
+
+# Tipo de dato -> registros de 16 bits que ocupa
+DATA_TYPES = {
+    'uint16': 1,
+    'int16': 1,
+    'uint32': 2,
+    'int32': 2,
+    'float32': 2,
+}
+
+# Orden de palabras de los tipos de 32 bits: 'big' = palabra alta primero (ABCD),
+# 'little' = palabra baja primero (CDAB, habitual en muchos variadores)
+WORD_ORDERS = ('big', 'little')
+
+
+@dataclass
+class ValueSpec:
+    """Cómo convertir los registros de un parámetro a su valor de ingeniería."""
+    key: Any
+    data_type: str = 'uint16'
+    scale: float = 1.0
+    minimum: Optional[float] = None
+    maximum: Optional[float] = None
+    word_order: str = 'big'
+
+    def __post_init__(self):
+        if self.data_type not in DATA_TYPES:
+            raise ValueError(f"Tipo de dato no soportado para {self.key!r}: {self.data_type}")
+        if self.word_order not in WORD_ORDERS:
+            raise ValueError(f"Orden de palabras inválido para {self.key!r}: {self.word_order}")
+
+    @property
+    def size(self) -> int:
+        return DATA_TYPES[self.data_type]
+
+
+def specs_from_template(parametros: Iterable, data_types: Optional[Dict[str, str]] = None,
+                        word_order: str = 'big') -> List[ValueSpec]:
+    """Construir las especificaciones de los parámetros de una plantilla VFD.
+
+    El valor de ingeniería es registro × factor_escala, limitado a [rango_min, rango_max]
+    cuando la plantilla define un rango (rango_max > 0). Sin tipo explícito en
+    data_types, los parámetros con rango negativo se leen como int16 y el resto como uint16.
+    """
+    data_types = data_types or {}
+    specs = []
+    for param in parametros:
+        has_range = bool(param.rango_max) and param.rango_max > 0
+        minimum = param.rango_min if has_range else None
+        data_type = data_types.get(param.nombre_parametro)
+        if data_type is None:
+            data_type = 'int16' if has_range and minimum is not None and minimum < 0 else 'uint16'
+        specs.append(ValueSpec(
+            key=param.nombre_parametro,
+            data_type=data_type,
+            scale=param.factor_escala if param.factor_escala else 1.0,
+            minimum=minimum,
+            maximum=param.rango_max if has_range else None,
+            word_order=word_order,
+        ))
+    return specs
+
+
+class CompiledCodec:
+    """
+    Decodificador compilado para un ReadPlan.
+    Responsabilidad: convertir las respuestas de todos los bloques de un plan en valores
+    de ingeniería con unas pocas operaciones de NumPy, sin aritmética por valor.
+    Los tipos de 16 bits se resuelven en una pasada y los de 32 bits en otra; el orden
+    de palabras queda absorbido en los índices de palabra alta y baja.
+    Las claves del plan sin ValueSpec se entregan crudas, igual que ReadPlan.demultiplex.
+    """
+
+    def __init__(self, plan: ReadPlan, specs: Iterable[ValueSpec]):
+        self.plan = plan
+        counts = [block.count for block in plan.blocks]
+        self._bases = [0]
+        for count in counts:
+            self._bases.append(self._bases[-1] + count)
+        self._total = self._bases[-1]
+
+        specs_by_key = {spec.key: spec for spec in specs}
+        narrow: List[Tuple[ValueSpec, int, int]] = []
+        wide: List[Tuple[ValueSpec, int, int]] = []
+        self._raw: List[Tuple[Any, int, int, int]] = []
+        for key, (block_index, offset, size) in plan.demux.items():
+            spec = specs_by_key.get(key)
+            if spec is None:
+                self._raw.append((key, block_index, offset, size))
+                continue
+            if spec.size > size:
+                raise ValueError(f"El parámetro {key!r} ({spec.data_type}) necesita {spec.size} "
+                                 f"registros y el plan solo lee {size}")
+            entry = (spec, self._bases[block_index] + offset, block_index)
+            (narrow if spec.size == 1 else wide).append(entry)
+
+        self._narrow = np.array([position for _, position, _ in narrow], dtype=np.intp)
+        self._signed = np.array([spec.data_type == 'int16' for spec, _, _ in narrow], dtype=bool)
+        self._high = np.array([position + (spec.word_order == 'little') for spec, position, _ in wide],
+                              dtype=np.intp)
+        self._low = np.array([position + (spec.word_order == 'big') for spec, position, _ in wide],
+                             dtype=np.intp)
+        self._int32 = np.array([spec.data_type == 'int32' for spec, _, _ in wide], dtype=bool)
+        self._float32 = np.array([spec.data_type == 'float32' for spec, _, _ in wide], dtype=bool)
+
+        entries = narrow + wide
+        self.keys: List[Any] = [spec.key for spec, _, _ in entries]
+        self._blocks = np.array([block for _, _, block in entries], dtype=np.intp)
+        self._scale = np.array([spec.scale for spec, _, _ in entries], dtype=np.float64)
+        self._minimum = np.array([-np.inf if spec.minimum is None else spec.minimum
+                                  for spec, _, _ in entries], dtype=np.float64)
+        self._maximum = np.array([np.inf if spec.maximum is None else spec.maximum
+                                  for spec, _, _ in entries], dtype=np.float64)
+        self._any_signed = bool(self._signed.any())
+        self._any_int32 = bool(self._int32.any())
+        self._any_float32 = bool(self._float32.any())
+
+    def assemble(self, block_values: Sequence[Optional[Sequence[int]]]) -> Tuple[np.ndarray, np.ndarray]:
+        """Unir las respuestas en un único vector uint16 y marcar los bloques válidos"""
+        raw = np.zeros(self._total, dtype=np.uint16)
+        valid = np.zeros(len(self.plan.blocks), dtype=bool)
+        for index, (block, values) in enumerate(zip(self.plan.blocks, block_values)):
+            if values is None or len(values) < block.count:
+                continue
+            start = self._bases[index]
+            # array('H') se copia sin conversión; las listas se convierten una sola vez
+            raw[start:start + block.count] = np.asarray(values, dtype=np.uint16)[:block.count]
+            valid[index] = True
+        return raw, valid
+
+    def convert(self, raw: np.ndarray) -> np.ndarray:
+        """Valores de ingeniería alineados con self.keys.
+
+        raw es el vector de registros del plan o una matriz con una fila por lectura
+        (varios dispositivos con la misma plantilla se convierten de una vez).
+        """
+        narrow = raw[..., self._narrow]
+        if self._any_signed:
+            values16 = np.where(self._signed, narrow.view(np.int16), narrow)
+        else:
+            values16 = narrow.astype(np.float64)
+
+        combined = (raw[..., self._high].astype(np.uint32) << 16) | raw[..., self._low]
+        values32 = combined.astype(np.float64)
+        if self._any_int32:
+            values32 = np.where(self._int32, combined.view(np.int32), values32)
+        if self._any_float32:
+            values32 = np.where(self._float32, combined.view(np.float32), values32)
+
+        values = np.concatenate((values16, values32), axis=-1).astype(np.float64, copy=False)
+        values *= self._scale
+        np.clip(values, self._minimum, self._maximum, out=values)
+        return values
+
+    def decode_vector(self, block_values: Sequence[Optional[Sequence[int]]]) -> Tuple[np.ndarray, np.ndarray]:
+        """Valores de ingeniería alineados con self.keys y máscara de lecturas válidas"""
+        raw, valid = self.assemble(block_values)
+        return self.convert(raw), valid[self._blocks]
+
+    def decode_batch(self, readings: Sequence[Sequence[Optional[Sequence[int]]]]) -> Tuple[np.ndarray, np.ndarray]:
+        """Convertir las lecturas de varios dispositivos que comparten este plan.
+
+        Devuelve una matriz (lecturas × claves) y la máscara de valores válidos.
+        """
+        raw = np.zeros((len(readings), self._total), dtype=np.uint16)
+        valid = np.zeros((len(readings), len(self.plan.blocks)), dtype=bool)
+        for row, block_values in enumerate(readings):
+            raw[row], valid[row] = self.assemble(block_values)
+        return self.convert(raw), valid[:, self._blocks]
+
+    def decode(self, block_values: Sequence[Optional[Sequence[int]]]) -> Dict[Any, Any]:
+        """Valor por clave del plan (None si su bloque falló)"""
+        values, valid = self.decode_vector(block_values)
+        results = dict(zip(self.keys, values.tolist()))
+        if not valid.all():
+            for index in np.flatnonzero(~valid).tolist():
+                results[self.keys[index]] = None
+        results.update(self.decode_raw(block_values))
+        return results
+
+    def decode_raw(self, block_values: Sequence[Optional[Sequence[int]]]) -> Dict[Any, Any]:
+        """Valores crudos de las claves del plan sin ValueSpec"""
+        results = {}
+        for key, block_index, offset, size in self._raw:
+            values = block_values[block_index]
+            if values is None or offset + size > len(values):
+                results[key] = None
+            elif size == 1:
+                results[key] = values[offset]
+            else:
+                results[key] = list(values[offset:offset + size])
+        return results
+
+
+def compile_codec(plan: ReadPlan, specs: Iterable[ValueSpec]) -> CompiledCodec:
+    """Compilar el decodificador de un plan de lecturas"""
+    codec = CompiledCodec(plan, specs)
+    logger.debug(f"Codec compilado: {len(codec.keys)} valores en {plan.request_count} bloques")
+    return codec
@@ -51,7 +51,7 @@ class ExpertMode(QWidget):
         right_title = QLabel("Monitoreo y Diagnóstico")
         right_title.setFont(QFont("Arial", 12, QFont.Bold))
         
-        self.data_monitor = DataMonitor()
+        self.data_monitor = DataMonitor(self.communication_engine)
         self.log_viewer = LogViewer()
         
         right_panel.addWidget(right_title)
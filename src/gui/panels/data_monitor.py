@@ -1,20 +1,61 @@
 from PySide6.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QLabel, 
-    QPushButton, QFrame, QTableWidget, QTableWidgetItem,
+    QPushButton, QFrame, QTableView,
     QHeaderView, QComboBox, QSpinBox, QGroupBox, QSizePolicy
 )
 from PySide6.QtCore import Signal, Qt, QTimer
 from PySide6.QtGui import QIcon, QFont
 import random
 
+from ...core.poll_scheduler import register_key
+from .register_table_model import RegisterTableModel, latest_values
+
+
+def _register_rows(device):
+    """Filas del modelo para los registros asociados a un dispositivo"""
+    return [{'key': register_key(register),
+             'name': register.get('name') or register_key(register),
+             'function': register.get('function', ''),
+             'address': register.get('address', '')}
+            for register in getattr(device, 'registers', None) or []]
+
+
+def _setup_table_view(view, model):
+    """Tabla de solo lectura con filas de alto fijo (sin medir cada fila)"""
+    view.setModel(model)
+    view.horizontalHeader().setStretchLastSection(True)
+    view.verticalHeader().setVisible(False)
+    view.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+    view.verticalHeader().setDefaultSectionSize(22)
+    view.setEditTriggers(QTableView.NoEditTriggers)
+    view.setSelectionBehavior(QTableView.SelectRows)
+
 
 class DataMonitor(QFrame):
-    """Monitor de datos para modo experto"""
+    """Monitor de datos para modo experto.
+
+    Con un communication_engine sondea el dispositivo seleccionado al intervalo
+    elegido y muestra sus valores (results_ready): los lotes se acumulan y se
+    aplican al modelo en cada tick del timer, que solo repinta las celdas que
+    cambiaron.
+    """
     
-    def __init__(self):
+    def __init__(self, communication_engine=None):
         super().__init__()
         self.current_device_id = None
+        self.communication_engine = communication_engine
+        # Dispositivo cuyo sondeo inició este monitor y dueño de sus grupos de
+        # sondeo: al detenerlo no se tocan los tags de otros consumidores
+        self._polled_device_id = None
+        self._poll_owner = f"DataMonitor-{id(self)}"
+        # Último valor recibido por clave desde el tick anterior
+        self._pending = {}
+        self.model = RegisterTableModel(('address', 'value', 'status'), self)
         self.setup_ui()
+
+        scheduler = getattr(communication_engine, 'poll_scheduler', None)
+        if scheduler is not None:
+            scheduler.results_ready.connect(self.on_results)
         
         # Timer para actualizar datos
         self.update_timer = QTimer()
@@ -38,11 +79,8 @@ class DataMonitor(QFrame):
         controls_layout.addStretch()
         
         # Tabla de datos
-        self.data_table = QTableWidget()
-        self.data_table.setColumnCount(3)
-        self.data_table.setHorizontalHeaderLabels(["Dirección", "Valor", "Estado"])
-        self.data_table.horizontalHeader().setStretchLastSection(True)
-        self.data_table.verticalHeader().setVisible(False)
+        self.data_table = QTableView()
+        _setup_table_view(self.data_table, self.model)
         self.data_table.setAlternatingRowColors(True)
         self.data_table.setMinimumHeight(200)
         
@@ -80,37 +118,77 @@ class DataMonitor(QFrame):
         
     def set_device(self, device_id):
         """Establecer el dispositivo a monitorear"""
+        self.stop_polling()
         self.current_device_id = device_id
         self.device_label.setText(f"Dispositivo: {device_id}")
+        self._pending = {}
+
+        device = None
+        device_manager = getattr(self.communication_engine, 'device_manager', None)
+        if device_manager is not None:
+            device = device_manager.get_device(device_id)
+        if device is not None:
+            self.model.set_rows(_register_rows(device))
+            self.start_polling()
+        elif self.communication_engine is None:
+            # Sin motor de comunicaciones: filas de demostración con valores simulados
+            self.model.set_rows({'key': i, 'address': i} for i in range(10))
+        else:
+            self.model.clear()
         self.update_data()
+
+    def on_results(self, batch):
+        """Recibir un lote de results_ready: (device_id, clave, valor, timestamp)"""
+        if self.current_device_id:
+            self._pending.update(latest_values(batch, self.current_device_id))
         
     def update_data(self):
-        """Actualizar los datos del dispositivo actual"""
+        """Aplicar al modelo los valores recibidos desde el último refresco"""
         if not self.current_device_id:
             return
-            
-        # Simular datos
-        self.data_table.setRowCount(10)
-        
-        for i in range(10):
-            # Dirección
-            addr_item = QTableWidgetItem(f"{i:04d}")
-            self.data_table.setItem(i, 0, addr_item)
-            
-            # Valor
-            value = random.randint(1000, 5000)
-            value_item = QTableWidgetItem(str(value))
-            self.data_table.setItem(i, 1, value_item)
-            
-            # Estado
-            status = "OK" if i % 5 != 0 else "ALARM"
-            status_item = QTableWidgetItem(status)
-            status_item.setForeground(Qt.GlobalColor.green if status == "OK" else Qt.GlobalColor.red)
-            self.data_table.setItem(i, 2, status_item)
+
+        if self.communication_engine is None:
+            # Simular datos
+            self._pending = {key: random.randint(1000, 5000) for key in self.model.keys()}
+
+        if self._pending:
+            pending, self._pending = self._pending, {}
+            # Los tags que llegan sin fila (p. ej. parámetros de plantilla) se agregan
+            self.model.update_values(pending, add_missing=True)
             
     def update_interval(self, interval):
         """Actualizar intervalo de monitoreo"""
         self.update_timer.setInterval(interval)
+        if self._polled_device_id is not None:
+            # El período de escaneo se fija al agregar los tags: volver a agregarlos
+            self.stop_polling()
+            self.start_polling()
+
+    def start_polling(self):
+        """Sondear el dispositivo actual con el intervalo elegido"""
+        started = False
+        if self.communication_engine is not None and self.current_device_id:
+            started = self.communication_engine.start_polling(
+                self.current_device_id, self.interval_spin.value() / 1000.0, self._poll_owner)
+        if started:
+            self._polled_device_id = self.current_device_id
+        self._show_polling_state(started or self.communication_engine is None)
+        return started
+
+    def stop_polling(self):
+        """Dejar de sondear el dispositivo que se estaba monitoreando"""
+        if self._polled_device_id is not None:
+            self.communication_engine.stop_polling(self._polled_device_id, self._poll_owner)
+            self._polled_device_id = None
+            self._show_polling_state(False)
+
+    def _show_polling_state(self, active):
+        if active:
+            self.polling_check.setText("Monitoreo continuo: Activo")
+            self.polling_check.setStyleSheet("color: green;")
+        else:
+            self.polling_check.setText("Monitoreo continuo: Inactivo")
+            self.polling_check.setStyleSheet("color: gray;")
 
 
 class SimpleDataMonitor(QFrame):
@@ -120,6 +198,7 @@ class SimpleDataMonitor(QFrame):
         super().__init__()
         self.current_device_id = None
         self._current_device_obj = None
+        self.registers_model = RegisterTableModel(('function', 'address'), self)
         self.setup_ui()
         
         # Timer para actualizar datos
@@ -168,11 +247,8 @@ class SimpleDataMonitor(QFrame):
         self.data_panel.setLayout(data_layout)
         
         # Lista de registros (para dispositivos que tengan registros asociados)
-        self.registers_list = QTableWidget()
-        self.registers_list.setColumnCount(2)
-        self.registers_list.setHorizontalHeaderLabels(["Función", "Dirección"])
-        self.registers_list.horizontalHeader().setStretchLastSection(True)
-        self.registers_list.verticalHeader().setVisible(False)
+        self.registers_list = QTableView()
+        _setup_table_view(self.registers_list, self.registers_model)
         self.registers_list.setMinimumHeight(120)
         
         # Estado
@@ -211,25 +287,20 @@ class SimpleDataMonitor(QFrame):
 
         self.device_label.setText(f"Monitoreando: {self.current_device_id}")
         self.status_label.setText("Estado: Monitoreando...")
+        # La lista de registros se arma una sola vez por dispositivo
+        if self._current_device_obj is not None:
+            self.registers_model.set_rows(_register_rows(self._current_device_obj))
+        else:
+            self.registers_model.clear()
         self.update_data()
-        
+
     def update_data(self):
         """Actualizar los datos del dispositivo actual"""
         if not self.current_device_id:
             return
-            
+
         # Si hay un objeto device asociado, mostrar sus registros
         if self._current_device_obj is not None:
-            device = self._current_device_obj
-            regs = getattr(device, 'registers', []) or []
-            # Rellenar tabla de registros
-            self.registers_list.setRowCount(len(regs))
-            for i, reg in enumerate(regs):
-                func_item = QTableWidgetItem(str(reg.get('function', '')))
-                addr_item = QTableWidgetItem(str(reg.get('address', '')))
-                self.registers_list.setItem(i, 0, func_item)
-                self.registers_list.setItem(i, 1, addr_item)
-
             # Mostrar valores simulados en las etiquetas principales
             temp = random.uniform(20.0, 80.0)
             pressure = random.uniform(10.0, 100.0)
@@ -244,8 +315,7 @@ class SimpleDataMonitor(QFrame):
             )
             return
 
-        # Comportamiento por defecto si no hay objeto device: limpiar registros y mostrar simulación
-        self.registers_list.setRowCount(0)
+        # Comportamiento por defecto si no hay objeto device: mostrar simulación
         temp = random.uniform(20.0, 80.0)
         pressure = random.uniform(10.0, 100.0)
         flow = random.uniform(0.0, 50.0)
@@ -1,105 +1,226 @@
 from PySide6.QtWidgets import (
-    QWidget, QVBoxLayout, QHBoxLayout, QLabel, 
-    QPushButton, QFrame, QTextEdit, QComboBox,
+    QWidget, QVBoxLayout, QHBoxLayout, QLabel,
+    QPushButton, QFrame, QListView, QComboBox,
     QGroupBox, QCheckBox
 )
-from PySide6.QtCore import Signal, Qt, QDateTime
-from PySide6.QtGui import QTextCursor, QFont, QColor
+from PySide6.QtCore import Signal, Qt, QAbstractListModel, QModelIndex, QTimer
+from PySide6.QtGui import QFont, QColor
+import time
+from bisect import bisect_left
+
+from ...core.log_store import get_default_log_store
+
+# Refrescos por segundo como máximo: los logs se agregan a la vista en lotes
+MAX_REFRESH_RATE = 30
+
+# Nivel mínimo de cada opción del combo
+LEVEL_FILTERS = {
+    "Todos": None,
+    "INFO": "INFO",
+    "WARNING": "WARNING",
+    "ERROR": "ERROR",
+}
+
+_LEVEL_COLORS = {
+    "DEBUG": QColor(Qt.GlobalColor.gray),
+    "WARNING": QColor(255, 165, 0),  # Naranja
+    "ERROR": QColor(Qt.GlobalColor.red),
+    "CRITICAL": QColor(Qt.GlobalColor.red),
+}
+
+
+class LogListModel(QAbstractListModel):
+    """Secuencias del LogStore que cumplen el filtro; el texto se arma solo para las filas visibles"""
+
+    def __init__(self, store, parent=None):
+        super().__init__(parent)
+        self.store = store
+        self.min_level = None
+        self.device = None
+        self._seqs = []
+        self._last_seq = store.last_seq
+
+    def set_filter(self, min_level=None, device=None):
+        """Cambiar el filtro y volver a consultar el almacén"""
+        self.min_level = min_level
+        self.device = device
+        self.beginResetModel()
+        last = self.store.last_seq
+        self._seqs = list(self.store.query(min_level=min_level, device=device))
+        self._advance(last, self._seqs)
+        self.endResetModel()
+
+    def _advance(self, last, seqs):
+        """Marcar como vistas las entradas hasta `last` y las devueltas por la consulta.
+
+        `last` se lee antes de consultar: una entrada que llegue entre ambos
+        pasos ya viene en `seqs` y no debe volver a pedirse en el siguiente refresco.
+        """
+        self._last_seq = max(last, seqs[-1]) if seqs else last
+
+    def refresh(self):
+        """Agregar en un solo lote las entradas nuevas y quitar las descartadas; True si hubo cambios"""
+        changed = False
+        oldest = self.store.oldest_seq
+        if self._seqs and self._seqs[0] < oldest:
+            # Las entradas descartadas por el anillo siempre son las primeras filas
+            count = bisect_left(self._seqs, oldest)
+            self.beginRemoveRows(QModelIndex(), 0, count - 1)
+            del self._seqs[:count]
+            self.endRemoveRows()
+            changed = True
+
+        last = self.store.last_seq
+        if last == self._last_seq:
+            return changed
+        new = list(self.store.query(min_level=self.min_level, device=self.device, after=self._last_seq))
+        self._advance(last, new)
+        if new:
+            first = len(self._seqs)
+            self.beginInsertRows(QModelIndex(), first, first + len(new) - 1)
+            self._seqs.extend(new)
+            self.endInsertRows()
+            changed = True
+        return changed
+
+    def clear(self):
+        self.beginResetModel()
+        self._seqs = []
+        self._last_seq = self.store.last_seq
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._seqs)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        if role not in (Qt.ItemDataRole.DisplayRole, Qt.ItemDataRole.ForegroundRole):
+            return None
+        entry = self.store.entry(self._seqs[index.row()])
+        if entry is None:
+            return None
+        if role == Qt.ItemDataRole.ForegroundRole:
+            return _LEVEL_COLORS.get(entry.level_name)
+        timestamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(entry.timestamp))
+        # Formato: [timestamp] [LEVEL] [source] message
+        return f"[{timestamp}] [{entry.level_name}] [{entry.source}] {entry.message}"
 
 
 class LogViewer(QFrame):
-    """Visor de logs para modo experto - Ahora hereda de QFrame"""
-    
-    def __init__(self):
+    """Visor de logs para modo experto - Ahora hereda de QFrame.
+
+    Los mensajes se guardan en un LogStore acotado (por defecto el compartido,
+    que también recibe las trazas Modbus); la vista es virtual y se actualiza en
+    lotes a lo sumo MAX_REFRESH_RATE veces por segundo.
+    """
+
+    def __init__(self, log_store=None):
         super().__init__()
         self.current_device_id = None
+        if log_store is None:
+            log_store = get_default_log_store()
+            # Las trazas de masters y slaves Modbus también se muestran en el visor
+            log_store.attach_trace_hub()
+        self.store = log_store
+        self.model = LogListModel(self.store, self)
         self.setup_ui()
-        
+
         # Establecer estilo de frame
         self.setFrameStyle(QFrame.StyledPanel | QFrame.Raised)
-        
+
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.timeout.connect(self.refresh)
+        self.refresh_timer.start(1000 // MAX_REFRESH_RATE)
+
     def setup_ui(self):
         layout = QVBoxLayout(self)
-        
+
         # Título
         title = QLabel("Visor de Logs")
         title.setStyleSheet("font-weight: bold; font-size: 12px;")
-        
+
         # Controles
         controls_layout = QHBoxLayout()
-        
+
         self.device_label = QLabel("Dispositivo: Todos")
         self.device_label.setFont(QFont("Arial", 10, QFont.Bold))
-        
+
         self.log_level_combo = QComboBox()
-        self.log_level_combo.addItems(["Todos", "INFO", "WARNING", "ERROR"])
-        
+        self.log_level_combo.addItems(list(LEVEL_FILTERS))
+        self.log_level_combo.currentTextChanged.connect(self.apply_filter)
+
+        self.device_only_check = QCheckBox("Solo este dispositivo")
+        self.device_only_check.toggled.connect(self.apply_filter)
+
         self.auto_scroll_check = QCheckBox("Auto-scroll")
         self.auto_scroll_check.setChecked(True)
-        
+
         self.clear_btn = QPushButton("Limpiar")
         self.clear_btn.clicked.connect(self.clear_logs)
-        
+
         controls_layout.addWidget(self.device_label)
         controls_layout.addStretch()
         controls_layout.addWidget(QLabel("Nivel:"))
         controls_layout.addWidget(self.log_level_combo)
+        controls_layout.addWidget(self.device_only_check)
         controls_layout.addWidget(self.auto_scroll_check)
         controls_layout.addWidget(self.clear_btn)
-        
-        # Área de logs
-        self.log_text = QTextEdit()
-        self.log_text.setReadOnly(True)
+
+        # Área de logs: solo se pintan las filas visibles
+        self.log_view = QListView()
+        self.log_view.setModel(self.model)
+        self.log_view.setUniformItemSizes(True)
+        self.log_view.setEditTriggers(QListView.NoEditTriggers)
+        self.log_view.setSelectionMode(QListView.ExtendedSelection)
         font = QFont("Courier New", 9)
-        self.log_text.setFont(font)
-        
+        self.log_view.setFont(font)
+
         # Agregar widgets al layout
         layout.addWidget(title)
         layout.addLayout(controls_layout)
-        layout.addWidget(self.log_text)
-        
+        layout.addWidget(self.log_view)
+
         # Logs iniciales
         self.add_log("INFO", "Sistema iniciado", "system")
         self.add_log("INFO", "Visor de logs listo", "log_viewer")
-        
+        self.apply_filter()
+
     def set_device(self, device_id):
         """Establecer el dispositivo a monitorear"""
         self.current_device_id = device_id
         if device_id:
             self.device_label.setText(f"Dispositivo: {device_id}")
-            self.add_log("INFO", f"Monitoreando dispositivo: {device_id}", "log_viewer")
+            self.add_log("INFO", f"Monitoreando dispositivo: {device_id}", "log_viewer", device_id)
         else:
             self.device_label.setText("Dispositivo: Todos")
-            
-    def add_log(self, level, message, source="system"):
-        """Agregar un mensaje al log"""
-        timestamp = QDateTime.currentDateTime().toString("yyyy-MM-dd hh:mm:ss")
-        
-        # Formato: [timestamp] [LEVEL] [source] message
-        log_entry = f"[{timestamp}] [{level}] [{source}] {message}\n"
-        
-        # Colorear según nivel
-        color_map = {
-            "INFO": Qt.GlobalColor.black,
-            "WARNING": QColor(255, 165, 0),  # Naranja
-            "ERROR": Qt.GlobalColor.red
-        }
-        color = color_map.get(level, Qt.GlobalColor.black)
-        
-        self.log_text.moveCursor(QTextCursor.End)
-        self.log_text.setTextColor(color)
-        self.log_text.insertPlainText(log_entry)
-        
-        # Auto-scroll si está habilitado
+        if self.device_only_check.isChecked():
+            self.apply_filter()
+
+    def apply_filter(self, *args):
+        """Volver a filtrar el almacén con el nivel y el dispositivo seleccionados"""
+        min_level = LEVEL_FILTERS.get(self.log_level_combo.currentText())
+        device = self.current_device_id if self.device_only_check.isChecked() else None
+        self.model.set_filter(min_level, device)
         if self.auto_scroll_check.isChecked():
-            self.log_text.moveCursor(QTextCursor.End)
-            
+            self.log_view.scrollToBottom()
+
+    def add_log(self, level, message, source="system", device_id=None):
+        """Agregar un mensaje al log (seguro desde cualquier hilo; se muestra en el próximo refresco)"""
+        self.store.append(level, message, source, device_id)
+
+    def refresh(self):
+        """Mostrar en un lote los mensajes llegados desde el refresco anterior"""
+        if self.model.refresh() and self.auto_scroll_check.isChecked():
+            self.log_view.scrollToBottom()
+
     def clear_logs(self):
         """Limpiar el visor de logs"""
-        self.log_text.clear()
+        self.store.clear()
+        self.model.clear()
         self.add_log("INFO", "Logs limpiados", "log_viewer")
-        
+
     def log_connection(self, device_id, connected):
         """Registrar evento de conexión/desconexión"""
         status = "conectado" if connected else "desconectado"
-        self.add_log("INFO", f"Dispositivo {device_id} {status}", "connection")
\ No newline at end of file
+        self.add_log("INFO", f"Dispositivo {device_id} {status}", "connection", device_id)
@@ -0,0 +1,201 @@
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from PySide6.QtCore import QAbstractTableModel, QModelIndex, Qt
+from PySide6.QtGui import QColor
+
+# Columnas disponibles: (campo, encabezado)
+COLUMNS = {
+    'name': "Nombre",
+    'function': "Función",
+    'address': "Dirección",
+    'value': "Valor",
+    'status': "Estado",
+}
+
+# Tramos de filas a partir de los cuales se emite un único dataChanged
+MAX_CHANGED_RANGES = 16
+
+STATUS_OK = "OK"
+STATUS_ERROR = "SIN RESPUESTA"
+STATUS_PENDING = "--"
+
+_STATUS_COLORS = {
+    STATUS_OK: QColor(Qt.GlobalColor.darkGreen),
+    STATUS_ERROR: QColor(Qt.GlobalColor.red),
+}
+
+
+def format_value(value: Any) -> str:
+    """Texto de un valor leído (None = sin respuesta)"""
+    if value is None:
+        return "--"
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    if isinstance(value, float):
+        return f"{value:.6g}"
+    if isinstance(value, (list, tuple)):
+        return " ".join(str(item) for item in value)
+    return str(value)
+
+
+class RegisterTableModel(QAbstractTableModel):
+    """
+    Modelo de tabla de registros monitoreados.
+    Responsabilidad: guardar el texto ya formateado de cada celda y aplicar lotes
+    de valores (como los de PollScheduler.results_ready) emitiendo dataChanged
+    solo para las filas cuyo valor cambió, agrupadas en rangos contiguos.
+    La vista pinta únicamente las filas visibles, así que el costo de un
+    refresco depende de cuántos valores cambiaron y no del total de registros.
+    """
+
+    def __init__(self, columns: Sequence[str] = ('address', 'value', 'status'), parent=None):
+        super().__init__(parent)
+        self.columns = list(columns)
+        self._headers = [COLUMNS[column] for column in self.columns]
+        self._value_column = self.columns.index('value') if 'value' in self.columns else None
+        self._status_column = self.columns.index('status') if 'status' in self.columns else None
+        # Columnas afectadas por un cambio de valor (rango de dataChanged)
+        changing = [c for c in (self._value_column, self._status_column) if c is not None]
+        self._first_changing = min(changing) if changing else None
+        self._last_changing = max(changing) if changing else None
+
+        self._keys: List[Any] = []
+        self._row_of: Dict[Any, int] = {}
+        # Texto fijo por fila (nombre, función, dirección) y estado variable
+        self._static: List[Dict[str, str]] = []
+        self._values: List[Any] = []
+        self._text: List[str] = []
+        self._status: List[str] = []
+
+    # === FILAS ===
+
+    def set_rows(self, rows: Iterable[Dict[str, Any]]) -> None:
+        """Reemplazar los registros mostrados: dicts con 'key' y opcionalmente
+        'name', 'function' y 'address'. Solo aquí se reinicia el modelo."""
+        self.beginResetModel()
+        self._keys, self._row_of, self._static = [], {}, []
+        self._values, self._text, self._status = [], [], []
+        for row in rows:
+            self._append(row)
+        self.endResetModel()
+
+    def add_rows(self, rows: Iterable[Dict[str, Any]]) -> None:
+        """Agregar registros al final (los que ya existen se ignoran)"""
+        rows = [row for row in rows if row['key'] not in self._row_of]
+        if not rows:
+            return
+        first = len(self._keys)
+        self.beginInsertRows(QModelIndex(), first, first + len(rows) - 1)
+        for row in rows:
+            self._append(row)
+        self.endInsertRows()
+
+    def _append(self, row: Dict[str, Any]) -> None:
+        key = row['key']
+        self._row_of[key] = len(self._keys)
+        self._keys.append(key)
+        address = row.get('address', '')
+        self._static.append({
+            'name': str(row.get('name', key)),
+            'function': str(row.get('function', '')),
+            'address': f"{address:04d}" if isinstance(address, int) else str(address),
+        })
+        self._values.append(None)
+        self._text.append(format_value(None))
+        self._status.append(STATUS_PENDING)
+
+    def clear(self) -> None:
+        self.set_rows([])
+
+    def keys(self) -> List[Any]:
+        return list(self._keys)
+
+    def value(self, key: Any) -> Any:
+        row = self._row_of.get(key)
+        return self._values[row] if row is not None else None
+
+    # === VALORES ===
+
+    def update_values(self, values: Dict[Any, Any], add_missing: bool = False) -> int:
+        """Aplicar valores clave -> valor; devuelve cuántas filas cambiaron.
+
+        Con add_missing, las claves desconocidas se agregan como filas nuevas.
+        """
+        if add_missing:
+            self.add_rows({'key': key} for key in values if key not in self._row_of)
+
+        row_of = self._row_of
+        changed_rows = []
+        for key, value in values.items():
+            row = row_of.get(key)
+            if row is None:
+                continue
+            status = STATUS_ERROR if value is None else STATUS_OK
+            if self._status[row] == status and self._values[row] == value:
+                continue
+            self._values[row] = value
+            self._text[row] = format_value(value)
+            self._status[row] = status
+            changed_rows.append(row)
+
+        if changed_rows and self._first_changing is not None:
+            self._emit_changed(changed_rows)
+        return len(changed_rows)
+
+    def _emit_changed(self, rows: List[int]) -> None:
+        """Un dataChanged por cada tramo de filas consecutivas.
+
+        Con muchos tramos dispersos se emite uno solo del primero al último: la
+        vista repinta igualmente solo las filas visibles y cada emisión tiene costo.
+        """
+        rows.sort()
+        roles = [Qt.ItemDataRole.DisplayRole, Qt.ItemDataRole.ForegroundRole]
+        ranges = []
+        start = previous = rows[0]
+        for row in rows[1:]:
+            if row != previous + 1:
+                ranges.append((start, previous))
+                if len(ranges) >= MAX_CHANGED_RANGES:
+                    ranges = [(rows[0], rows[-1])]
+                    break
+                start = row
+            previous = row
+        else:
+            ranges.append((start, previous))
+        for first, last in ranges:
+            self.dataChanged.emit(self.index(first, self._first_changing),
+                                  self.index(last, self._last_changing), roles)
+
+    # === INTERFAZ QAbstractTableModel ===
+
+    def rowCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self._keys)
+
+    def columnCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self.columns)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        row, column = index.row(), index.column()
+        if role == Qt.ItemDataRole.DisplayRole:
+            if column == self._value_column:
+                return self._text[row]
+            if column == self._status_column:
+                return self._status[row]
+            return self._static[row][self.columns[column]]
+        if role == Qt.ItemDataRole.ForegroundRole and column == self._status_column:
+            return _STATUS_COLORS.get(self._status[row])
+        if role == Qt.ItemDataRole.TextAlignmentRole and column == self._value_column:
+            return int(Qt.AlignRight | Qt.AlignVCenter)
+        return None
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.DisplayRole and orientation == Qt.Orientation.Horizontal:
+            return self._headers[section]
+        return None
+
+
+def latest_values(batch: Iterable[Tuple[str, Any, Any, float]], device_id: Optional[str]) -> Dict[Any, Any]:
+    """Último valor por clave de un lote de results_ready para un dispositivo"""
+    return {key: value for batch_device, key, value, _ in batch if batch_device == device_id}
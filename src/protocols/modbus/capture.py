@@ -0,0 +1,434 @@
+#!/usr/bin/env python3
+"""
+Capturas binarias de tramas Modbus - Implementación limpia para ComSuite
+Formato compacto de solo anexado para dejar la captura siempre activa:
+- cabecera de 32 bytes: firma, versión, hora de creación y origen monotónico
+- un registro por trama: marca en ns del reloj de la captura, dispositivo,
+  dirección, longitud y la ADU tal como viajó (MBAP o RTU con CRC)
+- el reloj de la captura es el monotónico de la sesión que la creó; al
+  reanudarla (p. ej. tras reiniciar el equipo) las marcas se alinean por la
+  hora de reloj, de modo que siguen creciendo y wall_time() sigue siendo válido
+- los nombres de dispositivo se declaran una vez con registros de definición
+El escritor anexa sobre un archivo mapeado en memoria que crece por tramos; el
+lector mapea el archivo y usa un índice por bloques (tiempo y dispositivos) para
+buscar en capturas de varios GB sin cargarlas en memoria.
+"""
+
+import bisect
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+from typing import NamedTuple
+
+MAGIC = b'CSCAP\x00\x01\x00'
+VERSION = 1
+
+# Cabecera: firma, versión, tamaño de cabecera, hora de creación (epoch), origen monotónico (ns)
+_FILE_HEADER = struct.Struct('<8sHH4xdq')
+FILE_HEADER_SIZE = 32
+
+# Registro: marca monotónica (ns), dispositivo, dirección, flags, longitud de datos
+_RECORD_HEADER = struct.Struct('<qHBBH')
+RECORD_HEADER_SIZE = _RECORD_HEADER.size
+
+# Todo registro escrito lleva este bit: una cabecera en cero marca el final de los datos
+FLAG_VALID = 0x80
+
+DIRECTION_CODES = {'ENVIADO': 0, 'RECIBIDO': 1}
+DIRECTION_NAMES = {code: name for name, code in DIRECTION_CODES.items()}
+
+# Dirección reservada para los registros que declaran el nombre de un dispositivo
+_DEVICE_DEFINITION = 0xFF
+
+# Tramos en que crece el archivo del escritor
+DEFAULT_CHUNK_SIZE = 64 * 1024 * 1024
+
+# Registros por bloque del índice
+INDEX_BLOCK_RECORDS = 4096
+
+INDEX_SUFFIX = '.idx'
+
+
+class CaptureRecord(NamedTuple):
+    """Una trama capturada"""
+    timestamp: float  # Segundos del reloj de la captura (ver wall_time)
+    device: str
+    direction: str
+    data: bytes
+
+
+class _IndexBlock:
+    """Bloque de registros consecutivos: posición, primera marca de tiempo y dispositivos presentes"""
+
+    __slots__ = ('offset', 'first_ns', 'count', 'devices')
+
+    def __init__(self, offset, first_ns):
+        self.offset = offset
+        self.first_ns = first_ns
+        self.count = 0
+        self.devices = set()
+
+    def to_json(self):
+        return [self.offset, self.first_ns, self.count, sorted(self.devices)]
+
+    @classmethod
+    def from_json(cls, item):
+        block = cls(item[0], item[1])
+        block.count = item[2]
+        block.devices = set(item[3])
+        return block
+
+
+def _scan(buffer, start, end, devices, blocks):
+    """Recorrer registros desde start; completa devices y blocks y devuelve el final de los datos"""
+    offset = start
+    unpack_from = _RECORD_HEADER.unpack_from
+    block = blocks[-1] if blocks else None
+    while offset + RECORD_HEADER_SIZE <= end:
+        timestamp_ns, device, direction, flags, length = unpack_from(buffer, offset)
+        if not flags & FLAG_VALID or offset + RECORD_HEADER_SIZE + length > end:
+            break
+        payload = offset + RECORD_HEADER_SIZE
+        if direction == _DEVICE_DEFINITION:
+            devices[device] = bytes(buffer[payload:payload + length]).decode('utf-8')
+        else:
+            if block is None or block.count >= INDEX_BLOCK_RECORDS:
+                block = _IndexBlock(offset, timestamp_ns)
+                blocks.append(block)
+            block.count += 1
+            block.devices.add(device)
+        offset = payload + length
+    return offset
+
+
+def _last_timestamp(buffer, start, end):
+    """Marca del último registro entre start y end (datos ya validados por _scan)"""
+    last = None
+    unpack_from = _RECORD_HEADER.unpack_from
+    while start < end:
+        last, _, _, _, length = unpack_from(buffer, start)
+        start += RECORD_HEADER_SIZE + length
+    return last
+
+
+def _read_file_header(buffer, path):
+    if len(buffer) < FILE_HEADER_SIZE:
+        raise ValueError(f"{path} no es una captura ComSuite (archivo demasiado corto)")
+    magic, version, header_size, created, origin_ns = _FILE_HEADER.unpack_from(buffer, 0)
+    if magic != MAGIC or header_size != FILE_HEADER_SIZE:
+        raise ValueError(f"{path} no es una captura ComSuite")
+    if version > VERSION:
+        raise ValueError(f"Versión de captura no soportada: {version}")
+    return created, origin_ns
+
+
+def _load_index(path, data_end):
+    """Índice guardado junto a la captura, o None si no existe o no corresponde"""
+    try:
+        with open(path + INDEX_SUFFIX, 'r', encoding='utf-8') as file:
+            saved = json.load(file)
+    except (OSError, ValueError):
+        return None
+    if saved.get('version') != VERSION or saved.get('data_end') != data_end:
+        return None
+    devices = {int(key): name for key, name in saved['devices'].items()}
+    return devices, [_IndexBlock.from_json(item) for item in saved['blocks']]
+
+
+def _save_index(path, data_end, devices, blocks):
+    try:
+        with open(path + INDEX_SUFFIX, 'w', encoding='utf-8') as file:
+            json.dump({
+                'version': VERSION,
+                'data_end': data_end,
+                'devices': {str(key): name for key, name in devices.items()},
+                'blocks': [block.to_json() for block in blocks],
+            }, file)
+    except OSError:
+        pass  # El índice es solo una caché: el lector puede reconstruirlo
+
+
+class CaptureWriter:
+    """
+    Escritor de capturas de solo anexado sobre un archivo mapeado en memoria.
+    Cada trama se copia directamente al mapa bajo un lock, sin llamadas al
+    sistema salvo cuando el archivo crece un tramo. Seguro entre hilos.
+    """
+
+    def __init__(self, path, append=True, chunk_size=DEFAULT_CHUNK_SIZE):
+        self.path = path
+        self.chunk_size = max(chunk_size, mmap.ALLOCATIONGRANULARITY)
+        self.frames = 0
+        self._lock = threading.Lock()
+        self._devices = {}  # nombre -> id
+        self._blocks = []
+        self._block = None
+        # Diferencia entre el reloj de la captura y time.monotonic_ns() de esta sesión
+        self._shift_ns = 0
+
+        exists = append and os.path.exists(path) and os.path.getsize(path) > 0
+        self._file = open(path, 'r+b' if exists else 'w+b')
+        if exists:
+            self._resume()
+        else:
+            self.created = time.time()
+            self.origin_ns = time.monotonic_ns()
+            self._file.truncate(self.chunk_size)
+            self._map = mmap.mmap(self._file.fileno(), self.chunk_size)
+            _FILE_HEADER.pack_into(self._map, 0, MAGIC, VERSION, FILE_HEADER_SIZE,
+                                   self.created, self.origin_ns)
+            self._offset = FILE_HEADER_SIZE
+
+    def _resume(self):
+        """Continuar una captura existente a partir de su último registro válido"""
+        size = os.path.getsize(self.path)
+        self._map = mmap.mmap(self._file.fileno(), size)
+        self.created, self.origin_ns = _read_file_header(self._map, self.path)
+        devices = {}
+        self._offset = _scan(self._map, FILE_HEADER_SIZE, size, devices, self._blocks)
+        self._devices = {name: device for device, name in devices.items()}
+        self.frames = sum(block.count for block in self._blocks)
+        self._block = self._blocks[-1] if self._blocks else None
+
+        # El reloj monotónico de esta sesión no continúa el de la que creó la
+        # captura (tras un reinicio vuelve a empezar): alinear por hora de reloj
+        # y, si el reloj retrocedió, seguir justo después del último registro
+        now_ns = time.monotonic_ns()
+        expected = self.origin_ns + int((time.time() - self.created) * 1e9)
+        last = _last_timestamp(self._map, self._block.offset if self._block else FILE_HEADER_SIZE, self._offset)
+        if last is not None:
+            expected = max(expected, last + 1)
+        self._shift_ns = expected - now_ns
+        # Los restos de un registro a medio escribir (cierre abrupto) se descartan
+        tail = min(size, self._offset + RECORD_HEADER_SIZE + 0xFFFF)
+        self._map[self._offset:tail] = bytes(tail - self._offset)
+
+    @property
+    def closed(self):
+        return self._map is None
+
+    @property
+    def size(self):
+        """Bytes de datos escritos (cabecera incluida)"""
+        return self._offset
+
+    def device_id(self, name):
+        """Identificador compacto de un dispositivo, declarándolo si es nuevo"""
+        device = self._devices.get(name)
+        if device is None:
+            with self._lock:
+                if self._map is None:
+                    raise ValueError(f"La captura {self.path} está cerrada")
+                device = self._devices.get(name)
+                if device is None:
+                    device = len(self._devices)
+                    if device >= 0xFFFF:
+                        raise ValueError("Demasiados dispositivos en una captura")
+                    encoded = str(name).encode('utf-8')
+                    self._append(time.monotonic_ns() + self._shift_ns, device, _DEVICE_DEFINITION, encoded)
+                    self._devices[name] = device
+        return device
+
+    def write(self, device, direction, data, timestamp_ns=None):
+        """Anexar una trama; device es un id de device_id() o un nombre.
+
+        timestamp_ns, si se indica, es del reloj time.monotonic_ns() de este proceso.
+        """
+        if not isinstance(device, int):
+            device = self.device_id(device)
+        code = DIRECTION_CODES[direction] if isinstance(direction, str) else direction
+        with self._lock:
+            if self._map is None:
+                return
+            if timestamp_ns is None:
+                timestamp_ns = time.monotonic_ns()  # Dentro del lock: marcas crecientes
+            timestamp_ns += self._shift_ns
+            block = self._block
+            if block is None or block.count >= INDEX_BLOCK_RECORDS:
+                block = self._block = _IndexBlock(self._offset, timestamp_ns)
+                self._blocks.append(block)
+            block.count += 1
+            block.devices.add(device)
+            self._append(timestamp_ns, device, code, data)
+            self.frames += 1
+
+    def _append(self, timestamp_ns, device, code, data):
+        length = len(data)
+        end = self._offset + RECORD_HEADER_SIZE + length
+        if end > len(self._map):
+            self._grow(end)
+        _RECORD_HEADER.pack_into(self._map, self._offset, timestamp_ns, device, code, FLAG_VALID, length)
+        self._map[self._offset + RECORD_HEADER_SIZE:end] = data
+        self._offset = end
+
+    def _grow(self, needed):
+        """Extender el archivo un tramo y volver a mapearlo"""
+        size = len(self._map)
+        while size < needed:
+            size += self.chunk_size
+        self._map.flush()
+        self._map.close()
+        self._file.truncate(size)
+        self._map = mmap.mmap(self._file.fileno(), size)
+
+    def flush(self):
+        """Forzar a disco lo escrito hasta ahora"""
+        with self._lock:
+            if self._map is not None:
+                self._map.flush()
+
+    def close(self):
+        """Recortar el archivo a los datos escritos y guardar el índice"""
+        with self._lock:
+            if self._map is None:
+                return
+            self._map.flush()
+            self._map.close()
+            self._map = None
+            self._file.truncate(self._offset)
+            self._file.close()
+            devices = {device: name for name, device in self._devices.items()}
+            _save_index(self.path, self._offset, devices, self._blocks)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class CaptureReader:
+    """
+    Lector indexado de capturas.
+    El archivo se mapea en memoria y solo se leen los registros pedidos: la
+    búsqueda por tiempo salta directamente al bloque que la contiene y el filtro
+    por dispositivo omite los bloques en los que no aparece.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'rb')
+        size = os.path.getsize(path)
+        self._map = mmap.mmap(self._file.fileno(), size, access=mmap.ACCESS_READ) if size else b''
+        self.created, self.origin_ns = _read_file_header(self._map, path)
+
+        # Con la captura cerrada el índice guardado evita recorrer el archivo
+        saved = _load_index(path, size)
+        if saved is not None:
+            self.devices, self._blocks = saved
+            self._data_end = size
+        else:
+            self.devices, self._blocks = {}, []
+            self._data_end = _scan(self._map, FILE_HEADER_SIZE, size, self.devices, self._blocks)
+        self._device_ids = {name: device for device, name in self.devices.items()}
+        self._block_times = [block.first_ns for block in self._blocks]
+
+    def __len__(self):
+        return sum(block.count for block in self._blocks)
+
+    def __iter__(self):
+        return self.read()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if isinstance(self._map, mmap.mmap):
+            self._map.close()
+        self._file.close()
+
+    def save_index(self):
+        """Guardar el índice junto a la captura para abrirla al instante la próxima vez"""
+        _save_index(self.path, self._data_end, self.devices, self._blocks)
+
+    def time_range(self):
+        """(primera, última) marca de tiempo en segundos del reloj de la captura, o None si está vacía"""
+        if not self._blocks:
+            return None
+        last = None
+        for record in self._records(self._blocks[-1].offset, None, None, None, None):
+            last = record.timestamp
+        return self._blocks[0].first_ns / 1e9, last
+
+    def wall_time(self, timestamp):
+        """Hora de reloj (epoch) de una marca de la captura"""
+        return self.created + (timestamp - self.origin_ns / 1e9)
+
+    def read(self, start=None, end=None, device=None, direction=None):
+        """Tramas con start <= timestamp < end (segundos del reloj de la captura), de un dispositivo y dirección"""
+        device_id = None
+        if device is not None:
+            device_id = self._device_ids.get(device)
+            if device_id is None:
+                return
+        code = DIRECTION_CODES[direction] if direction is not None else None
+        start_ns = int(start * 1e9) if start is not None else None
+        end_ns = int(end * 1e9) if end is not None else None
+
+        first = 0
+        if start_ns is not None:
+            first = max(0, bisect.bisect_right(self._block_times, start_ns) - 1)
+        for index in range(first, len(self._blocks)):
+            block = self._blocks[index]
+            if end_ns is not None and block.first_ns >= end_ns:
+                return
+            if device_id is not None and device_id not in block.devices:
+                continue
+            limit = self._blocks[index + 1].offset if index + 1 < len(self._blocks) else self._data_end
+            yield from self._records(block.offset, limit, start_ns, end_ns, device_id, code)
+
+    def _records(self, offset, limit, start_ns, end_ns, device_id, code=None):
+        limit = self._data_end if limit is None else limit
+        unpack_from = _RECORD_HEADER.unpack_from
+        buffer = self._map
+        devices = self.devices
+        while offset < limit:
+            timestamp_ns, device, direction, flags, length = unpack_from(buffer, offset)
+            payload = offset + RECORD_HEADER_SIZE
+            offset = payload + length
+            if direction == _DEVICE_DEFINITION:
+                continue
+            if start_ns is not None and timestamp_ns < start_ns:
+                continue
+            if end_ns is not None and timestamp_ns >= end_ns:
+                return
+            if device_id is not None and device != device_id:
+                continue
+            if code is not None and direction != code:
+                continue
+            yield CaptureRecord(timestamp_ns / 1e9, devices.get(device, str(device)),
+                                DIRECTION_NAMES.get(direction, str(direction)),
+                                bytes(buffer[payload:offset]))
+
+
+_shared_writers = {}
+_shared_lock = threading.Lock()
+
+
+def open_shared_capture(path):
+    """Escritor compartido por ruta: varios masters/slaves pueden capturar al mismo archivo"""
+    path = os.path.abspath(path)
+    with _shared_lock:
+        entry = _shared_writers.get(path)
+        if entry is None or entry[0].closed:
+            entry = _shared_writers[path] = [CaptureWriter(path), 0]
+        entry[1] += 1
+        return entry[0]
+
+
+def release_shared_capture(writer):
+    """Liberar un escritor de open_shared_capture(); el último usuario lo cierra"""
+    with _shared_lock:
+        entry = _shared_writers.get(writer.path)
+        if entry is None or entry[0] is not writer:
+            return
+        entry[1] -= 1
+        if entry[1] <= 0:
+            del _shared_writers[writer.path]
+            writer.close()
@@ -0,0 +1,352 @@
+#!/usr/bin/env python3
+"""
+Registro de conexiones Modbus TCP - Implementación limpia para ComSuite
+Comparte una conexión física por endpoint (IP:puerto) entre todos los
+dispositivos que cuelgan de un mismo gateway, cada uno con su unit ID, y
+limita las conexiones simultáneas por host.
+"""
+
+import threading
+
+from .tracing import DEFAULT_LEVEL, Tracer, parse_level
+
+
+class _SharedConnection:
+    """Master TCP compartido y los dispositivos (unit IDs) enlazados a él.
+
+    El nivel de trazas y la captura son de la conexión, no de cada unit ID:
+    se aplica el nivel más detallado que pida alguno de sus dispositivos y una
+    única captura, que no puede cambiarse mientras otro dispositivo la use.
+    Los callbacks sí son de cada dispositivo: los mensajes de la conexión llegan
+    a todos y cada trama solo a los dispositivos de su unit ID.
+    """
+
+    def __init__(self, key, master, max_in_flight):
+        self.key = key
+        self.master = master
+        self.max_in_flight = max_in_flight
+        self.users = 0
+        self.connect_lock = threading.Lock()
+        # Ajustes pedidos por cada UnitMaster enlazado
+        self._settings_lock = threading.Lock()
+        self._trace_levels = {}
+        self._captures = {}
+        self._log_callbacks = {}
+        self._frame_callbacks = {}
+
+    def set_trace_level(self, unit, level):
+        """Registrar el nivel pedido por un dispositivo (None lo retira) y aplicar el más detallado"""
+        with self._settings_lock:
+            if level is None:
+                self._trace_levels.pop(unit, None)
+            else:
+                self._trace_levels[unit] = parse_level(level)
+            self.master.set_trace_level(min(self._trace_levels.values(), default=DEFAULT_LEVEL))
+
+    def set_capture(self, unit, writer, device=None):
+        """Registrar la captura pedida por un dispositivo (None la retira).
+
+        Lanza ValueError si otro dispositivo de la conexión ya graba en otra captura.
+        """
+        with self._settings_lock:
+            if writer is None:
+                self._captures.pop(unit, None)
+            else:
+                for other, (other_writer, _) in self._captures.items():
+                    if other is not unit and other_writer is not writer:
+                        raise ValueError(f"La conexión {self.key[0]}:{self.key[1]} ya graba en otra captura")
+                self._captures[unit] = (writer, device)
+            writer, device = next(iter(self._captures.values()), (None, None))
+            self.master.set_capture(writer, device)
+
+    def set_log_callback(self, unit, callback):
+        """Registrar el callback de logging de un dispositivo (None lo retira)"""
+        with self._settings_lock:
+            if callback is None:
+                self._log_callbacks.pop(unit, None)
+            else:
+                self._log_callbacks[unit] = callback
+            self.master.set_log_callback(self._deliver_log if self._log_callbacks else None)
+
+    def set_frame_callback(self, unit, callback):
+        """Registrar el callback de tramas de un dispositivo (None lo retira)"""
+        with self._settings_lock:
+            if callback is None:
+                self._frame_callbacks.pop(unit, None)
+            else:
+                self._frame_callbacks[unit] = callback
+            self.master.set_frame_callback(self._deliver_frame if self._frame_callbacks else None)
+
+    def _deliver_log(self, text):
+        """Mensaje de la conexión: lo reciben todos sus dispositivos"""
+        for callback in list(self._log_callbacks.values()):
+            callback(text)
+
+    def _deliver_frame(self, direction, data):
+        """Trama: solo la reciben los dispositivos de su unit ID (byte 6 de la ADU)"""
+        unit_id = data[6] if len(data) > 6 else None
+        for unit, callback in list(self._frame_callbacks.items()):
+            if unit_id is None or unit.slave_id == unit_id:
+                callback(direction, data)
+
+    def forget(self, unit):
+        """Retirar los ajustes de un dispositivo que suelta la conexión"""
+        if unit in self._trace_levels:
+            self.set_trace_level(unit, None)
+        if unit in self._captures:
+            self.set_capture(unit, None)
+        if unit in self._log_callbacks:
+            self.set_log_callback(unit, None)
+        if unit in self._frame_callbacks:
+            self.set_frame_callback(unit, None)
+
+
+class UnitMaster:
+    """Master enlazado a un unit ID sobre una conexión compartida.
+
+    Ofrece la API bloqueante de ModbusMasterTCP, de modo que ModbusDevice y
+    ModbusProtocol lo usan sin cambios; cada petición lleva su propio unit ID.
+    """
+
+    def __init__(self, registry, connection, unit_id):
+        self._registry = registry
+        self._connection = connection
+        self.slave_id = unit_id
+        self._released = False
+        # Ajustes propios, para volver a pedirlos al retomar una conexión
+        self._trace_level = None
+        self._capture = None
+        self._log_callback = None
+        self._frame_callback = None
+
+    @property
+    def master(self):
+        return self._connection.master
+
+    @property
+    def connected(self):
+        return not self._released and self.master.connected
+
+    @property
+    def timeout(self):
+        return self.master.timeout
+
+    @property
+    def ip(self):
+        return self.master.ip
+
+    @property
+    def port(self):
+        return self.master.port
+
+    def set_log_callback(self, callback):
+        """Establecer callback para logging (recibe también los mensajes de la conexión)"""
+        self._log_callback = callback
+        self._connection.set_log_callback(self, callback)
+
+    def set_frame_callback(self, callback):
+        """Establecer callback para las tramas de este unit ID"""
+        self._frame_callback = callback
+        self._connection.set_frame_callback(self, callback)
+
+    def set_trace_level(self, level):
+        """Nivel mínimo de trazas pedido por este dispositivo.
+
+        El nivel es de la conexión: rige el más detallado de sus dispositivos,
+        así que subirlo aquí no silencia las trazas que otro pidió.
+        """
+        self._trace_level = level
+        self._connection.set_trace_level(self, level)
+
+    def set_capture(self, writer, device=None):
+        """Grabar las tramas de la conexión en un CaptureWriter (None deja de pedirlo).
+
+        La captura es de la conexión e incluye todos sus unit IDs; lanza
+        ValueError si otro dispositivo de la conexión ya graba en otra captura.
+        """
+        self._connection.set_capture(self, writer, device)
+        self._capture = (writer, device) if writer is not None else None
+
+    def connect(self):
+        """Conectar la conexión compartida si aún no lo está"""
+        if self._released:
+            # Reconexión tras disconnect(): volver a tomar una conexión del registro
+            try:
+                connection = self._registry._attach(*self._connection.key, self._connection.max_in_flight)
+            except ValueError:
+                return False
+            if connection is None:
+                return False
+            self._connection = connection
+            self._released = False
+            if self._trace_level is not None:
+                connection.set_trace_level(self, self._trace_level)
+            if self._capture is not None:
+                connection.set_capture(self, *self._capture)
+            if self._log_callback is not None:
+                connection.set_log_callback(self, self._log_callback)
+            if self._frame_callback is not None:
+                connection.set_frame_callback(self, self._frame_callback)
+        with self._connection.connect_lock:
+            if self.master.connected:
+                return True
+            return self.master.connect()
+
+    def disconnect(self):
+        """Liberar la conexión; se cierra al soltarla el último dispositivo"""
+        if not self._released:
+            self._released = True
+            self._connection.forget(self)
+            self._registry.release(self._connection)
+
+    def _bound(self):
+        """Master de la conexión, retomándola si el dispositivo la había soltado"""
+        if self._released:
+            self.connect()
+        return self.master
+
+    def read_coils(self, start_address, count):
+        """Leer coils (FC 01)"""
+        return self._bound().read_coils(start_address, count, unit_id=self.slave_id)
+
+    def read_discrete_inputs(self, start_address, count):
+        """Leer discrete inputs (FC 02)"""
+        return self._bound().read_discrete_inputs(start_address, count, unit_id=self.slave_id)
+
+    def read_holding_registers(self, start_address, count, as_array=False):
+        """Leer holding registers (FC 03)"""
+        return self._bound().read_holding_registers(start_address, count, unit_id=self.slave_id, as_array=as_array)
+
+    def read_input_registers(self, start_address, count, as_array=False):
+        """Leer input registers (FC 04)"""
+        return self._bound().read_input_registers(start_address, count, unit_id=self.slave_id, as_array=as_array)
+
+    def write_single_coil(self, address, value):
+        """Escribir single coil (FC 05)"""
+        return self._bound().write_single_coil(address, value, unit_id=self.slave_id)
+
+    def write_single_register(self, address, value):
+        """Escribir single register (FC 06)"""
+        return self._bound().write_single_register(address, value, unit_id=self.slave_id)
+
+    def write_multiple_coils(self, address, values):
+        """Escribir multiple coils (FC 15)"""
+        return self._bound().write_multiple_coils(address, values, unit_id=self.slave_id)
+
+    def write_multiple_registers(self, address, values):
+        """Escribir multiple registers (FC 16)"""
+        return self._bound().write_multiple_registers(address, values, unit_id=self.slave_id)
+
+
+class ConnectionRegistry:
+    """Conexiones TCP compartidas por endpoint con presupuesto por host.
+
+    Cada endpoint (IP, puerto, motor) abre hasta max_connections_per_endpoint
+    sockets y reparte los unit IDs entre ellos; el total de sockets hacia una
+    misma IP nunca supera max_connections_per_host. Las conexiones se cuentan
+    por referencias y se cierran cuando las suelta el último dispositivo.
+    """
+
+    def __init__(self, max_connections_per_host=4, max_connections_per_endpoint=1):
+        self.max_connections_per_host = max(1, int(max_connections_per_host))
+        self.max_connections_per_endpoint = max(1, int(max_connections_per_endpoint))
+        self._connections = {}  # (ip, port, engine) -> [_SharedConnection]
+        self._lock = threading.Lock()
+
+        # Trazas de logging
+        self._trace = Tracer("Registro TCP")
+
+    def set_log_callback(self, callback):
+        """Establecer callback para logging (recibe el texto ya formateado)"""
+        self._trace.set_log_sink(callback)
+
+    def set_trace_level(self, level):
+        """Nivel mínimo de trazas"""
+        self._trace.set_level(level)
+
+    def _host_connections(self, ip):
+        return sum(len(pool) for key, pool in self._connections.items() if key[0] == ip)
+
+    def _create_master(self, ip, port, engine, max_in_flight):
+        if engine == 'asyncio':
+            from .master_tcp_async import EngineModbusMasterTCP
+            return EngineModbusMasterTCP(ip=ip, port=port, max_in_flight=max_in_flight)
+        from .master_tcp import ModbusMasterTCP
+        return ModbusMasterTCP(ip=ip, port=port, max_in_flight=max_in_flight)
+
+    def acquire(self, ip, port=502, unit_id=1, engine='threads', max_in_flight=1):
+        """Obtener un master para unit_id en ip:port.
+
+        Devuelve un UnitMaster sobre una conexión existente o nueva, o None si
+        abrirla excedería el presupuesto de conexiones del host. Lanza
+        ValueError si el endpoint ya está abierto con otro max_in_flight.
+        """
+        connection = self._attach(ip, port, engine, max_in_flight)
+        if connection is None:
+            return None
+        return UnitMaster(self, connection, unit_id)
+
+    def _attach(self, ip, port, engine, max_in_flight):
+        """Tomar una referencia a una conexión del endpoint, abriéndola si hace falta"""
+        key = (ip, port, engine)
+        max_in_flight = max(1, int(max_in_flight))
+        with self._lock:
+            pool = self._connections.setdefault(key, [])
+            # La profundidad del pipeline es de la conexión: no dejar que el
+            # primer dispositivo la fije en silencio para los demás
+            if pool and pool[0].max_in_flight != max_in_flight:
+                self._trace.warning("%s:%s ya está abierto con max_in_flight=%s, se pidió %s",
+                                    ip, port, pool[0].max_in_flight, max_in_flight)
+                raise ValueError(f"{ip}:{port} ya está abierto con max_in_flight={pool[0].max_in_flight}")
+            connection = min(pool, key=lambda c: c.users) if pool else None
+
+            # Abrir otro socket solo si los existentes ya tienen dispositivos
+            # y quedan huecos en el endpoint y en el host
+            if (connection is None or connection.users > 0) \
+                    and len(pool) < self.max_connections_per_endpoint:
+                if self._host_connections(ip) < self.max_connections_per_host:
+                    connection = _SharedConnection(key, self._create_master(ip, port, engine, max_in_flight),
+                                                   max_in_flight)
+                    pool.append(connection)
+                elif connection is None:
+                    del self._connections[key]
+                    self._trace.warning("Presupuesto de %s conexiones agotado para %s", self.max_connections_per_host, ip)
+                    return None
+
+            connection.users += 1
+            return connection
+
+    def release(self, connection):
+        """Soltar una referencia a la conexión y cerrarla si queda sin uso"""
+        with self._lock:
+            connection.users -= 1
+            if connection.users > 0:
+                return
+            pool = self._connections.get(connection.key, [])
+            if connection in pool:
+                pool.remove(connection)
+            if not pool:
+                self._connections.pop(connection.key, None)
+        if connection.master.connected:
+            connection.master.disconnect()
+
+    def get_statistics(self):
+        """Conexiones abiertas y dispositivos por endpoint"""
+        with self._lock:
+            return {
+                f"{ip}:{port}": [connection.users for connection in pool]
+                for (ip, port, _), pool in self._connections.items()
+            }
+
+
+_default_registry = None
+_default_registry_lock = threading.Lock()
+
+
+def get_default_registry():
+    """Registro de conexiones compartido por toda la aplicación"""
+    global _default_registry
+    with _default_registry_lock:
+        if _default_registry is None:
+            _default_registry = ConnectionRegistry()
+        return _default_registry
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+CRC16 Modbus - Implementación limpia para ComSuite
+CRC por tabla de 256 entradas compartido por master y slave RTU.
+"""
+
+_POLYNOMIAL = 0xA001  # 0x8005 reflejado
+
+
+def _build_table():
+    """Precalcular el CRC de cada byte posible"""
+    table = []
+    for byte in range(256):
+        crc = byte
+        for _ in range(8):
+            if crc & 0x0001:
+                crc = (crc >> 1) ^ _POLYNOMIAL
+            else:
+                crc >>= 1
+        table.append(crc)
+    return tuple(table)
+
+
+CRC16_TABLE = _build_table()
+
+
+def _crc16_table(data, crc=0xFFFF):
+    """CRC16 Modbus con tabla: una búsqueda por byte en vez de 8 iteraciones"""
+    table = CRC16_TABLE
+    for byte in data:
+        crc = (crc >> 8) ^ table[(crc ^ byte) & 0xFF]
+    return crc
+
+
+# Vía rápida opcional: la extensión en C de crcmod, si está instalada.
+# La biblioteca estándar no la ofrece (binascii.crc_hqx es CRC-CCITT, otro polinomio).
+try:
+    import crcmod
+    import crcmod._crcfunext  # noqa: F401  (sin la extensión en C no compensa)
+    _crc16_c = crcmod.mkCrcFun(0x18005, initCrc=0xFFFF, rev=True, xorOut=0x0000)
+
+    def _crc16_fast(data, crc=0xFFFF):
+        """CRC16 Modbus calculado por la extensión en C de crcmod"""
+        return _crc16_c(bytes(data), crc)
+
+    crc16 = _crc16_fast
+    HAS_C_CRC = True
+except ImportError:
+    crc16 = _crc16_table
+    HAS_C_CRC = False
+
+def crc16_bytes(data):
+    """CRC16 de data en el orden de transmisión RTU (little-endian)"""
+    return crc16(data).to_bytes(2, byteorder='little')
+
+
+def check_crc(frame):
+    """Verificar que los dos últimos bytes de frame son su CRC correcto"""
+    if len(frame) < 4:
+        return False
+    return crc16(frame[:-2]) == (frame[-2] | (frame[-1] << 8))
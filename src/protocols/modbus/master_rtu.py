@@ -8,6 +8,12 @@ import serial
 import struct
 import time
 
+from .crc16 import crc16
+from .packing import empty_registers, pack_bits, pack_registers, unpack_bits, unpack_registers
+from .tracing import Tracer
+from .rtu_framing import RTUResponseReader
+from .rtu_timing import RTUTiming, expected_response_length
+
 class ModbusMasterRTU:
     """Master Modbus RTU completo con todas las funciones Modbus"""
 
@@ -23,6 +29,10 @@ class ModbusMasterRTU:
         self.timeout = 3.0
         self.should_stop = False
 
+        # Silencios t1.5/t3.5 según baudrate y formato de carácter
+        self.timing = RTUTiming(baudrate, bytesize, parity, stopbits)
+        self._last_activity = 0.0  # Último byte enviado/recibido en el bus
+
         # Mapeo de paridad
         self.parity_map = {
             'N': serial.PARITY_NONE,
@@ -30,28 +40,29 @@ class ModbusMasterRTU:
             'O': serial.PARITY_ODD
         }
 
-        # Callbacks para logging y diagnóstico
-        self.log_callback = None
-        self.frame_callback = None
+        # Trazas de logging y diagnóstico (tramas)
+        self._trace = Tracer("Master RTU")
 
     def set_log_callback(self, callback):
-        """Establecer callback para logging"""
-        self.log_callback = callback
+        """Establecer callback para logging (recibe el texto ya formateado)"""
+        self._trace.set_log_sink(callback)
 
     def set_frame_callback(self, callback):
         """Establecer callback para tramas"""
-        self.frame_callback = callback
+        self._trace.set_frame_sink(callback)
 
-    def _log(self, message):
-        """Logging interno"""
-        if self.log_callback:
-            self.log_callback(f"Master RTU: {message}")
-        else:
-            print(f"Master RTU: {message}")
+    def set_capture(self, writer, device=None):
+        """Grabar las tramas en un CaptureWriter (device por defecto: el puerto serie)"""
+        self._trace.set_capture(writer, device or self.port)
+
+    def set_trace_level(self, level):
+        """Nivel mínimo de trazas ('DEBUG' incluye el detalle de cada petición)"""
+        self._trace.set_level(level)
 
     def connect(self):
         """Conectar al puerto serie"""
         try:
+            self.timing = RTUTiming(self.baudrate, self.bytesize, self.parity, self.stopbits)
             self.serial_port = serial.Serial(
                 port=self.port,
                 baudrate=self.baudrate,
@@ -64,10 +75,10 @@ class ModbusMasterRTU:
                 xonxoff=False
             )
             self.connected = True
-            self._log(f"Conectado a {self.port} @ {self.baudrate} baud")
+            self._trace.info("Conectado a %s @ %s baud", self.port, self.baudrate)
             return True
         except Exception as e:
-            self._log(f"Error al conectar: {e}")
+            self._trace.error("Error al conectar: %s", e)
             return False
 
     def disconnect(self):
@@ -75,28 +86,22 @@ class ModbusMasterRTU:
         if self.serial_port and self.serial_port.is_open:
             self.serial_port.close()
         self.connected = False
-        self._log("Desconectado")
+        self._trace.info("Desconectado")
 
     def calculate_crc(self, data):
         """Calcular CRC16 Modbus"""
-        crc = 0xFFFF
-        for byte in data:
-            crc ^= byte
-            for _ in range(8):
-                if crc & 0x0001:
-                    crc = (crc >> 1) ^ 0xA001
-                else:
-                    crc = crc >> 1
-        return crc & 0xFFFF
+        return crc16(data)
 
-    def send_request(self, function_code, data):
+    def send_request(self, function_code, data, unit_id=None):
         """Enviar petición RTU y recibir respuesta"""
         if not self.connected and not self.connect():
             return None
 
+        unit_id = self.slave_id if unit_id is None else unit_id
+
         try:
             # Construir trama
-            request = bytearray([self.slave_id, function_code])
+            request = bytearray([unit_id, function_code])
             request.extend(data)
 
             # Calcular y agregar CRC
@@ -105,266 +110,223 @@ class ModbusMasterRTU:
             crc_bytes = bytes([crc & 0xFF, (crc >> 8) & 0xFF])
             request.extend(crc_bytes)
 
-            self._log(f"Enviando trama: {request.hex()}")
+            self._trace.frame("ENVIADO", request)
 
             # Limpiar buffer antes de enviar
             if self.serial_port:
                 self.serial_port.reset_input_buffer()
 
+            # Respetar el silencio t3.5 desde la última trama del bus
+            idle = time.monotonic() - self._last_activity
+            if idle < self.timing.t3_5:
+                time.sleep(self.timing.t3_5 - idle)
+
             # Enviar petición
             bytes_written = self.serial_port.write(request)
             self.serial_port.flush()
-            self._log(f"Bytes escritos: {bytes_written}")
-
-            # Esperar respuesta
-            time.sleep(0.5)  # Espera conservadora
-
-            response = bytearray()
-            timeout = time.time() + self.timeout
-
-            while time.time() < timeout and not self.should_stop:
-                if self.serial_port and self.serial_port.in_waiting > 0:
-                    data_read = self.serial_port.read(self.serial_port.in_waiting)
-                    response.extend(data_read)
-                    self._log(f"Recibidos {len(data_read)} bytes: {data_read.hex()}")
-
-                    # Verificar si tenemos respuesta completa
-                    if len(response) >= 5:  # Mínimo: ID + FC + CRC (2 bytes)
-                        # Verificar CRC
-                        response_data = response[:-2]
-                        response_crc_bytes = response[-2:]
-
-                        # Reconstruir el CRC desde little-endian
-                        response_crc = response_crc_bytes[0] | (response_crc_bytes[1] << 8)
-                        calculated_response_crc = self.calculate_crc(response_data)
-
-                        self._log(f"CRC recibido: 0x{response_crc:04X}, CRC calculado: 0x{calculated_response_crc:04X}")
-
-                        if response_crc == calculated_response_crc:
-                            self._log("CRC válido - Respuesta completa")
-                            return response_data
-                        else:
-                            self._log("CRC inválido")
-                            # Limpiar buffer y reiniciar
-                            if self.serial_port:
-                                self.serial_port.reset_input_buffer()
-                            response = bytearray()
-
-                time.sleep(0.01)
-
-            if self.should_stop:
-                self._log("Deteniendo por petición del usuario")
+            self._last_activity = time.monotonic()
+            self._trace.debug("Bytes escritos: %s", bytes_written)
+
+            # Leer exactamente la respuesta: cabecera de 3 bytes y el resto
+            # con un solo read(n) de la longitud que indica la cabecera
+            deadline = time.monotonic() + self.timeout
+            reader = RTUResponseReader(self.serial_port, self._trace)
+            response = reader.read_response(
+                unit_id, function_code,
+                expected_response_length(function_code, data), deadline
+            )
+            self._last_activity = time.monotonic()
+
+            if reader.discarded_bytes:
+                self._trace.warning("Descartados %s bytes hasta resincronizar", reader.discarded_bytes)
+
+            if response is None:
+                if self.should_stop:
+                    self._trace.info("Deteniendo por petición del usuario")
+                else:
+                    self._trace.warning("Timeout esperando respuesta")
                 return None
 
-            self._log("Timeout esperando respuesta")
-            return None
+            self._trace.frame("RECIBIDO", response)
+            return bytearray(response[:-2])
 
         except Exception as e:
-            self._log(f"Error en comunicación: {e}")
+            self._trace.error("Error en comunicación: %s", e)
             return None
 
     def stop(self):
         """Detener el master"""
         self.should_stop = True
-        self._log("Solicitando detención...")
+        self._trace.info("Solicitando detención...")
         time.sleep(0.1)  # Dar tiempo para que se procese la detención
         self.disconnect()
 
     # === FUNCIONES DE LECTURA ===
 
-    def read_coils(self, start_address, count):
+    def read_coils(self, start_address, count, unit_id=None):
         """Leer coils (FC 01)"""
-        self._log(f"Leyendo coils desde dirección {start_address}, cantidad {count}")
+        self._trace.debug("Leyendo coils desde dirección %s, cantidad %s", start_address, count)
 
         if start_address > 65535 or count < 1 or count > 2000:
-            self._log(f"Parámetros inválidos: dirección={start_address}, conteo={count}")
+            self._trace.warning("Parámetros inválidos: dirección=%s, conteo=%s", start_address, count)
             return [False] * count
 
         data = struct.pack('>HH', start_address, count)
-        response = self.send_request(1, data)
+        response = self.send_request(1, data, unit_id)
 
         if not response or len(response) < 2:
-            self._log("Respuesta inválida o vacía")
+            self._trace.warning("Respuesta inválida o vacía")
             return [False] * count
 
         if response[1] & 0x80:  # Excepción
             exception_code = response[2]
-            self._log(f"Excepción recibida: código {exception_code}")
+            self._trace.warning("Excepción recibida: código %s", exception_code)
             return [False] * count
 
         byte_count = response[2]
-        values = []
-        for i in range(count):
-            byte_index = i // 8
-            bit_index = i % 8
-            if byte_index < byte_count:
-                byte_value = response[3 + byte_index]
-                values.append(bool(byte_value & (1 << bit_index)))
-            else:
-                values.append(False)
-
-        self._log(f"Valores leídos: {values[:10]}{'...' if len(values) > 10 else ''}")
+        values = unpack_bits(response[3:3 + byte_count], count)
+
+        self._trace.debug("Valores leídos: %s%s", values[:10], '...' if len(values) > 10 else '')
         return values
 
-    def read_discrete_inputs(self, start_address, count):
+    def read_discrete_inputs(self, start_address, count, unit_id=None):
         """Leer discrete inputs (FC 02)"""
-        self._log(f"Leyendo discrete inputs desde dirección {start_address}, cantidad {count}")
+        self._trace.debug("Leyendo discrete inputs desde dirección %s, cantidad %s", start_address, count)
 
         if start_address > 65535 or count < 1 or count > 2000:
-            self._log(f"Parámetros inválidos: dirección={start_address}, conteo={count}")
+            self._trace.warning("Parámetros inválidos: dirección=%s, conteo=%s", start_address, count)
             return [False] * count
 
         data = struct.pack('>HH', start_address, count)
-        response = self.send_request(2, data)
+        response = self.send_request(2, data, unit_id)
 
         if not response or len(response) < 2:
-            self._log("Respuesta inválida o vacía")
+            self._trace.warning("Respuesta inválida o vacía")
             return [False] * count
 
         if response[1] & 0x80:  # Excepción
             exception_code = response[2]
-            self._log(f"Excepción recibida: código {exception_code}")
+            self._trace.warning("Excepción recibida: código %s", exception_code)
             return [False] * count
 
         byte_count = response[2]
-        values = []
-        for i in range(count):
-            byte_index = i // 8
-            bit_index = i % 8
-            if byte_index < byte_count:
-                byte_value = response[3 + byte_index]
-                values.append(bool(byte_value & (1 << bit_index)))
-            else:
-                values.append(False)
-
-        self._log(f"Valores leídos: {values[:10]}{'...' if len(values) > 10 else ''}")
+        values = unpack_bits(response[3:3 + byte_count], count)
+
+        self._trace.debug("Valores leídos: %s%s", values[:10], '...' if len(values) > 10 else '')
         return values
 
-    def read_holding_registers(self, start_address, count):
+    def read_holding_registers(self, start_address, count, unit_id=None, as_array=False):
         """Leer holding registers (FC 03)"""
-        self._log(f"Leyendo holding registers desde dirección {start_address}, cantidad {count}")
+        self._trace.debug("Leyendo holding registers desde dirección %s, cantidad %s", start_address, count)
 
         if start_address > 65535 or count < 1 or count > 125:
-            self._log(f"Parámetros inválidos: dirección={start_address}, conteo={count}")
-            return [0] * count
+            self._trace.warning("Parámetros inválidos: dirección=%s, conteo=%s", start_address, count)
+            return empty_registers(count, as_array)
 
         # Empaquetar datos en big-endian
         data = struct.pack('>HH', start_address, count)
-        self._log(f"Datos empaquetados: {data.hex()}")
+        self._trace.debug("Datos empaquetados: %s", data)
 
-        response = self.send_request(3, data)
+        response = self.send_request(3, data, unit_id)
 
         if not response or len(response) < 2:
-            self._log("Respuesta inválida o vacía")
-            return [0] * count
+            self._trace.warning("Respuesta inválida o vacía")
+            return empty_registers(count, as_array)
 
         if response[1] & 0x80:  # Excepción
             exception_code = response[2]
-            self._log(f"Excepción recibida: código {exception_code}")
-            return [0] * count
+            self._trace.warning("Excepción recibida: código %s", exception_code)
+            return empty_registers(count, as_array)
 
         byte_count = response[2]
-        values = []
-        for i in range(byte_count // 2):
-            # Desempaquetar en big-endian
-            value = struct.unpack('>H', response[3 + i*2:5 + i*2])[0]
-            values.append(value)
+        values = unpack_registers(response[3:3 + byte_count], as_array)
 
-        self._log(f"Valores leídos: {values}")
+        self._trace.debug("Valores leídos: %s", values)
         return values
 
-    def read_input_registers(self, start_address, count):
+    def read_input_registers(self, start_address, count, unit_id=None, as_array=False):
         """Leer input registers (FC 04)"""
-        self._log(f"Leyendo input registers desde dirección {start_address}, cantidad {count}")
+        self._trace.debug("Leyendo input registers desde dirección %s, cantidad %s", start_address, count)
 
         if start_address > 65535 or count < 1 or count > 125:
-            self._log(f"Parámetros inválidos: dirección={start_address}, conteo={count}")
-            return [0] * count
+            self._trace.warning("Parámetros inválidos: dirección=%s, conteo=%s", start_address, count)
+            return empty_registers(count, as_array)
 
         data = struct.pack('>HH', start_address, count)
-        response = self.send_request(4, data)
+        response = self.send_request(4, data, unit_id)
 
         if not response or len(response) < 2:
-            self._log("Respuesta inválida o vacía")
-            return [0] * count
+            self._trace.warning("Respuesta inválida o vacía")
+            return empty_registers(count, as_array)
 
         if response[1] & 0x80:  # Excepción
             exception_code = response[2]
-            self._log(f"Excepción recibida: código {exception_code}")
-            return [0] * count
+            self._trace.warning("Excepción recibida: código %s", exception_code)
+            return empty_registers(count, as_array)
 
         byte_count = response[2]
-        values = []
-        for i in range(byte_count // 2):
-            # Desempaquetar en big-endian
-            value = struct.unpack('>H', response[3 + i*2:5 + i*2])[0]
-            values.append(value)
+        values = unpack_registers(response[3:3 + byte_count], as_array)
 
-        self._log(f"Valores leídos: {values}")
+        self._trace.debug("Valores leídos: %s", values)
         return values
 
     # === FUNCIONES DE ESCRITURA ===
 
-    def write_single_coil(self, address, value):
+    def write_single_coil(self, address, value, unit_id=None):
         """Escribir single coil (FC 05)"""
-        self._log(f"Escribiendo coil en dirección {address}, valor {value}")
+        self._trace.debug("Escribiendo coil en dirección %s, valor %s", address, value)
 
         if address > 65535:
-            self._log(f"Dirección inválida: {address}")
+            self._trace.warning("Dirección inválida: %s", address)
             return False
 
         coil_value = 0xFF00 if value else 0x0000
         data = struct.pack('>HH', address, coil_value)
-        response = self.send_request(5, data)
+        response = self.send_request(5, data, unit_id)
 
         return response is not None
 
-    def write_single_register(self, address, value):
+    def write_single_register(self, address, value, unit_id=None):
         """Escribir single register (FC 06)"""
-        self._log(f"Escribiendo registro en dirección {address}, valor {value}")
+        self._trace.debug("Escribiendo registro en dirección %s, valor %s", address, value)
 
         if address > 65535:
-            self._log(f"Dirección inválida: {address}")
+            self._trace.warning("Dirección inválida: %s", address)
             return False
 
         data = struct.pack('>HH', address, value)
-        response = self.send_request(6, data)
+        response = self.send_request(6, data, unit_id)
 
         return response is not None
 
-    def write_multiple_coils(self, address, values):
+    def write_multiple_coils(self, address, values, unit_id=None):
         """Escribir multiple coils (FC 15)"""
-        self._log(f"Escribiendo múltiples coils en dirección {address}, cantidad {len(values)}")
+        self._trace.debug("Escribiendo múltiples coils en dirección %s, cantidad %s", address, len(values))
 
         if address > 65535 or len(values) < 1 or len(values) > 1968:
-            self._log(f"Parámetros inválidos: dirección={address}, cantidad={len(values)}")
+            self._trace.warning("Parámetros inválidos: dirección=%s, cantidad=%s", address, len(values))
             return False
 
         coil_count = len(values)
         byte_count = (coil_count + 7) // 8
 
         # Empaquetar valores en bytes
-        coils_bytes = bytearray(byte_count)
-        for i, value in enumerate(values):
-            if value:
-                byte_index = i // 8
-                bit_index = i % 8
-                coils_bytes[byte_index] |= (1 << bit_index)
+        coils_bytes = pack_bits(values)
 
         data = bytearray()
         data.extend(struct.pack('>HH', address, coil_count))
         data.append(byte_count)
         data.extend(coils_bytes)
 
-        response = self.send_request(15, data)
+        response = self.send_request(15, data, unit_id)
         return response is not None
 
-    def write_multiple_registers(self, address, values):
+    def write_multiple_registers(self, address, values, unit_id=None):
         """Escribir multiple registers (FC 16)"""
-        self._log(f"Escribiendo múltiples registros en dirección {address}, cantidad {len(values)}")
+        self._trace.debug("Escribiendo múltiples registros en dirección %s, cantidad %s", address, len(values))
 
         if address > 65535 or len(values) < 1 or len(values) > 123:
-            self._log(f"Parámetros inválidos: dirección={address}, cantidad={len(values)}")
+            self._trace.warning("Parámetros inválidos: dirección=%s, cantidad=%s", address, len(values))
             return False
 
         register_count = len(values)
@@ -373,8 +335,7 @@ class ModbusMasterRTU:
         data = bytearray()
         data.extend(struct.pack('>HH', address, register_count))
         data.append(byte_count)
-        for value in values:
-            data.extend(struct.pack('>H', value))
+        data.extend(pack_registers(values))
 
-        response = self.send_request(16, data)
+        response = self.send_request(16, data, unit_id)
         return response is not None
\ No newline at end of file
@@ -7,11 +7,51 @@ Clase pura de comunicación sin rutinas de prueba.
 import socket
 import struct
 import logging
+import threading
+import time
+
+from .mbap_framer import MBAPFramer
+from .packing import empty_registers, pack_bits, pack_registers, unpack_bits, unpack_registers
+from .tracing import Tracer
+
+
+class _PendingTransaction:
+    """Transacción en vuelo esperando su respuesta (modo pipeline)"""
+
+    def __init__(self, transaction_id, slots=None):
+        self.transaction_id = transaction_id
+        self.response = None
+        self._event = threading.Event()
+        self._slots = slots
+        self._released = False
+        self._release_lock = threading.Lock()
+
+    def complete(self, response):
+        """Entregar la respuesta (None si falló) y liberar el hueco del pipeline"""
+        self.response = response
+        self._release_slot()
+        self._event.set()
+
+    def _release_slot(self):
+        with self._release_lock:
+            if self._slots is not None and not self._released:
+                self._released = True
+                self._slots.release()
+
+    def done(self):
+        """Indica si la transacción ya terminó"""
+        return self._event.is_set()
+
+    def wait(self, timeout=None):
+        """Esperar la respuesta. Devuelve None en timeout o error"""
+        self._event.wait(timeout)
+        return self.response
+
 
 class ModbusMasterTCP:
     """Master Modbus TCP completo con todas las funciones Modbus"""
 
-    def __init__(self, ip='127.0.0.1', port=502, slave_id=1):
+    def __init__(self, ip='127.0.0.1', port=502, slave_id=1, max_in_flight=1):
         self.ip = ip
         self.port = port
         self.slave_id = slave_id
@@ -20,89 +60,273 @@ class ModbusMasterTCP:
         self.transaction_id = 0
         self.timeout = 3.0
 
-        # Callbacks para logging y diagnóstico
-        self.log_callback = None
-        self.frame_callback = None
+        # Pipeline: transacciones simultáneas permitidas en el mismo socket.
+        # Con 1 se mantiene el modo clásico petición/respuesta.
+        self.max_in_flight = max(1, int(max_in_flight))
+        self._pending = {}  # transaction_id -> _PendingTransaction
+        self._pending_lock = threading.Lock()
+        self._send_lock = threading.Lock()
+        # Conexión y arranque del hilo receptor: una sola conexión y un solo
+        # receptor por socket aunque varios hilos pidan a la vez la primera
+        self._connect_lock = threading.RLock()
+        # Modo clásico: una transacción a la vez aunque varios hilos compartan el socket
+        self._request_lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(self.max_in_flight)
+        self._receiver_thread = None
+
+        # Separador de ADUs del flujo TCP
+        self._framer = MBAPFramer()
+
+        # Trazas de logging y diagnóstico (tramas)
+        self._trace = Tracer("Master")
 
     def set_log_callback(self, callback):
-        """Establecer callback para logging"""
-        self.log_callback = callback
+        """Establecer callback para logging (recibe el texto ya formateado)"""
+        self._trace.set_log_sink(callback)
 
     def set_frame_callback(self, callback):
         """Establecer callback para tramas"""
-        self.frame_callback = callback
+        self._trace.set_frame_sink(callback)
 
-    def _log(self, message):
-        """Logging interno"""
-        if self.log_callback:
-            self.log_callback(f"Master: {message}")
-        else:
-            print(f"Master: {message}")
+    def set_capture(self, writer, device=None):
+        """Grabar las tramas en un CaptureWriter (device por defecto: "ip:puerto")"""
+        self._trace.set_capture(writer, device or f"{self.ip}:{self.port}")
+
+    def set_trace_level(self, level):
+        """Nivel mínimo de trazas ('DEBUG' incluye el detalle de cada petición)"""
+        self._trace.set_level(level)
+
+    @property
+    def pipelined(self):
+        """Indica si el master trabaja con varias transacciones en vuelo"""
+        return self.max_in_flight > 1
 
     def _get_next_transaction_id(self):
         """Obtener siguiente ID de transacción"""
-        self.transaction_id = (self.transaction_id + 1) % 65536
-        return self.transaction_id
+        with self._pending_lock:
+            self.transaction_id = (self.transaction_id + 1) % 65536
+            # En modo pipeline no reutilizar un ID que sigue en vuelo
+            while self.transaction_id in self._pending:
+                self.transaction_id = (self.transaction_id + 1) % 65536
+            return self.transaction_id
 
     def connect(self):
-        """Conectar al slave"""
-        try:
-            self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            self.socket.settimeout(self.timeout)
-            self.socket.connect((self.ip, self.port))
+        """Conectar al slave (reemplaza la conexión anterior, si la había)"""
+        with self._connect_lock:
+            if self.socket is not None:
+                # Las transacciones del socket anterior ya no tendrán respuesta
+                self.connected = False
+                self._close_socket(self.socket)
+                self.socket = None
+                self._fail_pending()
+            try:
+                sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+                sock.settimeout(self.timeout)
+                sock.connect((self.ip, self.port))
+            except Exception as e:
+                self._trace.error("Error al conectar a %s:%s: %s", self.ip, self.port, e)
+                return False
+            self.socket = sock
+            # Buffer nuevo: un receptor anterior que aún no terminó no lo comparte
+            self._framer = MBAPFramer()
             self.connected = True
-            self._log(f"Conectado a {self.ip}:{self.port}")
+            self._trace.info("Conectado a %s:%s", self.ip, self.port)
             return True
-        except Exception as e:
-            self._log(f"Error al conectar a {self.ip}:{self.port}: {e}")
-            return False
+
+    @staticmethod
+    def _close_socket(sock):
+        """Cerrar el socket despertando al receptor bloqueado en recv()"""
+        try:
+            sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        sock.close()
 
     def disconnect(self):
         """Desconectar del slave"""
-        if self.socket:
-            self.socket.close()
-            self.socket = None
-        self.connected = False
-        self._log("Desconectado")
+        with self._connect_lock:
+            self.connected = False
+            if self.socket:
+                self._close_socket(self.socket)
+                self.socket = None
+            self._fail_pending()
+            receiver = self._receiver_thread
+            self._receiver_thread = None
+        if receiver and receiver is not threading.current_thread():
+            receiver.join(timeout=1.0)
+        self._trace.info("Desconectado")
 
     def send_request(self, request):
         """Enviar petición y recibir respuesta"""
+        if self.pipelined:
+            return self._wait_pending(self.submit_request(request))
+
+        with self._request_lock:
+            return self._send_and_wait(request)
+
+    def _send_and_wait(self, request):
+        """Enviar una petición y esperar su respuesta (modo clásico)"""
         if not self.connected and not self.connect():
             return None
 
         try:
-            if self.frame_callback:
-                self.frame_callback("ENVIADO", request)
-
-            self.socket.send(request)
-
-            # Esperar respuesta con timeout
-            self.socket.settimeout(self.timeout)
-            response = self.socket.recv(1024)
-
-            if self.frame_callback:
-                self.frame_callback("RECIBIDO", response)
-
-            return response
+            self._trace.frame("ENVIADO", request)
+
+            self.socket.sendall(request)
+
+            # Esperar la ADU con el mismo transaction ID; las respuestas
+            # tardías de peticiones anteriores se descartan
+            transaction_id = int.from_bytes(request[0:2], byteorder='big')
+            deadline = time.monotonic() + self.timeout
+            while True:
+                for adu in self._framer.frames():
+                    response = bytes(adu)
+
+                    self._trace.frame("RECIBIDO", response)
+
+                    if int.from_bytes(response[0:2], byteorder='big') == transaction_id:
+                        return response
+                    self._trace.warning("Descartada respuesta tardía: ID %s", int.from_bytes(response[0:2], byteorder='big'))
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise socket.timeout()
+                self.socket.settimeout(remaining)
+                if not self._framer.recv_from(self.socket):
+                    raise ConnectionError("Conexión cerrada por el slave")
         except socket.timeout:
-            self._log("Timeout esperando respuesta")
+            self._trace.warning("Timeout esperando respuesta")
             return None
         except Exception as e:
-            self._log(f"Error en comunicación: {e}")
+            self._trace.error("Error en comunicación: %s", e)
             self.connected = False
             return None
 
+    # === PIPELINE DE TRANSACCIONES ===
+
+    def submit_request(self, request):
+        """Enviar petición sin esperar la respuesta (modo pipeline).
+
+        Devuelve una transacción pendiente cuyo wait() entrega la respuesta
+        asociada por el transaction ID del encabezado MBAP. Bloquea mientras
+        haya max_in_flight transacciones sin responder.
+        """
+        transaction_id = int.from_bytes(request[0:2], byteorder='big')
+
+        if not self._slots.acquire(timeout=self.timeout):
+            self._trace.warning("Timeout esperando hueco en el pipeline")
+            pending = _PendingTransaction(transaction_id)
+            pending.complete(None)
+            return pending
+
+        pending = _PendingTransaction(transaction_id, self._slots)
+        with self._connect_lock:
+            if not self.connected and not self.connect():
+                pending.complete(None)
+                return pending
+            self._ensure_receiver()
+            # Registrada bajo el lock de conexión: si el receptor de este socket
+            # termina, la completa con error en vez de dejarla vencer
+            with self._pending_lock:
+                self._pending[transaction_id] = pending
+            sock = self.socket
+
+        try:
+            self._trace.frame("ENVIADO", request)
+            with self._send_lock:
+                sock.sendall(request)
+        except Exception as e:
+            self._trace.error("Error en comunicación: %s", e)
+            self._complete_pending(transaction_id, None)
+            with self._connect_lock:
+                if self.socket is sock:
+                    self.connected = False
+
+        return pending
+
+    def send_requests(self, requests):
+        """Enviar varias peticiones en pipeline y devolver sus respuestas en orden"""
+        pending = [self.submit_request(request) for request in requests]
+        return [self._wait_pending(transaction) for transaction in pending]
+
+    def _wait_pending(self, transaction):
+        """Esperar una transacción y descartarla si vence el timeout"""
+        response = transaction.wait(self.timeout)
+        if not transaction.done():
+            self._trace.warning("Timeout esperando respuesta de la transacción %s", transaction.transaction_id)
+            self._complete_pending(transaction.transaction_id, None)
+        return response
+
+    def _ensure_receiver(self):
+        """Arrancar el hilo receptor del socket actual si no lo tiene (con _connect_lock tomado).
+
+        Un receptor que termina se retira de _receiver_thread bajo el mismo lock,
+        así que uno que está saliendo nunca impide arrancar el siguiente.
+        """
+        if self._receiver_thread is not None:
+            return
+        self._receiver_thread = threading.Thread(target=self._receive_loop,
+                                                 args=(self.socket, self._framer), daemon=True)
+        self._receiver_thread.start()
+
+    def _complete_pending(self, transaction_id, response):
+        """Completar la transacción en vuelo con el ID indicado"""
+        with self._pending_lock:
+            pending = self._pending.pop(transaction_id, None)
+        if pending:
+            pending.complete(response)
+        return pending is not None
+
+    def _fail_pending(self):
+        """Completar con error todas las transacciones en vuelo"""
+        with self._pending_lock:
+            pending = list(self._pending.values())
+            self._pending.clear()
+        for transaction in pending:
+            transaction.complete(None)
+
+    def _receive_loop(self, sock, framer):
+        """Recibir respuestas de sock y entregarlas a su transacción por transaction ID"""
+        while self.connected and self.socket is sock:
+            try:
+                if not framer.recv_from(sock):
+                    break
+
+                for adu in framer.frames():
+                    response = bytes(adu)
+
+                    self._trace.frame("RECIBIDO", response)
+
+                    transaction_id = int.from_bytes(response[0:2], byteorder='big')
+                    if not self._complete_pending(transaction_id, response):
+                        self._trace.warning("Respuesta sin transacción pendiente: ID %s", transaction_id)
+            except socket.timeout:
+                continue
+            except Exception as e:
+                if self.connected and self.socket is sock:
+                    self._trace.error("Error en comunicación: %s", e)
+                break
+
+        with self._connect_lock:
+            if self._receiver_thread is threading.current_thread():
+                self._receiver_thread = None
+            # Si entretanto se reconectó, el socket y sus transacciones ya no son de este hilo
+            if self.socket is sock:
+                self.connected = False
+                self._fail_pending()
+
     # === FUNCIONES DE LECTURA ===
 
-    def read_coils(self, start_address, count):
+    def read_coils(self, start_address, count, unit_id=None):
         """Leer coils (FC 01)"""
         transaction_id = self._get_next_transaction_id()
+        unit_id = self.slave_id if unit_id is None else unit_id
 
         request = struct.pack('>HHHBBHH',
             transaction_id,
             0,  # Protocol ID
             6,  # Length
-            self.slave_id,
+            unit_id,
             1,  # Function code
             start_address,
             count
@@ -114,47 +338,38 @@ class ModbusMasterTCP:
 
         # Verificar respuesta
         if len(response) < 9:
-            self._log("Respuesta demasiado corta")
+            self._trace.warning("Respuesta demasiado corta")
             return [False] * count
 
         # Verificar transaction ID
         resp_transaction_id = int.from_bytes(response[0:2], byteorder='big')
         if resp_transaction_id != transaction_id:
-            self._log(f"ID de transacción incorrecto: esperado {transaction_id}, recibido {resp_transaction_id}")
+            self._trace.warning("ID de transacción incorrecto: esperado %s, recibido %s", transaction_id, resp_transaction_id)
             return [False] * count
 
         if response[7] & 0x80:  # Excepción
             exception_code = response[8]
-            self._log(f"Excepción recibida: código {exception_code}")
+            self._trace.warning("Excepción recibida: código %s", exception_code)
             return [False] * count
 
-        if response[6] != self.slave_id:
-            self._log(f"Unit ID incorrecto: esperado {self.slave_id}, recibido {response[6]}")
+        if response[6] != unit_id:
+            self._trace.warning("Unit ID incorrecto: esperado %s, recibido %s", unit_id, response[6])
             return [False] * count
 
         # Extraer valores
         byte_count = response[8]
-        values = []
-        for i in range(count):
-            byte_index = i // 8
-            bit_index = i % 8
-            if byte_index < byte_count:
-                byte_value = response[9 + byte_index]
-                values.append(bool(byte_value & (1 << bit_index)))
-            else:
-                values.append(False)
-
-        return values
-
-    def read_discrete_inputs(self, start_address, count):
+        return unpack_bits(response[9:9 + byte_count], count)
+
+    def read_discrete_inputs(self, start_address, count, unit_id=None):
         """Leer discrete inputs (FC 02)"""
         transaction_id = self._get_next_transaction_id()
+        unit_id = self.slave_id if unit_id is None else unit_id
 
         request = struct.pack('>HHHBBHH',
             transaction_id,
             0,  # Protocol ID
             6,  # Length
-            self.slave_id,
+            unit_id,
             2,  # Function code
             start_address,
             count
@@ -166,47 +381,38 @@ class ModbusMasterTCP:
 
         # Verificar respuesta
         if len(response) < 9:
-            self._log("Respuesta demasiado corta")
+            self._trace.warning("Respuesta demasiado corta")
             return [False] * count
 
         # Verificar transaction ID
         resp_transaction_id = int.from_bytes(response[0:2], byteorder='big')
         if resp_transaction_id != transaction_id:
-            self._log(f"ID de transacción incorrecto: esperado {transaction_id}, recibido {resp_transaction_id}")
+            self._trace.warning("ID de transacción incorrecto: esperado %s, recibido %s", transaction_id, resp_transaction_id)
             return [False] * count
 
         if response[7] & 0x80:  # Excepción
             exception_code = response[8]
-            self._log(f"Excepción recibida: código {exception_code}")
+            self._trace.warning("Excepción recibida: código %s", exception_code)
             return [False] * count
 
-        if response[6] != self.slave_id:
-            self._log(f"Unit ID incorrecto: esperado {self.slave_id}, recibido {response[6]}")
+        if response[6] != unit_id:
+            self._trace.warning("Unit ID incorrecto: esperado %s, recibido %s", unit_id, response[6])
             return [False] * count
 
         # Extraer valores
         byte_count = response[8]
-        values = []
-        for i in range(count):
-            byte_index = i // 8
-            bit_index = i % 8
-            if byte_index < byte_count:
-                byte_value = response[9 + byte_index]
-                values.append(bool(byte_value & (1 << bit_index)))
-            else:
-                values.append(False)
-
-        return values
-
-    def read_holding_registers(self, start_address, count):
+        return unpack_bits(response[9:9 + byte_count], count)
+
+    def read_holding_registers(self, start_address, count, unit_id=None, as_array=False):
         """Leer holding registers (FC 03)"""
         transaction_id = self._get_next_transaction_id()
+        unit_id = self.slave_id if unit_id is None else unit_id
 
         request = struct.pack('>HHHBBHH',
             transaction_id,
             0,  # Protocol ID
             6,  # Length
-            self.slave_id,
+            unit_id,
             3,  # Function code
             start_address,
             count
@@ -214,46 +420,42 @@ class ModbusMasterTCP:
 
         response = self.send_request(request)
         if not response:
-            return [0] * count
+            return empty_registers(count, as_array)
 
         # Verificar respuesta
         if len(response) < 9:
-            self._log("Respuesta demasiado corta")
-            return [0] * count
+            self._trace.warning("Respuesta demasiado corta")
+            return empty_registers(count, as_array)
 
         # Verificar transaction ID
         resp_transaction_id = int.from_bytes(response[0:2], byteorder='big')
         if resp_transaction_id != transaction_id:
-            self._log(f"ID de transacción incorrecto: esperado {transaction_id}, recibido {resp_transaction_id}")
-            return [0] * count
+            self._trace.warning("ID de transacción incorrecto: esperado %s, recibido %s", transaction_id, resp_transaction_id)
+            return empty_registers(count, as_array)
 
         if response[7] & 0x80:  # Excepción
             exception_code = response[8]
-            self._log(f"Excepción recibida: código {exception_code}")
-            return [0] * count
+            self._trace.warning("Excepción recibida: código %s", exception_code)
+            return empty_registers(count, as_array)
 
-        if response[6] != self.slave_id:
-            self._log(f"Unit ID incorrecto: esperado {self.slave_id}, recibido {response[6]}")
-            return [0] * count
+        if response[6] != unit_id:
+            self._trace.warning("Unit ID incorrecto: esperado %s, recibido %s", unit_id, response[6])
+            return empty_registers(count, as_array)
 
         # Extraer valores
         byte_count = response[8]
-        values = []
-        for i in range(byte_count // 2):
-            value = struct.unpack('>H', response[9 + i*2:11 + i*2])[0]
-            values.append(value)
-
-        return values
+        return unpack_registers(response[9:9 + byte_count], as_array)
 
-    def read_input_registers(self, start_address, count):
+    def read_input_registers(self, start_address, count, unit_id=None, as_array=False):
         """Leer input registers (FC 04)"""
         transaction_id = self._get_next_transaction_id()
+        unit_id = self.slave_id if unit_id is None else unit_id
 
         request = struct.pack('>HHHBBHH',
             transaction_id,
             0,  # Protocol ID
             6,  # Length
-            self.slave_id,
+            unit_id,
             4,  # Function code
             start_address,
             count
@@ -261,42 +463,38 @@ class ModbusMasterTCP:
 
         response = self.send_request(request)
         if not response:
-            return [0] * count
+            return empty_registers(count, as_array)
 
         # Verificar respuesta
         if len(response) < 9:
-            self._log("Respuesta demasiado corta")
-            return [0] * count
+            self._trace.warning("Respuesta demasiado corta")
+            return empty_registers(count, as_array)
 
         # Verificar transaction ID
         resp_transaction_id = int.from_bytes(response[0:2], byteorder='big')
         if resp_transaction_id != transaction_id:
-            self._log(f"ID de transacción incorrecto: esperado {transaction_id}, recibido {resp_transaction_id}")
-            return [0] * count
+            self._trace.warning("ID de transacción incorrecto: esperado %s, recibido %s", transaction_id, resp_transaction_id)
+            return empty_registers(count, as_array)
 
         if response[7] & 0x80:  # Excepción
             exception_code = response[8]
-            self._log(f"Excepción recibida: código {exception_code}")
-            return [0] * count
+            self._trace.warning("Excepción recibida: código %s", exception_code)
+            return empty_registers(count, as_array)
 
-        if response[6] != self.slave_id:
-            self._log(f"Unit ID incorrecto: esperado {self.slave_id}, recibido {response[6]}")
-            return [0] * count
+        if response[6] != unit_id:
+            self._trace.warning("Unit ID incorrecto: esperado %s, recibido %s", unit_id, response[6])
+            return empty_registers(count, as_array)
 
         # Extraer valores
         byte_count = response[8]
-        values = []
-        for i in range(byte_count // 2):
-            value = struct.unpack('>H', response[9 + i*2:11 + i*2])[0]
-            values.append(value)
-
-        return values
+        return unpack_registers(response[9:9 + byte_count], as_array)
 
     # === FUNCIONES DE ESCRITURA ===
 
-    def write_single_coil(self, address, value):
+    def write_single_coil(self, address, value, unit_id=None):
         """Escribir single coil (FC 05)"""
         transaction_id = self._get_next_transaction_id()
+        unit_id = self.slave_id if unit_id is None else unit_id
 
         coil_value = 0xFF00 if value else 0x0000
 
@@ -304,7 +502,7 @@ class ModbusMasterTCP:
             transaction_id,
             0,  # Protocol ID
             6,  # Length
-            self.slave_id,
+            unit_id,
             5,  # Function code
             address,
             coil_value
@@ -316,31 +514,32 @@ class ModbusMasterTCP:
 
         # Verificar respuesta
         if len(response) < 12:
-            self._log("Respuesta demasiado corta")
+            self._trace.warning("Respuesta demasiado corta")
             return False
 
         # Verificar transaction ID
         resp_transaction_id = int.from_bytes(response[0:2], byteorder='big')
         if resp_transaction_id != transaction_id:
-            self._log(f"ID de transacción incorrecto: esperado {transaction_id}, recibido {resp_transaction_id}")
+            self._trace.warning("ID de transacción incorrecto: esperado %s, recibido %s", transaction_id, resp_transaction_id)
             return False
 
         if response[7] & 0x80:  # Excepción
             exception_code = response[8]
-            self._log(f"Excepción recibida: código {exception_code}")
+            self._trace.warning("Excepción recibida: código %s", exception_code)
             return False
 
         return True
 
-    def write_single_register(self, address, value):
+    def write_single_register(self, address, value, unit_id=None):
         """Escribir single register (FC 06)"""
         transaction_id = self._get_next_transaction_id()
+        unit_id = self.slave_id if unit_id is None else unit_id
 
         request = struct.pack('>HHHBBHH',
             transaction_id,
             0,  # Protocol ID
             6,  # Length
-            self.slave_id,
+            unit_id,
             6,  # Function code
             address,
             value
@@ -352,45 +551,41 @@ class ModbusMasterTCP:
 
         # Verificar respuesta
         if len(response) < 12:
-            self._log("Respuesta demasiado corta")
+            self._trace.warning("Respuesta demasiado corta")
             return False
 
         # Verificar transaction ID
         resp_transaction_id = int.from_bytes(response[0:2], byteorder='big')
         if resp_transaction_id != transaction_id:
-            self._log(f"ID de transacción incorrecto: esperado {transaction_id}, recibido {resp_transaction_id}")
+            self._trace.warning("ID de transacción incorrecto: esperado %s, recibido %s", transaction_id, resp_transaction_id)
             return False
 
         if response[7] & 0x80:  # Excepción
             exception_code = response[8]
-            self._log(f"Excepción recibida: código {exception_code}")
+            self._trace.warning("Excepción recibida: código %s", exception_code)
             return False
 
         return True
 
-    def write_multiple_coils(self, address, values):
+    def write_multiple_coils(self, address, values, unit_id=None):
         """Escribir multiple coils (FC 15)"""
         transaction_id = self._get_next_transaction_id()
+        unit_id = self.slave_id if unit_id is None else unit_id
 
         coil_count = len(values)
         byte_count = (coil_count + 7) // 8
 
         # Empaquetar valores en bytes
-        coils_bytes = bytearray(byte_count)
-        for i, value in enumerate(values):
-            if value:
-                byte_index = i // 8
-                bit_index = i % 8
-                coils_bytes[byte_index] |= (1 << bit_index)
+        coils_bytes = pack_bits(values)
 
         length = 7 + byte_count
 
         request = bytearray()
-        request.extend(struct.pack('>HHHBBH',
+        request.extend(struct.pack('>HHHBBHH',
             transaction_id,
             0,  # Protocol ID
             length,
-            self.slave_id,
+            unit_id,
             15,  # Function code
             address,
             coil_count
@@ -404,44 +599,43 @@ class ModbusMasterTCP:
 
         # Verificar respuesta
         if len(response) < 12:
-            self._log("Respuesta demasiado corta")
+            self._trace.warning("Respuesta demasiado corta")
             return False
 
         # Verificar transaction ID
         resp_transaction_id = int.from_bytes(response[0:2], byteorder='big')
         if resp_transaction_id != transaction_id:
-            self._log(f"ID de transacción incorrecto: esperado {transaction_id}, recibido {resp_transaction_id}")
+            self._trace.warning("ID de transacción incorrecto: esperado %s, recibido %s", transaction_id, resp_transaction_id)
             return False
 
         if response[7] & 0x80:  # Excepción
             exception_code = response[8]
-            self._log(f"Excepción recibida: código {exception_code}")
+            self._trace.warning("Excepción recibida: código %s", exception_code)
             return False
 
         return True
 
-    def write_multiple_registers(self, address, values):
+    def write_multiple_registers(self, address, values, unit_id=None):
         """Escribir multiple registers (FC 16)"""
         transaction_id = self._get_next_transaction_id()
+        unit_id = self.slave_id if unit_id is None else unit_id
 
         register_count = len(values)
         byte_count = register_count * 2
         length = 7 + byte_count
 
         request = bytearray()
-        request.extend(struct.pack('>HHHBBH',
+        request.extend(struct.pack('>HHHBBHH',
             transaction_id,
             0,  # Protocol ID
             length,
-            self.slave_id,
+            unit_id,
             16,  # Function code
             address,
             register_count
         ))
         request.append(byte_count)
-
-        for value in values:
-            request.extend(struct.pack('>H', value))
+        request.extend(pack_registers(values))
 
         response = self.send_request(request)
         if not response:
@@ -449,18 +643,18 @@ class ModbusMasterTCP:
 
         # Verificar respuesta
         if len(response) < 12:
-            self._log("Respuesta demasiado corta")
+            self._trace.warning("Respuesta demasiado corta")
             return False
 
         # Verificar transaction ID
         resp_transaction_id = int.from_bytes(response[0:2], byteorder='big')
         if resp_transaction_id != transaction_id:
-            self._log(f"ID de transacción incorrecto: esperado {transaction_id}, recibido {resp_transaction_id}")
+            self._trace.warning("ID de transacción incorrecto: esperado %s, recibido %s", transaction_id, resp_transaction_id)
             return False
 
         if response[7] & 0x80:  # Excepción
             exception_code = response[8]
-            self._log(f"Excepción recibida: código {exception_code}")
+            self._trace.warning("Excepción recibida: código %s", exception_code)
             return False
 
         return True
\ No newline at end of file
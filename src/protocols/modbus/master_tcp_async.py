@@ -0,0 +1,460 @@
+#!/usr/bin/env python3
+"""
+Master Modbus TCP asíncrono - Implementación limpia para ComSuite
+Misma API que ModbusMasterTCP pero con corrutinas asyncio, de modo que un único
+event loop pueda atender cientos de conexiones a dispositivos en paralelo.
+"""
+
+import asyncio
+import struct
+import threading
+
+from .mbap_framer import MBAPFramer
+from .packing import empty_registers, pack_bits, pack_registers, unpack_bits, unpack_registers
+from .tracing import Tracer
+
+
+class _MBAPClientProtocol(asyncio.Protocol):
+    """Protocolo asyncio que separa ADUs y las entrega por transaction ID"""
+
+    def __init__(self, master):
+        self._master = master
+        self._framer = MBAPFramer()
+        self.transport = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def data_received(self, data):
+        self._framer.feed(data)
+        for adu in self._framer.frames():
+            self._master._on_response(bytes(adu))
+
+    def connection_lost(self, exc):
+        self._master._on_connection_lost(self.transport, exc)
+
+
+class AsyncModbusMasterTCP:
+    """Master Modbus TCP basado en asyncio con todas las funciones Modbus"""
+
+    def __init__(self, ip='127.0.0.1', port=502, slave_id=1, max_in_flight=1):
+        self.ip = ip
+        self.port = port
+        self.slave_id = slave_id
+        self.connected = False
+        self.transaction_id = 0
+        self.timeout = 3.0
+        self.max_in_flight = max(1, int(max_in_flight))
+
+        self._transport = None
+        self._pending = {}  # transaction_id -> asyncio.Future
+        self._slots = None
+        self._connect_lock = None
+
+        # Trazas de logging y diagnóstico (tramas)
+        self._trace = Tracer("Master async")
+
+    def set_log_callback(self, callback):
+        """Establecer callback para logging (recibe el texto ya formateado)"""
+        self._trace.set_log_sink(callback)
+
+    def set_frame_callback(self, callback):
+        """Establecer callback para tramas"""
+        self._trace.set_frame_sink(callback)
+
+    def set_capture(self, writer, device=None):
+        """Grabar las tramas en un CaptureWriter (device por defecto: "ip:puerto")"""
+        self._trace.set_capture(writer, device or f"{self.ip}:{self.port}")
+
+    def set_trace_level(self, level):
+        """Nivel mínimo de trazas ('DEBUG' incluye el detalle de cada petición)"""
+        self._trace.set_level(level)
+
+    def _get_next_transaction_id(self):
+        """Obtener siguiente ID de transacción"""
+        self.transaction_id = (self.transaction_id + 1) % 65536
+        while self.transaction_id in self._pending:
+            self.transaction_id = (self.transaction_id + 1) % 65536
+        return self.transaction_id
+
+    async def connect(self):
+        """Conectar al slave"""
+        # Los primitivos asyncio se crean dentro del loop que los usará
+        if self._connect_lock is None:
+            self._connect_lock = asyncio.Lock()
+            self._slots = asyncio.Semaphore(self.max_in_flight)
+
+        async with self._connect_lock:
+            if self.connected:
+                return True
+            try:
+                loop = asyncio.get_running_loop()
+                self._transport, _ = await asyncio.wait_for(
+                    loop.create_connection(lambda: _MBAPClientProtocol(self), self.ip, self.port),
+                    self.timeout
+                )
+                self.connected = True
+                self._trace.info("Conectado a %s:%s", self.ip, self.port)
+                return True
+            except Exception as e:
+                self._trace.error("Error al conectar a %s:%s: %s", self.ip, self.port, e)
+                return False
+
+    async def disconnect(self):
+        """Desconectar del slave"""
+        if self._transport:
+            self._transport.close()
+            self._transport = None
+        self.connected = False
+        self._fail_pending()
+        self._trace.info("Desconectado")
+
+    def _on_response(self, response):
+        """Entregar una ADU recibida a la petición que la espera"""
+        self._trace.frame("RECIBIDO", response)
+
+        transaction_id = int.from_bytes(response[0:2], byteorder='big')
+        future = self._pending.pop(transaction_id, None)
+        if future and not future.done():
+            future.set_result(response)
+        else:
+            self._trace.warning("Respuesta sin transacción pendiente: ID %s", transaction_id)
+
+    def _on_connection_lost(self, transport, exc):
+        """El slave cerró la conexión o hubo un error de red"""
+        # Un aviso tardío de un transporte ya sustituido no afecta a la conexión actual
+        if transport is not self._transport:
+            return
+        if self.connected and exc:
+            self._trace.error("Error en comunicación: %s", exc)
+        self.connected = False
+        self._transport = None
+        self._fail_pending()
+
+    def _fail_pending(self):
+        """Completar con None todas las peticiones en vuelo"""
+        pending = list(self._pending.values())
+        self._pending.clear()
+        for future in pending:
+            if not future.done():
+                future.set_result(None)
+
+    async def send_request(self, request):
+        """Enviar petición y esperar su respuesta"""
+        if not self.connected and not await self.connect():
+            return None
+
+        transaction_id = int.from_bytes(request[0:2], byteorder='big')
+
+        async with self._slots:
+            # La conexión pudo cerrarse mientras se esperaba un hueco
+            transport = self._transport
+            if not self.connected or transport is None:
+                self._trace.warning("Conexión cerrada antes de enviar la petición")
+                return None
+
+            future = asyncio.get_running_loop().create_future()
+            self._pending[transaction_id] = future
+
+            self._trace.frame("ENVIADO", request)
+            transport.write(request)
+
+            try:
+                return await asyncio.wait_for(future, self.timeout)
+            except asyncio.TimeoutError:
+                self._pending.pop(transaction_id, None)
+                self._trace.warning("Timeout esperando respuesta")
+                return None
+
+    def _check_response(self, response, transaction_id, min_length):
+        """Validar encabezado, excepción y unit ID de una respuesta"""
+        if not response:
+            return False
+
+        if len(response) < 9:
+            self._trace.warning("Respuesta demasiado corta")
+            return False
+
+        resp_transaction_id = int.from_bytes(response[0:2], byteorder='big')
+        if resp_transaction_id != transaction_id:
+            self._trace.warning("ID de transacción incorrecto: esperado %s, recibido %s", transaction_id, resp_transaction_id)
+            return False
+
+        if response[7] & 0x80:  # Excepción
+            self._trace.warning("Excepción recibida: código %s", response[8])
+            return False
+
+        if len(response) < min_length:
+            self._trace.warning("Respuesta demasiado corta")
+            return False
+
+        return True
+
+    def _unit(self, unit_id):
+        """Unit ID de la petición: el indicado o el del master"""
+        return self.slave_id if unit_id is None else unit_id
+
+    async def _read_bits(self, function_code, start_address, count, unit_id):
+        """Lectura de bits (FC 01 / FC 02)"""
+        transaction_id = self._get_next_transaction_id()
+        request = struct.pack('>HHHBBHH', transaction_id, 0, 6, unit_id,
+                              function_code, start_address, count)
+
+        response = await self.send_request(request)
+        if not self._check_response(response, transaction_id, 9):
+            return [False] * count
+
+        if response[6] != unit_id:
+            self._trace.warning("Unit ID incorrecto: esperado %s, recibido %s", unit_id, response[6])
+            return [False] * count
+
+        byte_count = response[8]
+        return unpack_bits(response[9:9 + byte_count], count)
+
+    async def _read_registers(self, function_code, start_address, count, unit_id, as_array=False):
+        """Lectura de registros (FC 03 / FC 04)"""
+        transaction_id = self._get_next_transaction_id()
+        request = struct.pack('>HHHBBHH', transaction_id, 0, 6, unit_id,
+                              function_code, start_address, count)
+
+        response = await self.send_request(request)
+        if not self._check_response(response, transaction_id, 9):
+            return empty_registers(count, as_array)
+
+        if response[6] != unit_id:
+            self._trace.warning("Unit ID incorrecto: esperado %s, recibido %s", unit_id, response[6])
+            return empty_registers(count, as_array)
+
+        byte_count = response[8]
+        return unpack_registers(response[9:9 + byte_count], as_array)
+
+    async def _write(self, request, transaction_id):
+        """Enviar una escritura y validar el eco"""
+        response = await self.send_request(request)
+        return self._check_response(response, transaction_id, 12)
+
+    # === FUNCIONES DE LECTURA ===
+
+    async def read_coils(self, start_address, count, unit_id=None):
+        """Leer coils (FC 01)"""
+        return await self._read_bits(1, start_address, count, self._unit(unit_id))
+
+    async def read_discrete_inputs(self, start_address, count, unit_id=None):
+        """Leer discrete inputs (FC 02)"""
+        return await self._read_bits(2, start_address, count, self._unit(unit_id))
+
+    async def read_holding_registers(self, start_address, count, unit_id=None, as_array=False):
+        """Leer holding registers (FC 03)"""
+        return await self._read_registers(3, start_address, count, self._unit(unit_id), as_array)
+
+    async def read_input_registers(self, start_address, count, unit_id=None, as_array=False):
+        """Leer input registers (FC 04)"""
+        return await self._read_registers(4, start_address, count, self._unit(unit_id), as_array)
+
+    # === FUNCIONES DE ESCRITURA ===
+
+    async def write_single_coil(self, address, value, unit_id=None):
+        """Escribir single coil (FC 05)"""
+        transaction_id = self._get_next_transaction_id()
+        unit_id = self._unit(unit_id)
+        request = struct.pack('>HHHBBHH', transaction_id, 0, 6, unit_id,
+                              5, address, 0xFF00 if value else 0x0000)
+        return await self._write(request, transaction_id)
+
+    async def write_single_register(self, address, value, unit_id=None):
+        """Escribir single register (FC 06)"""
+        transaction_id = self._get_next_transaction_id()
+        unit_id = self._unit(unit_id)
+        request = struct.pack('>HHHBBHH', transaction_id, 0, 6, unit_id,
+                              6, address, value)
+        return await self._write(request, transaction_id)
+
+    async def write_multiple_coils(self, address, values, unit_id=None):
+        """Escribir multiple coils (FC 15)"""
+        transaction_id = self._get_next_transaction_id()
+        unit_id = self._unit(unit_id)
+
+        coil_count = len(values)
+        byte_count = (coil_count + 7) // 8
+        coils_bytes = pack_bits(values)
+
+        request = bytearray(struct.pack('>HHHBBHH', transaction_id, 0, 7 + byte_count,
+                                        unit_id, 15, address, coil_count))
+        request.append(byte_count)
+        request.extend(coils_bytes)
+        return await self._write(bytes(request), transaction_id)
+
+    async def write_multiple_registers(self, address, values, unit_id=None):
+        """Escribir multiple registers (FC 16)"""
+        transaction_id = self._get_next_transaction_id()
+        unit_id = self._unit(unit_id)
+
+        register_count = len(values)
+        byte_count = register_count * 2
+
+        request = bytearray(struct.pack('>HHHBBHH', transaction_id, 0, 7 + byte_count,
+                                        unit_id, 16, address, register_count))
+        request.append(byte_count)
+        request.extend(pack_registers(values))
+        return await self._write(bytes(request), transaction_id)
+
+
+class AsyncModbusEngine:
+    """Event loop dedicado, en un hilo propio, compartido por los masters asíncronos"""
+
+    def __init__(self):
+        self._loop = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    @property
+    def loop(self):
+        """Event loop del motor (se arranca bajo demanda)"""
+        self.start()
+        return self._loop
+
+    def is_running(self):
+        """Indica si el hilo del event loop está activo"""
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """Arrancar el event loop en segundo plano"""
+        with self._lock:
+            if self.is_running():
+                return
+            self._loop = asyncio.new_event_loop()
+            ready = threading.Event()
+
+            def run_loop():
+                asyncio.set_event_loop(self._loop)
+                self._loop.call_soon(ready.set)
+                self._loop.run_forever()
+
+            self._thread = threading.Thread(target=run_loop, name="modbus-asyncio", daemon=True)
+            self._thread.start()
+            ready.wait()
+
+    def stop(self):
+        """Detener el event loop"""
+        with self._lock:
+            if not self.is_running():
+                return
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(timeout=2.0)
+            self._thread = None
+
+    def submit(self, coro):
+        """Programar una corrutina y devolver un concurrent.futures.Future"""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def run(self, coro, timeout=None):
+        """Ejecutar una corrutina desde código síncrono y esperar su resultado"""
+        return self.submit(coro).result(timeout)
+
+    def run_many(self, coros, timeout=None):
+        """Ejecutar varias corrutinas en paralelo y devolver sus resultados en orden"""
+        async def gather():
+            return await asyncio.gather(*coros)
+        return self.run(gather(), timeout)
+
+
+_default_engine = None
+_default_engine_lock = threading.Lock()
+
+
+def get_default_engine():
+    """Motor asyncio compartido por toda la aplicación"""
+    global _default_engine
+    with _default_engine_lock:
+        if _default_engine is None:
+            _default_engine = AsyncModbusEngine()
+        return _default_engine
+
+
+class EngineModbusMasterTCP:
+    """Fachada síncrona de AsyncModbusMasterTCP sobre un AsyncModbusEngine.
+
+    Permite usar el master asíncrono desde ModbusProtocol/ModbusDevice, que
+    esperan la API bloqueante de ModbusMasterTCP, mientras todas las
+    conexiones comparten un único event loop.
+    """
+
+    def __init__(self, ip='127.0.0.1', port=502, slave_id=1, max_in_flight=1, engine=None):
+        self.engine = engine or get_default_engine()
+        self.master = AsyncModbusMasterTCP(ip=ip, port=port, slave_id=slave_id,
+                                           max_in_flight=max_in_flight)
+
+    @property
+    def connected(self):
+        return self.master.connected
+
+    @property
+    def slave_id(self):
+        return self.master.slave_id
+
+    @property
+    def max_in_flight(self):
+        return self.master.max_in_flight
+
+    @property
+    def timeout(self):
+        return self.master.timeout
+
+    def set_log_callback(self, callback):
+        """Establecer callback para logging"""
+        self.master.set_log_callback(callback)
+
+    def set_frame_callback(self, callback):
+        """Establecer callback para tramas"""
+        self.master.set_frame_callback(callback)
+
+    def set_trace_level(self, level):
+        """Nivel mínimo de trazas"""
+        self.master.set_trace_level(level)
+
+    def set_capture(self, writer, device=None):
+        """Grabar las tramas en un CaptureWriter"""
+        self.master.set_capture(writer, device)
+
+    def _run(self, coro):
+        return self.engine.run(coro)
+
+    def connect(self):
+        """Conectar al slave"""
+        return self._run(self.master.connect())
+
+    def disconnect(self):
+        """Desconectar del slave"""
+        self._run(self.master.disconnect())
+
+    def read_coils(self, start_address, count, unit_id=None):
+        """Leer coils (FC 01)"""
+        return self._run(self.master.read_coils(start_address, count, unit_id))
+
+    def read_discrete_inputs(self, start_address, count, unit_id=None):
+        """Leer discrete inputs (FC 02)"""
+        return self._run(self.master.read_discrete_inputs(start_address, count, unit_id))
+
+    def read_holding_registers(self, start_address, count, unit_id=None, as_array=False):
+        """Leer holding registers (FC 03)"""
+        return self._run(self.master.read_holding_registers(start_address, count, unit_id, as_array))
+
+    def read_input_registers(self, start_address, count, unit_id=None, as_array=False):
+        """Leer input registers (FC 04)"""
+        return self._run(self.master.read_input_registers(start_address, count, unit_id, as_array))
+
+    def write_single_coil(self, address, value, unit_id=None):
+        """Escribir single coil (FC 05)"""
+        return self._run(self.master.write_single_coil(address, value, unit_id))
+
+    def write_single_register(self, address, value, unit_id=None):
+        """Escribir single register (FC 06)"""
+        return self._run(self.master.write_single_register(address, value, unit_id))
+
+    def write_multiple_coils(self, address, values, unit_id=None):
+        """Escribir multiple coils (FC 15)"""
+        return self._run(self.master.write_multiple_coils(address, values, unit_id))
+
+    def write_multiple_registers(self, address, values, unit_id=None):
+        """Escribir multiple registers (FC 16)"""
+        return self._run(self.master.write_multiple_registers(address, values, unit_id))
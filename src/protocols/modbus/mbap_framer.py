@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Framer MBAP incremental - Implementación limpia para ComSuite
+Separa un flujo TCP en ADUs Modbus completas, sin copiar los datos recibidos.
+"""
+
+
+class MBAPFramer:
+    """Acumula bytes de un socket y entrega ADUs Modbus TCP completas.
+
+    TCP no respeta los límites de trama: un recv() puede traer media ADU o
+    varias seguidas. El framer lee el encabezado MBAP de 7 bytes, espera a
+    tener los `length` bytes anunciados y entrega cada ADU como memoryview
+    sobre su buffer interno. La vista solo es válida hasta la siguiente
+    llamada a recv_from() o feed(); quien necesite conservarla debe copiarla.
+    """
+
+    HEADER_SIZE = 7
+    MIN_LENGTH = 2      # Unit ID + código de función
+    MAX_LENGTH = 254    # Unit ID + PDU de 253 bytes
+
+    def __init__(self, buffer_size=4096):
+        self._buffer = bytearray(max(buffer_size, 6 + self.MAX_LENGTH))
+        self._view = memoryview(self._buffer)
+        self._start = 0
+        self._end = 0
+
+        # Estadísticas de diagnóstico
+        self.frames_count = 0
+        self.discarded_bytes = 0
+        self.errors = 0
+
+    @property
+    def pending(self):
+        """Bytes recibidos que aún no forman una ADU completa"""
+        return self._end - self._start
+
+    def reset(self):
+        """Descartar cualquier dato pendiente (p. ej. al reconectar)"""
+        self._start = 0
+        self._end = 0
+
+    def recv_from(self, sock):
+        """Leer del socket directamente sobre el buffer interno.
+
+        Devuelve la cantidad de bytes leídos; 0 indica conexión cerrada.
+        Propaga socket.timeout igual que recv().
+        """
+        self._ensure_space(self.HEADER_SIZE + self.MAX_LENGTH)
+        received = sock.recv_into(self._view[self._end:])
+        self._end += received
+        return received
+
+    def feed(self, data):
+        """Agregar bytes ya recibidos por otro medio"""
+        size = len(data)
+        self._ensure_space(size)
+        self._view[self._end:self._end + size] = data
+        self._end += size
+
+    def frames(self):
+        """Generar las ADUs completas disponibles en el buffer"""
+        buffer = self._buffer
+        while self._end - self._start >= self.HEADER_SIZE:
+            start = self._start
+            length = (buffer[start + 4] << 8) | buffer[start + 5]
+
+            # Protocol ID distinto de 0 o longitud imposible: el flujo está
+            # desincronizado y no hay forma fiable de encontrar la siguiente trama
+            if buffer[start + 2] or buffer[start + 3] or not (self.MIN_LENGTH <= length <= self.MAX_LENGTH):
+                self.errors += 1
+                self.discarded_bytes += self._end - start
+                self.reset()
+                return
+
+            size = 6 + length
+            if self._end - start < size:
+                return
+
+            self._start = start + size
+            self.frames_count += 1
+            yield self._view[start:start + size]
+
+        if self._start == self._end:
+            self.reset()
+
+    def _ensure_space(self, size):
+        """Garantizar size bytes libres al final del buffer"""
+        if len(self._buffer) - self._end >= size:
+            return
+
+        # Compactar: mover la ADU parcial al inicio (a lo sumo 260 bytes)
+        pending = self._end - self._start
+        if self._start:
+            self._buffer[0:pending] = bytes(self._view[self._start:self._end])
+            self._start = 0
+            self._end = pending
+
+        if len(self._buffer) - self._end < size:
+            # Buffer nuevo en lugar de extender el actual: un bytearray no puede
+            # cambiar de tamaño mientras el llamador conserve una ADU entregada
+            buffer = bytearray(max(2 * len(self._buffer), self._end + size))
+            buffer[:self._end] = self._view[:self._end]
+            self._buffer = buffer
+            self._view = memoryview(buffer)
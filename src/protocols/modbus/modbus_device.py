@@ -3,6 +3,7 @@
 
 from typing import List, Dict, Any, Optional
 from protocols.base_protocol.device_interface import DeviceInterface, DeviceStatus
+from protocols.modbus.read_planner import DEFAULT_MAX_GAP, ReadPlan, plan_reads, plan_register_list
 
 class ModbusDevice(DeviceInterface):
     """
@@ -179,6 +180,66 @@ class ModbusDevice(DeviceInterface):
             self._last_error = str(e)
             return []
     
+    def read_plan(self, plan: ReadPlan) -> Dict[Any, Any]:
+        """
+        Ejecuta un plan de lecturas agrupadas y reparte los valores.
+        
+        Args:
+            plan: Plan generado por protocols.modbus.read_planner
+        
+        Returns:
+            Dict[Any, Any]: Valor leído por cada clave del plan (None si su bloque falló)
+        """
+        return plan.demultiplex(self.read_plan_blocks(plan))
+    
+    def read_plan_blocks(self, plan: ReadPlan) -> List[Optional[List[Any]]]:
+        """
+        Ejecuta las peticiones de un plan sin repartir los valores.
+        
+        Args:
+            plan: Plan generado por protocols.modbus.read_planner
+        
+        Returns:
+            List: Valores de cada bloque del plan (None si la lectura falló)
+        """
+        readers = {
+            1: self.read_coils,
+            2: self.read_discrete_inputs,
+            3: self.read_registers,
+            4: self.read_input_registers,
+        }
+        block_values = []
+        for block in plan.blocks:
+            values = readers[block.function_code](block.start, block.count)
+            block_values.append(values if values and len(values) >= block.count else None)
+        return block_values
+    
+    def read_parameters(self, items, function_code: int = 3,
+                        max_gap: int = DEFAULT_MAX_GAP) -> Dict[Any, Any]:
+        """
+        Lee un conjunto de direcciones dispersas con el mínimo de peticiones.
+        
+        Args:
+            items: Direcciones o tuplas (clave, dirección[, registros])
+            function_code: Función de lectura (1-4)
+            max_gap: Registros sin usar que se aceptan leer para unir tramos
+        
+        Returns:
+            Dict[Any, Any]: Valor leído por cada clave
+        """
+        return self.read_plan(plan_reads(items, function_code, max_gap))
+    
+    def read_register_list(self, registers: List[Dict[str, Any]],
+                           max_gap: int = DEFAULT_MAX_GAP) -> List[Any]:
+        """
+        Lee la lista de registros adjunta al dispositivo ({'function', 'address'}).
+        
+        Returns:
+            List[Any]: Valor de cada registro en el mismo orden (None si no es legible)
+        """
+        results = self.read_plan(plan_register_list(registers, max_gap))
+        return [results.get(index) for index in range(len(registers))]
+    
     def get_last_error(self) -> Optional[str]:
         """
         Obtiene el último error ocurrido.
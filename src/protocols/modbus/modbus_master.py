@@ -28,6 +28,14 @@ class ModbusMaster:
         """Establecer callback para tramas"""
         self._master.set_frame_callback(callback)
 
+    def set_trace_level(self, level):
+        """Nivel mínimo de trazas"""
+        self._master.set_trace_level(level)
+
+    def set_capture(self, writer, device=None):
+        """Grabar las tramas en un CaptureWriter"""
+        self._master.set_capture(writer, device)
+
     def connect(self):
         """Conectar al dispositivo Modbus"""
         return self._master.connect()
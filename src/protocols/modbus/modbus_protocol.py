@@ -24,6 +24,7 @@ class ModbusProtocol(ProtocolInterface):
         # Referencias a tus clases existentes
         self._master_instance = None
         self._slave_instance = None
+        self._capture = None  # CaptureWriter compartido (config['capture_path'])
     
     @property
     def name(self) -> str:
@@ -65,14 +66,62 @@ class ModbusProtocol(ProtocolInterface):
     def _connect_master(self, config: Dict[str, Any]) -> bool:
         """Conecta en modo Master usando tus clases existentes"""
         try:
-            if self._protocol_type == 'TCP':
+            if self._protocol_type == 'TCP' and config.get('shared_connection', True):
+                # Una conexión por gateway (IP:puerto) compartida por todos sus unit IDs
+                from .connection_registry import UnitMaster, get_default_registry
+                previous = self._master_instance
+                if isinstance(previous, UnitMaster) and (previous.ip, previous.port, previous.slave_id) == (
+                        config.get('ip', '127.0.0.1'), config.get('port', 502), config.get('slave_id', 1)):
+                    # Reconexión: el dispositivo conserva este master, reutilizarlo
+                    self._master_instance = previous
+                else:
+                    self._master_instance = get_default_registry().acquire(
+                        ip=config.get('ip', '127.0.0.1'),
+                        port=config.get('port', 502),
+                        unit_id=config.get('slave_id', 1),
+                        engine=config.get('engine', 'threads'),
+                        max_in_flight=config.get('max_in_flight', 1)
+                    )
+                if self._master_instance is None:
+                    print(f"❌ Sin conexiones disponibles hacia {config.get('ip', '127.0.0.1')}")
+                    return False
+            elif self._protocol_type == 'TCP' and config.get('engine') == 'asyncio':
+                # Master asíncrono: todas las conexiones comparten un event loop
+                from .master_tcp_async import EngineModbusMasterTCP
+                self._master_instance = EngineModbusMasterTCP(
+                    ip=config.get('ip', '127.0.0.1'),
+                    port=config.get('port', 502),
+                    slave_id=config.get('slave_id', 1),
+                    max_in_flight=config.get('max_in_flight', 1)
+                )
+            elif self._protocol_type == 'TCP':
                 from .master_tcp import ModbusMasterTCP
                 self._master_instance = ModbusMasterTCP(
                     ip=config.get('ip', '127.0.0.1'),
                     port=config.get('port', 502),
-                    slave_id=config.get('slave_id', 1)
+                    slave_id=config.get('slave_id', 1),
+                    max_in_flight=config.get('max_in_flight', 1)
                 )
-            else:  # RTU
+            elif config.get('shared_bus', True):
+                # RTU: un único dueño por puerto serie; los dispositivos del bus encolan sus transacciones
+                from .serial_bus import BusUnitMaster, get_default_bus_manager
+                previous = self._master_instance
+                if isinstance(previous, BusUnitMaster) and (previous.port, previous.slave_id) == (
+                        config.get('port', 'COM3'), config.get('slave_id', 1)):
+                    self._master_instance = previous
+                else:
+                    self._master_instance = get_default_bus_manager().acquire(
+                        port=config.get('port', 'COM3'),
+                        baudrate=config.get('baudrate', 9600),
+                        parity=config.get('parity', 'N'),
+                        stopbits=config.get('stopbits', 1),
+                        bytesize=config.get('bytesize', 8),
+                        unit_id=config.get('slave_id', 1)
+                    )
+                if self._master_instance is None:
+                    print(f"❌ El puerto {config.get('port', 'COM3')} ya está en uso con otra configuración")
+                    return False
+            else:  # RTU con puerto exclusivo
                 from .master_rtu import ModbusMasterRTU
                 self._master_instance = ModbusMasterRTU(
                     port=config.get('port', 'COM3'),
@@ -83,9 +132,10 @@ class ModbusProtocol(ProtocolInterface):
                     slave_id=config.get('slave_id', 1)
                 )
             
-            # Configurar callbacks para logging
-            self._master_instance.set_log_callback(self._log_callback)
-            self._master_instance.set_frame_callback(self._frame_callback)
+            # Trazas: van al módulo logging desde el hilo de trazas; el detalle
+            # de cada petición y las tramas solo con trace_level='DEBUG'
+            self._master_instance.set_trace_level(config.get('trace_level', 'INFO'))
+            self._attach_capture(self._master_instance, config)
             
             # Conectar
             if self._master_instance.connect():
@@ -130,9 +180,9 @@ class ModbusProtocol(ProtocolInterface):
                     slave_id=config.get('slave_id', 1)
                 )
             
-            # Configurar callbacks
-            self._slave_instance.set_log_callback(self._log_callback)
-            self._slave_instance.set_frame_callback(self._frame_callback)
+            # Trazas (ver _connect_master)
+            self._slave_instance.set_trace_level(config.get('trace_level', 'INFO'))
+            self._attach_capture(self._slave_instance, config)
             
             # Iniciar servidor slave
             if self._slave_instance.start():
@@ -166,6 +216,7 @@ class ModbusProtocol(ProtocolInterface):
                     self._slave_instance.stop()
                 
                 self._connected = False
+                self._release_capture()
                 print("✅ Modbus desconectado")
         except Exception as e:
             print(f"❌ Error al desconectar Modbus: {e}")
@@ -293,10 +344,24 @@ class ModbusProtocol(ProtocolInterface):
         print("✅ Configuración Modbus válida")
         return True
     
-    def _log_callback(self, message: str):
-        """Callback para mensajes de log"""
-        print(f"[Modbus] {message}")
+    def _attach_capture(self, instance, config: Dict[str, Any]):
+        """Grabar las tramas en config['capture_path'] (archivo compartido por todos los que lo usen)"""
+        self._release_capture()
+        path = config.get('capture_path')
+        if not path:
+            return
+        from .capture import open_shared_capture
+        self._capture = open_shared_capture(path)
+        try:
+            instance.set_capture(self._capture, config.get('capture_device'))
+        except ValueError:
+            # Conexión compartida que ya graba en otra captura
+            self._release_capture()
+            raise
     
-    def _frame_callback(self, direction: str, frame: bytes):
-        """Callback para tramas Modbus"""
-        print(f"[Modbus] {direction}: {frame.hex()}")
\ No newline at end of file
+    def _release_capture(self):
+        """Soltar el archivo de captura; el último usuario lo cierra"""
+        if self._capture is not None:
+            from .capture import release_shared_capture
+            release_shared_capture(self._capture)
+            self._capture = None
\ No newline at end of file
@@ -28,6 +28,14 @@ class ModbusSlave:
         """Establecer callback para tramas"""
         self._slave.set_frame_callback(callback)
 
+    def set_trace_level(self, level):
+        """Nivel mínimo de trazas"""
+        self._slave.set_trace_level(level)
+
+    def set_capture(self, writer, device=None):
+        """Grabar las tramas en un CaptureWriter"""
+        self._slave.set_capture(writer, device)
+
     def start(self):
         """Iniciar el slave"""
         return self._slave.start()
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Empaquetado de bits y registros Modbus - Implementación limpia para ComSuite
+Conversión en bloque entre listas de bools y los bytes de FC01/FC02/FC15
+(bit 0 del primer byte = primera dirección) y entre registros de 16 bits y su
+forma big-endian de FC03/FC04/FC16, sin recorrer bit a bit ni registro a registro.
+"""
+
+import sys
+from array import array
+from itertools import chain
+
+# Byte -> sus 8 bits como bools, del bit 0 al 7
+_BYTE_TO_BITS = [tuple(bool(byte >> bit & 1) for bit in range(8)) for byte in range(256)]
+
+# Modbus transmite big-endian; array('H') usa el orden nativo de la máquina
+_NATIVE_LITTLE_ENDIAN = sys.byteorder == 'little'
+
+# bytes 0x00/0x01 -> caracteres '0'/'1' para convertirlos con int(..., 2)
+_BITS_TO_ASCII = bytes.maketrans(b'\x00\x01', b'01')
+
+
+def pack_bits(values):
+    """Empaquetar una secuencia de bools en bytes (LSB primero)"""
+    count = len(values)
+    if not count:
+        return b''
+    try:
+        bits = bytes(values)  # bools -> 00/01 sin llamar a bool() por elemento
+    except (TypeError, ValueError):
+        bits = None
+    if bits is None or bits.translate(None, b'\x00\x01'):
+        bits = bytes(map(bool, values))  # Valores distintos de 0/1 (p. ej. enteros)
+    # Como texto binario invertido, int() da de una vez un entero cuyo bit i es values[i]
+    return int(bits.translate(_BITS_TO_ASCII)[::-1], 2).to_bytes((count + 7) // 8, 'little')
+
+
+def unpack_bits(data, count):
+    """Desempaquetar count bools de los bytes de una respuesta (LSB primero).
+
+    Si data trae menos bytes de los necesarios, los bits faltantes son False.
+    """
+    if count <= 0:
+        return []
+    values = list(chain.from_iterable(map(_BYTE_TO_BITS.__getitem__, data)))
+    if len(values) < count:
+        values.extend([False] * (count - len(values)))
+    else:
+        del values[count:]
+    return values
+
+
+def unpack_registers(data, as_array=False):
+    """Decodificar registros big-endian de una respuesta FC03/FC04 de una sola vez.
+
+    Devuelve una lista de enteros o, con as_array, un array('H') compacto.
+    """
+    registers = array('H')
+    registers.frombytes(data[:len(data) & ~1])
+    if _NATIVE_LITTLE_ENDIAN:
+        registers.byteswap()
+    return registers if as_array else registers.tolist()
+
+
+def pack_registers(values):
+    """Codificar registros de 16 bits en big-endian para FC16"""
+    registers = array('H', values)
+    if _NATIVE_LITTLE_ENDIAN:
+        registers.byteswap()
+    return registers.tobytes()
+
+
+def empty_registers(count, as_array=False):
+    """Registros en cero, valor devuelto por las lecturas fallidas"""
+    return array('H', bytes(2 * count)) if as_array else [0] * count
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Planificador de lecturas Modbus - Implementación limpia para ComSuite
+Agrupa direcciones dispersas en el mínimo número de peticiones FC01-FC04 y
+guarda un mapa para devolver cada valor al parámetro que lo pidió.
+"""
+
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Tuple
+
+# Cantidad máxima por petición según la especificación Modbus
+MAX_READ_COUNT = {1: 2000, 2: 2000, 3: 125, 4: 125}
+
+# Notación de tablas usada en las plantillas y el wizard de registros
+FUNCTION_BY_TABLE = {'0x': 1, '1x': 2, '3x': 4, '4x': 3}
+
+# Registros sin usar que compensa leer de más antes de abrir otra petición
+DEFAULT_MAX_GAP = 8
+
+
+@dataclass
+class ReadBlock:
+    """Una petición de lectura contigua"""
+    function_code: int
+    start: int
+    count: int
+
+    @property
+    def end(self) -> int:
+        return self.start + self.count
+
+
+@dataclass
+class ReadPlan:
+    """Peticiones a realizar y ubicación de cada parámetro en sus respuestas"""
+    blocks: List[ReadBlock] = field(default_factory=list)
+    # clave -> (índice de bloque, desplazamiento, cantidad de registros)
+    demux: Dict[Any, Tuple[int, int, int]] = field(default_factory=dict)
+
+    def extend(self, other: 'ReadPlan') -> None:
+        """Agregar los bloques de otro plan (p. ej. de otra función)"""
+        base = len(self.blocks)
+        self.blocks.extend(other.blocks)
+        for key, (block_index, offset, size) in other.demux.items():
+            self.demux[key] = (base + block_index, offset, size)
+
+    def demultiplex(self, block_values: List[List[Any]]) -> Dict[Any, Any]:
+        """Repartir los valores leídos de cada bloque entre los parámetros.
+
+        Los parámetros de un registro reciben el valor; los de varios
+        registros (32 bits, float) reciben la lista de sus registros.
+        """
+        results = {}
+        for key, (block_index, offset, size) in self.demux.items():
+            values = block_values[block_index]
+            if values is None or offset + size > len(values):
+                results[key] = None
+            elif size == 1:
+                results[key] = values[offset]
+            else:
+                results[key] = list(values[offset:offset + size])
+        return results
+
+    @property
+    def request_count(self) -> int:
+        return len(self.blocks)
+
+
+def plan_reads(items: Iterable, function_code: int = 3, max_gap: int = DEFAULT_MAX_GAP,
+               max_count: int = None) -> ReadPlan:
+    """Agrupar direcciones en el mínimo de peticiones de una función.
+
+    Args:
+        items: direcciones, o tuplas (clave, dirección) / (clave, dirección, registros)
+        function_code: función de lectura (1-4)
+        max_gap: registros sin usar que se aceptan leer para unir dos tramos
+        max_count: tamaño máximo de petición (por defecto el límite Modbus)
+
+    Returns:
+        ReadPlan: bloques ordenados por dirección y mapa de demultiplexado
+    """
+    max_count = max_count or MAX_READ_COUNT[function_code]
+
+    ranges = []
+    for item in items:
+        if isinstance(item, tuple):
+            key, address = item[0], item[1]
+            size = item[2] if len(item) > 2 else 1
+        else:
+            key, address, size = item, item, 1
+        if size > max_count:
+            raise ValueError(f"El parámetro {key!r} ocupa {size} registros, más que una petición")
+        ranges.append((address, address + size, key))
+    ranges.sort(key=lambda entry: (entry[0], entry[1]))
+
+    plan = ReadPlan()
+    block = None
+    for start, end, key in ranges:
+        # Unir mientras el hueco sea aceptable y el bloque no exceda el límite;
+        # el recorrido voraz por dirección da el mínimo de bloques
+        if block is not None and start - block.end <= max_gap and max(end, block.end) - block.start <= max_count:
+            block.count = max(end, block.end) - block.start
+        else:
+            block = ReadBlock(function_code, start, end - start)
+            plan.blocks.append(block)
+        plan.demux[key] = (len(plan.blocks) - 1, start - block.start, end - start)
+
+    return plan
+
+
+def plan_register_list(registers: List[Dict[str, Any]], max_gap: int = DEFAULT_MAX_GAP) -> ReadPlan:
+    """Planificar la lista `registers` que DeviceManager adjunta a un dispositivo.
+
+    Cada registro es un dict con 'function' ('0x', '1x', '3x', '4x' o el
+    código numérico) y 'address'. Las claves del plan son los índices de la lista.
+    """
+    by_function: Dict[int, list] = {}
+    for index, register in enumerate(registers):
+        function = register.get('function', '4x')
+        function_code = FUNCTION_BY_TABLE.get(str(function).lower(), function)
+        try:
+            function_code = int(function_code)
+            address = int(register.get('address', 0))
+        except (TypeError, ValueError):
+            continue
+        if function_code not in MAX_READ_COUNT:
+            continue
+        by_function.setdefault(function_code, []).append((index, address, int(register.get('count', 1))))
+
+    plan = ReadPlan()
+    for function_code in sorted(by_function):
+        plan.extend(plan_reads(by_function[function_code], function_code, max_gap))
+    return plan
+
+
+def plan_template_reads(parametros: Iterable, max_gap: int = DEFAULT_MAX_GAP) -> ReadPlan:
+    """Planificar la lectura de los parámetros de una plantilla VFD (holding registers).
+
+    Las claves del plan son los nombres de parámetro.
+    """
+    items = [(param.nombre_parametro, int(param.direccion_modbus)) for param in parametros]
+    return plan_reads(items, 3, max_gap)
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Bancos de registros Modbus - Implementación limpia para ComSuite
+Almacenamiento compacto de registros de 16 bits sobre array('H'): las lecturas
+FC03/FC04 se sirven con un corte y un único byteswap, sin trabajo por registro.
+Coils y discrete inputs se guardan empaquetados en bits.
+"""
+
+from array import array
+
+from .packing import _NATIVE_LITTLE_ENDIAN, pack_bits, unpack_bits
+
+
+class RegisterBank:
+    """Banco de registros de 16 bits compatible con el acceso por índice de una lista"""
+
+    __slots__ = ('_data',)
+
+    def __init__(self, size=10000):
+        self._data = array('H', bytes(2 * size))
+
+    def __len__(self):
+        return len(self._data)
+
+    def __iter__(self):
+        return iter(self._data)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self._data[index].tolist()
+        return self._data[index]
+
+    def __setitem__(self, index, value):
+        if isinstance(index, slice):
+            values = array('H', (v & 0xFFFF for v in value))
+            # El mapa de registros tiene tamaño fijo: un corte no puede achicarlo ni agrandarlo
+            if len(values) != len(range(*index.indices(len(self._data)))):
+                raise ValueError("solo se admiten cortes del mismo tamaño")
+            self._data[index] = values
+        else:
+            # Igual que un registro real: se guardan los 16 bits bajos
+            self._data[index] = int(value) & 0xFFFF
+
+    def __repr__(self):
+        return f"RegisterBank({len(self._data)})"
+
+    def tolist(self):
+        """Copia de todos los registros como lista de enteros"""
+        return self._data.tolist()
+
+    def read_bytes(self, start, count):
+        """Registros start..start+count-1 en big-endian, listos para la respuesta"""
+        chunk = self._data[start:start + count]
+        if _NATIVE_LITTLE_ENDIAN:
+            chunk.byteswap()
+        return chunk.tobytes()
+
+    def write_bytes(self, start, data):
+        """Escribir registros desde bytes big-endian (datos de FC16)"""
+        chunk = array('H')
+        chunk.frombytes(data)
+        if _NATIVE_LITTLE_ENDIAN:
+            chunk.byteswap()
+        if start < 0 or start + len(chunk) > len(self._data):
+            raise IndexError(f"escritura fuera del banco: {start} + {len(chunk)} registros")
+        self._data[start:start + len(chunk)] = chunk
+        return len(chunk)
+
+
+class BitBank:
+    """Banco de coils / discrete inputs empaquetado en bits (8 por byte).
+
+    Se indexa como una lista de bools; read_bytes/write_bytes trabajan
+    directamente con el formato de FC01/FC02/FC15 desplazando un entero
+    grande, sin recorrer los bits uno a uno.
+    """
+
+    __slots__ = ('_data', '_size')
+
+    def __init__(self, size=10000):
+        self._size = size
+        self._data = bytearray((size + 7) // 8)
+
+    def __len__(self):
+        return self._size
+
+    def __iter__(self):
+        return iter(self[0:self._size])
+
+    def _check_index(self, index):
+        if index < 0:
+            index += self._size
+        if not 0 <= index < self._size:
+            raise IndexError("índice de bit fuera de rango")
+        return index
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(self._size)
+            if step != 1:
+                return [self[i] for i in range(start, stop, step)]
+            count = max(0, stop - start)
+            return unpack_bits(self.read_bytes(start, count), count)
+        index = self._check_index(index)
+        return bool(self._data[index >> 3] & (1 << (index & 7)))
+
+    def __setitem__(self, index, value):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(self._size)
+            values = list(value)
+            if step != 1 or len(values) != max(0, stop - start):
+                raise ValueError("solo se admiten cortes contiguos del mismo tamaño")
+            self.write_bytes(start, pack_bits(values), len(values))
+            return
+        index = self._check_index(index)
+        if value:
+            self._data[index >> 3] |= 1 << (index & 7)
+        else:
+            self._data[index >> 3] &= ~(1 << (index & 7)) & 0xFF
+
+    def __repr__(self):
+        return f"BitBank({self._size})"
+
+    def tolist(self):
+        """Copia de todos los bits como lista de bools"""
+        return self[0:self._size]
+
+    def read_bytes(self, start, count):
+        """Bits start..start+count-1 empaquetados como en la respuesta FC01/FC02"""
+        if count <= 0:
+            return b''
+        first = start >> 3
+        last = (start + count + 7) >> 3
+        value = int.from_bytes(self._data[first:last], 'little') >> (start & 7)
+        value &= (1 << count) - 1
+        return value.to_bytes((count + 7) // 8, 'little')
+
+    def write_bytes(self, start, data, count):
+        """Escribir count bits empaquetados (datos de FC15) desde start"""
+        if count <= 0:
+            return 0
+        if start < 0 or start + count > self._size:
+            raise IndexError(f"escritura fuera del banco: {start} + {count} bits")
+        first = start >> 3
+        last = (start + count + 7) >> 3
+        shift = start & 7
+        mask = ((1 << count) - 1) << shift
+        value = (int.from_bytes(data, 'little') << shift) & mask
+        current = int.from_bytes(self._data[first:last], 'little')
+        self._data[first:last] = ((current & ~mask) | value).to_bytes(last - first, 'little')
+        return count
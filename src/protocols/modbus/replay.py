@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+"""
+Reproducción de tráfico Modbus - Implementación limpia para ComSuite
+Reenvía las peticiones de una captura (capture.py) contra un slave simulado o un
+equipo real y mide cómo responde:
+- al ritmo original, acelerado (speed > 1) o a la máxima velocidad (speed=None)
+- una conexión y un hilo por dispositivo grabado, para conservar la concurrencia
+  de producción (en RTU el bus es uno solo y las peticiones van en orden)
+- informe con percentiles de latencia, timeouts, excepciones y respuestas que no
+  coinciden con las grabadas
+"""
+
+import math
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, NamedTuple, Optional
+
+from .capture import CaptureReader
+
+
+class ReplayRequest(NamedTuple):
+    """Una petición a reproducir y la respuesta que se grabó para ella (si la hubo)"""
+    offset: float  # Segundos desde la primera petición de la captura
+    device: str
+    request: bytes
+    expected: Optional[bytes]
+
+
+def is_mbap(frame):
+    """True si la trama tiene la forma de una ADU Modbus TCP (MBAP)"""
+    return (len(frame) >= 8 and frame[2] == 0 and frame[3] == 0
+            and int.from_bytes(frame[4:6], 'big') == len(frame) - 6)
+
+
+def load_requests(source, requests_direction='ENVIADO', start=None, end=None, devices=None):
+    """Extraer de una captura las peticiones y su respuesta grabada.
+
+    Args:
+        source: ruta de la captura o un CaptureReader abierto
+        requests_direction: 'ENVIADO' si se capturó en un master, 'RECIBIDO' si en un slave
+        start, end: ventana de tiempo (segundos monotónicos de la captura)
+        devices: dispositivos a incluir (por defecto todos)
+
+    Returns:
+        List[ReplayRequest]: peticiones en orden de envío
+    """
+    reader = CaptureReader(source) if isinstance(source, str) else source
+    try:
+        wanted = set(devices) if devices is not None else None
+        requests = []
+        pending: Dict[tuple, int] = {}
+        first = None
+        for record in reader.read(start, end):
+            if wanted is not None and record.device not in wanted:
+                continue
+            data = record.data
+            # TCP empareja por transaction ID; RTU por orden dentro del dispositivo
+            key = (record.device, data[0:2]) if is_mbap(data) else (record.device,)
+            if record.direction == requests_direction:
+                if first is None:
+                    first = record.timestamp
+                pending[key] = len(requests)
+                requests.append(ReplayRequest(record.timestamp - first, record.device, data, None))
+            else:
+                index = pending.pop(key, None)
+                if index is not None:
+                    requests[index] = requests[index]._replace(expected=data)
+        return requests
+    finally:
+        if reader is not source:
+            reader.close()
+
+
+def percentile(sorted_values, fraction):
+    """Percentil por rango más cercano de una lista ordenada"""
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, math.ceil(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+@dataclass
+class ReplayReport:
+    """Resultado de una reproducción"""
+    sent: int = 0
+    responses: int = 0
+    timeouts: int = 0
+    exceptions: int = 0
+    mismatches: int = 0
+    duration: float = 0.0
+    latencies: List[float] = field(default_factory=list)
+    # Atraso de cada petición respecto de su instante programado
+    lags: List[float] = field(default_factory=list)
+    mismatch_samples: List[tuple] = field(default_factory=list)
+
+    @property
+    def rate(self):
+        return self.sent / self.duration if self.duration else 0.0
+
+    def latency(self, fraction):
+        """Percentil de latencia en segundos (0.5, 0.99...)"""
+        return percentile(sorted(self.latencies), fraction)
+
+    def summary(self):
+        """Resumen como dict (latencias en ms)"""
+        latencies = sorted(self.latencies)
+        lags = sorted(self.lags)
+
+        def ms(value):
+            return round(value * 1e3, 3) if value is not None else None
+
+        return {
+            'sent': self.sent,
+            'responses': self.responses,
+            'timeouts': self.timeouts,
+            'exceptions': self.exceptions,
+            'mismatches': self.mismatches,
+            'duration_s': round(self.duration, 3),
+            'rate_per_s': round(self.rate, 1),
+            'latency_ms': {
+                'p50': ms(percentile(latencies, 0.50)),
+                'p90': ms(percentile(latencies, 0.90)),
+                'p99': ms(percentile(latencies, 0.99)),
+                'max': ms(latencies[-1] if latencies else None),
+            },
+            'lag_p99_ms': ms(percentile(lags, 0.99)),
+        }
+
+    def __str__(self):
+        summary = self.summary()
+        latency = summary['latency_ms']
+        return (f"{self.sent} peticiones en {summary['duration_s']}s ({summary['rate_per_s']}/s): "
+                f"p50 {latency['p50']}ms, p90 {latency['p90']}ms, p99 {latency['p99']}ms, "
+                f"máx {latency['max']}ms; {self.timeouts} timeouts, {self.exceptions} excepciones, "
+                f"{self.mismatches} respuestas distintas")
+
+
+class TrafficReplayer:
+    """
+    Reproductor de peticiones grabadas.
+    Un hilo despachador entrega cada petición a su dispositivo en el instante
+    programado; cada dispositivo la envía con su propio master y compara la
+    respuesta con la grabada (PDU completa, o solo función y longitud con
+    compare='shape').
+    """
+
+    def __init__(self, requests, protocol=None, ip='127.0.0.1', port=502, baudrate=9600,
+                 parity='N', stopbits=1, bytesize=8, speed=1.0, unit_id=None,
+                 timeout=3.0, compare='pdu', max_mismatch_samples=20):
+        self.requests = list(requests)
+        if protocol is None:
+            protocol = 'TCP' if not self.requests or is_mbap(self.requests[0].request) else 'RTU'
+        self.protocol = protocol.upper()
+        self.ip = ip
+        self.port = port
+        self.serial_settings = {'baudrate': baudrate, 'parity': parity,
+                                'stopbits': stopbits, 'bytesize': bytesize}
+        self.speed = speed
+        self.unit_id = unit_id
+        self.timeout = timeout
+        self.compare = compare
+        self.max_mismatch_samples = max_mismatch_samples
+
+        self._report = ReplayReport()
+        self._report_lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def stop(self):
+        """Interrumpir la reproducción en curso"""
+        self._stop.set()
+
+    # === PREPARACIÓN DE TRAMAS ===
+
+    def _prepare(self, request):
+        """Trama a enviar, con el unit ID reemplazado si se pidió"""
+        if self.unit_id is None:
+            return request
+        frame = bytearray(request)
+        frame[6 if self.protocol == 'TCP' else 0] = self.unit_id
+        return bytes(frame)
+
+    def _pdu(self, frame, recorded=False):
+        """PDU de una respuesta: sin MBAP en TCP; sin dirección (ni CRC si es grabada) en RTU"""
+        if frame is None:
+            return None
+        if self.protocol == 'TCP':
+            return bytes(frame[7:])
+        return bytes(frame[1:-2] if recorded else frame[1:])
+
+    def _matches(self, response_pdu, expected_pdu):
+        if self.compare == 'shape':
+            return response_pdu[:1] == expected_pdu[:1] and len(response_pdu) == len(expected_pdu)
+        return response_pdu == expected_pdu
+
+    # === EJECUCIÓN ===
+
+    def _new_master(self):
+        if self.protocol == 'TCP':
+            from .master_tcp import ModbusMasterTCP
+            master = ModbusMasterTCP(ip=self.ip, port=self.port)
+        else:
+            from .master_rtu import ModbusMasterRTU
+            master = ModbusMasterRTU(port=self.port, **self.serial_settings)
+        master.timeout = self.timeout
+        return master
+
+    def _send(self, master, frame):
+        if self.protocol == 'TCP':
+            return master.send_request(frame)
+        return master.send_request(frame[1], frame[2:-2], unit_id=frame[0])
+
+    def _record(self, item, response, latency, lag):
+        response_pdu = self._pdu(response)
+        with self._report_lock:
+            report = self._report
+            report.sent += 1
+            report.lags.append(lag)
+            if response is None:
+                report.timeouts += 1
+                return
+            report.responses += 1
+            report.latencies.append(latency)
+            if response_pdu[:1] and response_pdu[0] & 0x80:
+                report.exceptions += 1
+            expected_pdu = self._pdu(item.expected, recorded=True)
+            if expected_pdu is not None and not self._matches(response_pdu, expected_pdu):
+                report.mismatches += 1
+                if len(report.mismatch_samples) < self.max_mismatch_samples:
+                    report.mismatch_samples.append((item.device, item.request, expected_pdu, response_pdu))
+
+    def _worker(self, work):
+        """Enviar las peticiones de un dispositivo (o de todo el bus RTU) una tras otra"""
+        master = self._new_master()
+        try:
+            while True:
+                entry = work.get()
+                if entry is None or self._stop.is_set():
+                    break
+                item, scheduled = entry
+                frame = self._prepare(item.request)
+                sent = time.monotonic()
+                response = self._send(master, frame)
+                self._record(item, response, time.monotonic() - sent,
+                             max(0.0, sent - scheduled) if scheduled is not None else 0.0)
+        finally:
+            master.disconnect()
+
+    def run(self):
+        """Reproducir todas las peticiones y devolver el ReplayReport"""
+        self._report = ReplayReport()
+        self._stop.clear()
+        queues: Dict[str, queue.SimpleQueue] = {}
+        threads = []
+
+        def queue_for(device):
+            key = device if self.protocol == 'TCP' else self.port  # RTU: un bus, un hilo
+            work = queues.get(key)
+            if work is None:
+                work = queues[key] = queue.SimpleQueue()
+                thread = threading.Thread(target=self._worker, args=(work,), daemon=True,
+                                          name=f"replay-{key}")
+                threads.append(thread)
+                thread.start()
+            return work
+
+        started = time.monotonic()
+        for item in self.requests:
+            if self._stop.is_set():
+                break
+            scheduled = None
+            if self.speed:
+                scheduled = started + item.offset / self.speed
+                delay = scheduled - time.monotonic()
+                if delay > 0 and self._stop.wait(delay):
+                    break
+            queue_for(item.device).put((item, scheduled))
+
+        for work in queues.values():
+            work.put(None)
+        for thread in threads:
+            thread.join()
+        self._report.duration = time.monotonic() - started
+        return self._report
+
+
+def replay_capture(path, requests_direction='ENVIADO', **kwargs):
+    """Cargar una captura y reproducirla; kwargs van a TrafficReplayer"""
+    return TrafficReplayer(load_requests(path, requests_direction), **kwargs).run()
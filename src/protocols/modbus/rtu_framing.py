@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""
+Delimitación de tramas Modbus RTU - Implementación limpia para ComSuite
+RTU no tiene marcadores de inicio/fin: la longitud de cada trama se deduce
+del código de función y de los primeros bytes de la propia trama.
+"""
+
+import time
+
+from .crc16 import crc16
+from .tracing import NULL_TRACER
+
+# Bytes necesarios para conocer la longitud de una respuesta: dirección,
+# función y contador de bytes (o código de excepción)
+RESPONSE_HEADER_LENGTH = 3
+
+# Tamaño máximo de una trama RTU: dirección + PDU de 253 bytes + CRC
+MAX_FRAME_LENGTH = 256
+
+# Diferencia entre el timeout del puerto y el tiempo restante que se tolera
+# antes de reconfigurarlo (en pyserial cada asignación es una llamada tcsetattr):
+# por debajo, TIMEOUT_SLACK segundos; por encima, además, TIMEOUT_OVERSHOOT del restante
+TIMEOUT_SLACK = 0.02
+TIMEOUT_OVERSHOOT = 0.1
+
+
+def response_frame_length(header):
+    """Longitud total (con CRC) de una respuesta a partir de sus 3 primeros bytes.
+
+    Devuelve None si el código de función no es uno soportado.
+    """
+    function_code = header[1]
+    if function_code & 0x80:  # Excepción: dirección + función + código + CRC
+        return 5
+    if function_code in (1, 2, 3, 4):
+        return RESPONSE_HEADER_LENGTH + header[2] + 2
+    if function_code in (5, 6, 15, 16):
+        return 8
+    return None
+
+
+class RTUResponseReader:
+    """Lee exactamente una respuesta RTU de un puerto serie.
+
+    Lee la cabecera de 3 bytes, deduce la longitud exacta y pide el resto con
+    un único read(n) bloqueante. Los bytes que no encajan (otra dirección,
+    otra función, CRC inválido) se descartan uno a uno hasta resincronizar.
+    """
+
+    def __init__(self, serial_port, tracer=None):
+        self.serial_port = serial_port
+        self._trace = tracer or NULL_TRACER
+        self.discarded_bytes = 0
+        self._timeout = serial_port.timeout
+
+    def _fill(self, buffer, size, deadline):
+        """Completar buffer hasta size bytes con lecturas bloqueantes"""
+        while len(buffer) < size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            # Reconfigurar el puerto solo si su timeout se aparta de forma apreciable
+            # de lo que queda; normalmente ya coincide con el de la transacción
+            timeout = self._timeout
+            if timeout is None or timeout < remaining - TIMEOUT_SLACK or \
+                    timeout > remaining * (1 + TIMEOUT_OVERSHOOT) + TIMEOUT_SLACK:
+                self._timeout = self.serial_port.timeout = remaining
+            chunk = self.serial_port.read(size - len(buffer))
+            if not chunk:
+                return False
+            buffer.extend(chunk)
+        return True
+
+    def read_response(self, slave_id, function_code, expected_length, deadline):
+        """Leer la respuesta de slave_id a function_code (sin CRC) o None en timeout"""
+        buffer = bytearray()
+
+        while True:
+            if not self._fill(buffer, RESPONSE_HEADER_LENGTH, deadline):
+                if buffer:
+                    self._trace.warning("Respuesta incompleta: %s", buffer)
+                return None
+
+            length = None
+            if buffer[0] == slave_id and (buffer[1] & 0x7F) == function_code:
+                length = response_frame_length(buffer)
+                # Una respuesta normal debe medir lo que pide la petición
+                if expected_length and not buffer[1] & 0x80 and length != expected_length:
+                    length = None
+
+            if length is None:
+                del buffer[0]
+                self.discarded_bytes += 1
+                continue
+
+            if not self._fill(buffer, length, deadline):
+                self._trace.warning("Respuesta incompleta: %s", buffer)
+                return None
+
+            frame = bytes(buffer[:length])
+            if crc16(frame[:-2]) == (frame[-2] | (frame[-1] << 8)):
+                return frame
+
+            # CRC inválido: la cabecera era ruido, seguir buscando un byte más adelante
+            self._trace.warning("CRC inválido en %s, resincronizando", frame)
+            del buffer[0]
+            self.discarded_bytes += 1
+
+
+def request_frame_length(buffer, start, available):
+    """Longitud total (con CRC) de la petición que empieza en buffer[start].
+
+    Devuelve 0 si faltan bytes para saberlo y None si la función no tiene
+    longitud conocida (la trama se delimita entonces por el silencio t3.5).
+    """
+    function_code = buffer[start + 1]
+    if 1 <= function_code <= 6:
+        return 8
+    if function_code in (15, 16):
+        if available < 7:
+            return 0
+        return 9 + buffer[start + 6]
+    return None
+
+
+class RTURequestParser:
+    """Separa peticiones RTU de un flujo serie en O(n) sobre un buffer reutilizable.
+
+    Las tramas se delimitan por la longitud que implica su código de función y,
+    cuando no se conoce, por el silencio t3.5. Un silencio también descarta
+    cualquier trama a medias. Las tramas dirigidas a otras unidades se saltan
+    sin procesarlas y, ante un CRC inválido, se avanza un byte moviendo un
+    índice, sin desplazar el buffer.
+    """
+
+    def __init__(self, unit_id, timing, buffer_size=1024):
+        self.unit_id = unit_id
+        self.timing = timing
+        self._buffer = bytearray(buffer_size)
+        self._start = 0
+        self._end = 0
+        self._last_rx = 0.0
+
+        # Estadísticas de diagnóstico
+        self.frames_count = 0
+        self.foreign_frames = 0
+        self.discarded_bytes = 0
+
+    @property
+    def pending(self):
+        """Bytes recibidos aún no asignados a una trama"""
+        return self._end - self._start
+
+    def _discard_pending(self):
+        self.discarded_bytes += self._end - self._start
+        self._start = 0
+        self._end = 0
+
+    def feed(self, data, now=None):
+        """Agregar bytes leídos del puerto en el instante now"""
+        now = time.monotonic() if now is None else now
+
+        # Un silencio t3.5 cierra la trama anterior: lo que quedó a medias es ruido
+        if self._end > self._start and now - self._last_rx >= self.timing.t3_5:
+            self._discard_pending()
+        self._last_rx = now
+
+        size = len(data)
+        if len(self._buffer) - self._end < size:
+            pending = self._end - self._start
+            self._buffer[0:pending] = self._buffer[self._start:self._end]
+            self._start = 0
+            self._end = pending
+            if len(self._buffer) < pending + size:
+                self._buffer.extend(bytes(pending + size - len(self._buffer)))
+        self._buffer[self._end:self._end + size] = data
+        self._end += size
+
+    def _crc_ok(self, start, length):
+        buffer = self._buffer
+        return crc16(buffer[start:start + length - 2]) == (buffer[start + length - 2] | (buffer[start + length - 1] << 8))
+
+    def _foreign_response_length(self, start, available):
+        """Longitud de la trama en start si fuera la respuesta de otro slave"""
+        if available < RESPONSE_HEADER_LENGTH:
+            return None
+        return response_frame_length(self._buffer[start:start + RESPONSE_HEADER_LENGTH])
+
+    def frames(self, now=None):
+        """Generar las peticiones completas (con CRC) dirigidas a esta unidad"""
+        now = time.monotonic() if now is None else now
+        silent = self._end > self._start and now - self._last_rx >= self.timing.t3_5
+        buffer = self._buffer
+
+        while self._end - self._start >= 2:
+            start = self._start
+            available = self._end - start
+            length = request_frame_length(buffer, start, available)
+            if length == 0:
+                break
+
+            if buffer[start] == self.unit_id:
+                if buffer[start + 1] == 0 or buffer[start + 1] & 0x80:
+                    # Código de función imposible en una petición: ruido
+                    self._start = start + 1
+                    self.discarded_bytes += 1
+                    continue
+                if length is None:
+                    # Función sin longitud conocida: la trama acaba en el silencio.
+                    # Sin silencio tras el máximo de una trama RTU, era ruido.
+                    if not silent:
+                        if available <= MAX_FRAME_LENGTH:
+                            break
+                        self._start = start + 1
+                        self.discarded_bytes += 1
+                        continue
+                    length = min(available, MAX_FRAME_LENGTH)
+                if available < length:
+                    break
+
+                if self._crc_ok(start, length):
+                    self._start = start + length
+                    self.frames_count += 1
+                    yield bytes(buffer[start:start + length])
+                else:
+                    # Resincronizar avanzando un solo byte
+                    self._start = start + 1
+                    self.discarded_bytes += 1
+                continue
+
+            # Trama de otra unidad (petición del master o respuesta de otro
+            # slave): saltarla sin decodificarla, con la primera longitud
+            # candidata cuyo CRC cuadre. Si falta alguna por llegar se espera;
+            # si todas están completas y ninguna cuadra, el byte es ruido.
+            skipped = False
+            incomplete = False
+            for candidate in (length, self._foreign_response_length(start, available)):
+                if not candidate:
+                    incomplete = incomplete or candidate is None and available < RESPONSE_HEADER_LENGTH
+                    continue
+                if available < candidate:
+                    incomplete = True
+                elif self._crc_ok(start, candidate):
+                    self._start = start + candidate
+                    self.foreign_frames += 1
+                    skipped = True
+                    break
+            if skipped:
+                continue
+            # Tras el silencio no llegará nada más: una candidata incompleta no cuadra
+            if incomplete and not silent:
+                break
+            self._start = start + 1
+            self.discarded_bytes += 1
+
+        if silent and self._end > self._start:
+            self._discard_pending()
+        elif self._start == self._end:
+            self._start = 0
+            self._end = 0
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Temporización Modbus RTU - Implementación limpia para ComSuite
+Silencios t1.5/t3.5 calculados a partir de la configuración del puerto serie
+y longitud esperada de las respuestas según el código de función.
+"""
+
+import struct
+
+# Por encima de 19200 baud la especificación fija los silencios en valores constantes
+_FIXED_TIMING_BAUDRATE = 19200
+_FIXED_T1_5 = 0.000750
+_FIXED_T3_5 = 0.001750
+
+# Longitud mínima de una trama RTU: dirección + función + código/dato + CRC
+EXCEPTION_FRAME_LENGTH = 5
+
+
+class RTUTiming:
+    """Tiempos de carácter y silencios entre tramas de un bus RTU"""
+
+    def __init__(self, baudrate=9600, bytesize=8, parity='N', stopbits=1):
+        self.baudrate = baudrate
+        self.bytesize = bytesize
+        self.parity = parity
+        self.stopbits = stopbits
+
+        # Bit de inicio + datos + paridad opcional + bits de parada
+        self.bits_per_char = 1 + bytesize + (0 if parity == 'N' else 1) + stopbits
+        self.char_time = self.bits_per_char / float(baudrate)
+
+        if baudrate > _FIXED_TIMING_BAUDRATE:
+            self.t1_5 = _FIXED_T1_5
+            self.t3_5 = _FIXED_T3_5
+        else:
+            self.t1_5 = 1.5 * self.char_time
+            self.t3_5 = 3.5 * self.char_time
+
+    def frame_time(self, length):
+        """Tiempo de transmisión de una trama de length bytes"""
+        return length * self.char_time
+
+    def poll_interval(self):
+        """Intervalo de sondeo del puerto: un carácter, acotado a [0.2 ms, 5 ms]"""
+        return min(max(self.char_time, 0.0002), 0.005)
+
+    def __repr__(self):
+        return (f"RTUTiming({self.baudrate} {self.bytesize}{self.parity}{self.stopbits}, "
+                f"char={self.char_time * 1e3:.3f}ms, t1.5={self.t1_5 * 1e3:.3f}ms, "
+                f"t3.5={self.t3_5 * 1e3:.3f}ms)")
+
+
+def expected_response_length(function_code, data):
+    """Longitud total (con dirección y CRC) de la respuesta normal a una petición.
+
+    data es el PDU de la petición sin el código de función. Devuelve None si
+    la función no tiene una longitud predecible.
+    """
+    if function_code in (1, 2):
+        quantity = struct.unpack_from('>H', data, 2)[0]
+        return 3 + (quantity + 7) // 8 + 2
+    if function_code in (3, 4):
+        quantity = struct.unpack_from('>H', data, 2)[0]
+        return 3 + quantity * 2 + 2
+    if function_code in (5, 6, 15, 16):
+        return 8
+    return None
@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+"""
+Bus serie Modbus RTU compartido - Implementación limpia para ComSuite
+Un único dueño por puerto serie: las transacciones de todos los dispositivos
+del bus RS-485 se encolan y un hilo las ejecuta una tras otra, separadas solo
+por el silencio t3.5 que exige la especificación.
+"""
+
+import queue
+import threading
+from concurrent.futures import Future
+
+from .master_rtu import ModbusMasterRTU
+from .tracing import Tracer
+
+
+class SerialBus:
+    """Puerto serie compartido con una cola de transacciones y un hilo de E/S"""
+
+    def __init__(self, port, baudrate=9600, parity='N', stopbits=1, bytesize=8):
+        self.port = port
+        self.settings = (baudrate, parity, stopbits, bytesize)
+        # El master del bus no tiene unit ID propio: cada transacción lleva el suyo
+        self.master = ModbusMasterRTU(port, baudrate=baudrate, parity=parity,
+                                      stopbits=stopbits, bytesize=bytesize)
+        self.users = 0
+        # Un bus soltado por el gestor no vuelve a abrir el puerto: otro bus
+        # del mismo puerto pudo tomar su lugar
+        self.closed = False
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+        # Estadísticas de diagnóstico
+        self.transactions = 0
+
+    @property
+    def connected(self):
+        return self.master.connected
+
+    def is_worker_thread(self):
+        """Indica si el llamador es el hilo de E/S del bus"""
+        return threading.current_thread() is self._thread
+
+    def start(self):
+        """Abrir el puerto y arrancar el hilo de E/S"""
+        with self._lock:
+            if self.closed:
+                return False
+            if self._thread and self._thread.is_alive():
+                return self.master.connected or self.master.connect()
+            if not self.master.connected and not self.master.connect():
+                return False
+            self._thread = threading.Thread(target=self._run, name=f"rtu-bus-{self.port}", daemon=True)
+            self._thread.start()
+            return True
+
+    def stop(self):
+        """Detener el hilo de E/S y cerrar el puerto"""
+        with self._lock:
+            thread = self._thread
+            self._thread = None
+        if thread and thread.is_alive():
+            self._queue.put(None)
+            if thread is not threading.current_thread():
+                thread.join(timeout=self.master.timeout + 1.0)
+        self._fail_queued()
+        if self.master.connected:
+            self.master.disconnect()
+
+    def close(self):
+        """Detener el bus para siempre (lo llama el gestor al soltarlo el último dispositivo)"""
+        with self._lock:
+            self.closed = True
+        self.stop()
+
+    def submit(self, function, *args, **kwargs):
+        """Encolar function(*args) para ejecutarla en el hilo del bus.
+
+        Devuelve un concurrent.futures.Future con el resultado; si el bus ya
+        fue cerrado (p. ej. una referencia vieja), el Future se completa con None.
+        """
+        future = Future()
+        if not self._thread or not self._thread.is_alive():
+            if not self.start():
+                future.set_result(None)
+                return future
+        with self._lock:
+            # Encolar bajo el lock: close() no puede colarse entre la comprobación
+            # y el put y dejar la transacción sin nadie que la complete
+            if not self.closed:
+                self._queue.put((future, function, args, kwargs))
+                return future
+        future.set_result(None)
+        return future
+
+    def call(self, method, *args, unit_id=None, **kwargs):
+        """Ejecutar un método del master para unit_id y esperar el resultado"""
+        function = getattr(self.master, method)
+        if self.is_worker_thread():
+            # Ya en el hilo del bus (p. ej. un plan de lectura encolado entero)
+            return function(*args, unit_id=unit_id, **kwargs)
+        return self.submit(function, *args, unit_id=unit_id, **kwargs).result()
+
+    def _run(self):
+        """Ejecutar las transacciones encoladas una tras otra"""
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            future, function, args, kwargs = item
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(function(*args, **kwargs))
+            except Exception as e:
+                future.set_exception(e)
+            self.transactions += 1
+
+    def _fail_queued(self):
+        """Completar con None las transacciones que quedaron en cola"""
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            if item and item[0].set_running_or_notify_cancel():
+                item[0].set_result(None)
+
+
+class BusUnitMaster:
+    """Master enlazado a un unit ID de un bus serie compartido.
+
+    Ofrece la API bloqueante de ModbusMasterRTU; cada llamada se encola en el
+    bus y espera su turno.
+    """
+
+    def __init__(self, manager, bus, unit_id):
+        self._manager = manager
+        self.bus = bus
+        self.slave_id = unit_id
+        self._released = False
+
+    @property
+    def connected(self):
+        return not self._released and self.bus.connected
+
+    @property
+    def timeout(self):
+        return self.bus.master.timeout
+
+    @property
+    def port(self):
+        return self.bus.port
+
+    def set_log_callback(self, callback):
+        """Establecer callback para logging (compartido por el bus)"""
+        self.bus.master.set_log_callback(callback)
+
+    def set_frame_callback(self, callback):
+        """Establecer callback para tramas (compartido por el bus)"""
+        self.bus.master.set_frame_callback(callback)
+
+    def set_trace_level(self, level):
+        """Nivel mínimo de trazas (compartido por el bus)"""
+        self.bus.master.set_trace_level(level)
+
+    def set_capture(self, writer, device=None):
+        """Grabar las tramas en un CaptureWriter (compartida por el bus)"""
+        self.bus.master.set_capture(writer, device)
+
+    def connect(self):
+        """Abrir el bus si aún no lo está"""
+        if self._released:
+            bus = self._manager._attach(self.bus.port, *self.bus.settings)
+            if bus is None:
+                return False
+            self.bus = bus
+            self._released = False
+        return self.bus.start()
+
+    def disconnect(self):
+        """Liberar el bus; se cierra al soltarlo el último dispositivo"""
+        if not self._released:
+            self._released = True
+            self._manager.release(self.bus)
+
+    def _call(self, method, *args, **kwargs):
+        if self._released:
+            self.connect()
+        return self.bus.call(method, *args, unit_id=self.slave_id, **kwargs)
+
+    def read_coils(self, start_address, count):
+        """Leer coils (FC 01)"""
+        return self._call('read_coils', start_address, count)
+
+    def read_discrete_inputs(self, start_address, count):
+        """Leer discrete inputs (FC 02)"""
+        return self._call('read_discrete_inputs', start_address, count)
+
+    def read_holding_registers(self, start_address, count, as_array=False):
+        """Leer holding registers (FC 03)"""
+        return self._call('read_holding_registers', start_address, count, as_array=as_array)
+
+    def read_input_registers(self, start_address, count, as_array=False):
+        """Leer input registers (FC 04)"""
+        return self._call('read_input_registers', start_address, count, as_array=as_array)
+
+    def write_single_coil(self, address, value):
+        """Escribir single coil (FC 05)"""
+        return self._call('write_single_coil', address, value)
+
+    def write_single_register(self, address, value):
+        """Escribir single register (FC 06)"""
+        return self._call('write_single_register', address, value)
+
+    def write_multiple_coils(self, address, values):
+        """Escribir multiple coils (FC 15)"""
+        return self._call('write_multiple_coils', address, values)
+
+    def write_multiple_registers(self, address, values):
+        """Escribir multiple registers (FC 16)"""
+        return self._call('write_multiple_registers', address, values)
+
+
+class SerialBusManager:
+    """Dueño único de cada puerto serie, compartido por todos sus dispositivos"""
+
+    def __init__(self):
+        self._buses = {}  # puerto -> SerialBus
+        self._lock = threading.Lock()
+
+        # Trazas de logging
+        self._trace = Tracer("Bus RTU")
+
+    def set_log_callback(self, callback):
+        """Establecer callback para logging (recibe el texto ya formateado)"""
+        self._trace.set_log_sink(callback)
+
+    def set_trace_level(self, level):
+        """Nivel mínimo de trazas"""
+        self._trace.set_level(level)
+
+    def acquire(self, port, baudrate=9600, parity='N', stopbits=1, bytesize=8, unit_id=1):
+        """Obtener un master para unit_id en el bus del puerto indicado.
+
+        Devuelve None si el puerto ya está abierto con otra configuración serie.
+        """
+        bus = self._attach(port, baudrate, parity, stopbits, bytesize)
+        if bus is None:
+            return None
+        return BusUnitMaster(self, bus, unit_id)
+
+    def _attach(self, port, baudrate, parity, stopbits, bytesize):
+        """Tomar una referencia al bus del puerto, creándolo si hace falta"""
+        settings = (baudrate, parity, stopbits, bytesize)
+        with self._lock:
+            bus = self._buses.get(port)
+            if bus is None:
+                bus = SerialBus(port, *settings)
+                self._buses[port] = bus
+            elif bus.settings != settings:
+                self._trace.warning("%s ya está abierto con %s, se pidió %s", port, bus.settings, settings)
+                return None
+            bus.users += 1
+            return bus
+
+    def release(self, bus):
+        """Soltar una referencia al bus y cerrarlo si queda sin uso"""
+        with self._lock:
+            bus.users -= 1
+            if bus.users > 0:
+                return
+            if self._buses.get(bus.port) is bus:
+                del self._buses[bus.port]
+        bus.close()
+
+    def get_bus(self, port):
+        """Bus abierto en el puerto indicado o None"""
+        with self._lock:
+            return self._buses.get(port)
+
+    def get_statistics(self):
+        """Dispositivos y transacciones por puerto"""
+        with self._lock:
+            return {port: {'users': bus.users, 'transactions': bus.transactions}
+                    for port, bus in self._buses.items()}
+
+
+_default_manager = None
+_default_manager_lock = threading.Lock()
+
+
+def get_default_bus_manager():
+    """Gestor de buses serie compartido por toda la aplicación"""
+    global _default_manager
+    with _default_manager_lock:
+        if _default_manager is None:
+            _default_manager = SerialBusManager()
+        return _default_manager
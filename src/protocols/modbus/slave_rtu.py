@@ -9,6 +9,12 @@ import threading
 import time
 import struct
 
+from .crc16 import crc16, crc16_bytes
+from .register_bank import BitBank, RegisterBank
+from .rtu_framing import RTURequestParser
+from .rtu_timing import RTUTiming
+from .tracing import Tracer
+
 class ModbusSlaveRTU:
     """Slave Modbus RTU completo con todas las funciones Modbus"""
 
@@ -23,6 +29,9 @@ class ModbusSlaveRTU:
         self.connected = False
         self.running = False
 
+        # Silencio t3.5 para delimitar tramas en el bus
+        self.timing = RTUTiming(baudrate, bytesize, parity, stopbits)
+
         # Mapeo de paridad
         self.parity_map = {
             'N': serial.PARITY_NONE,
@@ -31,14 +40,13 @@ class ModbusSlaveRTU:
         }
 
         # Registros
-        self.coils = [False] * 10000
-        self.discrete_inputs = [False] * 10000
-        self.input_registers = [0] * 10000
-        self.holding_registers = [0] * 10000
+        self.coils = BitBank(10000)
+        self.discrete_inputs = BitBank(10000)
+        self.input_registers = RegisterBank(10000)
+        self.holding_registers = RegisterBank(10000)
 
-        # Callbacks para logging y diagnóstico
-        self.log_callback = None
-        self.frame_callback = None
+        # Trazas de logging y diagnóstico (tramas)
+        self._trace = Tracer("Slave RTU")
 
         # Inicializar con valores de prueba
         self._initialize_test_values()
@@ -62,23 +70,25 @@ class ModbusSlaveRTU:
             self.holding_registers[i] = 1000 + i * 100
 
     def set_log_callback(self, callback):
-        """Establecer callback para logging"""
-        self.log_callback = callback
+        """Establecer callback para logging (recibe el texto ya formateado)"""
+        self._trace.set_log_sink(callback)
 
     def set_frame_callback(self, callback):
         """Establecer callback para tramas"""
-        self.frame_callback = callback
+        self._trace.set_frame_sink(callback)
 
-    def _log(self, message):
-        """Logging interno"""
-        if self.log_callback:
-            self.log_callback(f"Slave RTU: {message}")
-        else:
-            print(f"Slave RTU: {message}")
+    def set_capture(self, writer, device=None):
+        """Grabar las tramas en un CaptureWriter (device por defecto: el puerto serie)"""
+        self._trace.set_capture(writer, device or self.port)
+
+    def set_trace_level(self, level):
+        """Nivel mínimo de trazas ('DEBUG' incluye el detalle de cada petición)"""
+        self._trace.set_level(level)
 
     def connect(self):
         """Conectar al puerto serie"""
         try:
+            self.timing = RTUTiming(self.baudrate, self.bytesize, self.parity, self.stopbits)
             self.serial_port = serial.Serial(
                 port=self.port,
                 baudrate=self.baudrate,
@@ -88,10 +98,10 @@ class ModbusSlaveRTU:
                 timeout=1.0
             )
             self.connected = True
-            self._log(f"Conectado a {self.port} @ {self.baudrate} baud")
+            self._trace.info("Conectado a %s @ %s baud", self.port, self.baudrate)
             return True
         except Exception as e:
-            self._log(f"Error al conectar: {e}")
+            self._trace.error("Error al conectar: %s", e)
             return False
 
     def disconnect(self):
@@ -99,20 +109,11 @@ class ModbusSlaveRTU:
         if self.serial_port and self.serial_port.is_open:
             self.serial_port.close()
         self.connected = False
-        self._log("Desconectado")
+        self._trace.info("Desconectado")
 
     def calculate_crc(self, data):
         """Calcular CRC16 Modbus"""
-        crc = 0xFFFF
-        for byte in data:
-            crc ^= byte
-            for _ in range(8):
-                if crc & 0x0001:
-                    crc >>= 1
-                    crc ^= 0xA001
-                else:
-                    crc >>= 1
-        return crc
+        return crc16(data)
 
     def start(self):
         """Iniciar servidor RTU"""
@@ -120,53 +121,40 @@ class ModbusSlaveRTU:
             return False
 
         self.running = True
-        self._log(f"Iniciando servidor RTU slave ID={self.slave_id}")
+        self._trace.info("Iniciando servidor RTU slave ID=%s", self.slave_id)
 
         def server_loop():
-            buffer = bytearray()
+            parser = RTURequestParser(self.slave_id, self.timing)
+            poll_interval = self.timing.poll_interval()
 
             while self.running:
                 try:
-                    if self.serial_port.in_waiting > 0:
-                        data = self.serial_port.read(self.serial_port.in_waiting)
-                        buffer.extend(data)
-
-                        # Procesar tramas completas
-                        while len(buffer) >= 4:  # Mínimo: uid + fc + data(1) + crc
-                            # Verificar CRC
-                            if len(buffer) >= 4:
-                                received_crc = int.from_bytes(buffer[-2:], byteorder='little')
-                                calculated_crc = self.calculate_crc(buffer[:-2])
-
-                                if received_crc == calculated_crc:
-                                    # Trama completa, procesar
-                                    frame = buffer[:-2]  # Quitar CRC
-                                    buffer = buffer[len(frame) + 2:]  # Remover de buffer
-
-                                    if self.frame_callback:
-                                        self.frame_callback("RECIBIDO", frame + received_crc.to_bytes(2, byteorder='little'))
-
-                                    # Procesar petición
-                                    response = self.process_request(frame)
-
-                                    if response:
-                                        # Agregar CRC y enviar
-                                        crc = self.calculate_crc(response)
-                                        response_with_crc = response + crc.to_bytes(2, byteorder='little')
-
-                                        if self.frame_callback:
-                                            self.frame_callback("ENVIADO", response_with_crc)
-
-                                        self.serial_port.write(response_with_crc)
-                                        self.serial_port.flush()
-                                    else:
-                                        # CRC inválido, remover primer byte y continuar
-                                        buffer.pop(0)
-                                else:
-                                    break
+                    waiting = self.serial_port.in_waiting
+                    now = time.monotonic()
+                    if waiting > 0:
+                        parser.feed(self.serial_port.read(waiting), now)
+
+                    # Procesar tramas completas dirigidas a este slave
+                    for frame in parser.frames(now):
+                        self._trace.frame("RECIBIDO", frame)
+
+                        # Procesar petición (sin CRC)
+                        response = self.process_request(bytearray(frame[:-2]))
+
+                        if response:
+                            # Agregar CRC y enviar
+                            response_with_crc = bytes(response) + crc16_bytes(response)
+
+                            self._trace.frame("ENVIADO", response_with_crc)
+
+                            self.serial_port.write(response_with_crc)
+                            self.serial_port.flush()
+
+                    if not waiting:
+                        time.sleep(poll_interval)
 
                 except Exception as e:
-                    self._log(f"Error en servidor: {e}")
+                    self._trace.error("Error en servidor: %s", e)
                     time.sleep(0.1)
 
         # Iniciar servidor en hilo separado
@@ -204,7 +192,7 @@ class ModbusSlaveRTU:
         elif function_code == 16:  # Write Multiple Registers (FC 16)
             return self.handle_write_multiple_registers(frame)
         else:
-            self._log(f"Función no soportada: {function_code}")
+            self._trace.warning("Función no soportada: %s", function_code)
             return bytearray([self.slave_id, function_code | 0x80, 1])  # Excepción
 
     # === IMPLEMENTACIÓN DE FUNCIONES MODBUS ===
@@ -217,7 +205,7 @@ class ModbusSlaveRTU:
         start_address = struct.unpack('>H', frame[2:4])[0]
         register_count = struct.unpack('>H', frame[4:6])[0]
 
-        self._log(f"Read Holding Registers: addr={start_address}, count={register_count}")
+        self._trace.debug("Read Holding Registers: addr=%s, count=%s", start_address, register_count)
 
         # Verificar límites
         if start_address < 0 or start_address >= len(self.holding_registers):
@@ -230,14 +218,8 @@ class ModbusSlaveRTU:
         byte_count = register_count * 2
         response = bytearray([self.slave_id, 3, byte_count])
 
-        # Agregar valores de los registros
-        values = []
-        for i in range(register_count):
-            value = self.holding_registers[start_address + i]
-            values.append(value)
-            response.extend(value.to_bytes(2, byteorder='big'))
-
-        self._log(f"Valores enviados: {values}")
+        # Agregar valores de los registros (corte del banco ya en big-endian)
+        response.extend(self.holding_registers.read_bytes(start_address, register_count))
         return response
 
     def handle_write_single_register(self, frame):
@@ -248,7 +230,7 @@ class ModbusSlaveRTU:
         address = struct.unpack('>H', frame[2:4])[0]
         value = struct.unpack('>H', frame[4:6])[0]
 
-        self._log(f"Write Single Register: addr={address}, value={value}")
+        self._trace.debug("Write Single Register: addr=%s, value=%s", address, value)
 
         # Verificar límites
         if address < 0 or address >= len(self.holding_registers):
@@ -268,7 +250,7 @@ class ModbusSlaveRTU:
         start_address = struct.unpack('>H', frame[2:4])[0]
         coil_count = struct.unpack('>H', frame[4:6])[0]
 
-        self._log(f"Read Coils: addr={start_address}, count={coil_count}")
+        self._trace.debug("Read Coils: addr=%s, count=%s", start_address, coil_count)
 
         # Verificar límites
         if start_address < 0 or start_address >= len(self.coils):
@@ -281,15 +263,8 @@ class ModbusSlaveRTU:
         byte_count = (coil_count + 7) // 8
         response = bytearray([self.slave_id, 1, byte_count])
 
-        # Empaquetar coils en bytes
-        coils_bytes = bytearray(byte_count)
-        for i in range(coil_count):
-            if self.coils[start_address + i]:
-                byte_index = i // 8
-                bit_index = i % 8
-                coils_bytes[byte_index] |= (1 << bit_index)
-
-        response.extend(coils_bytes)
+        # Coils ya empaquetados desde el banco de bits
+        response.extend(self.coils.read_bytes(start_address, coil_count))
         return response
 
     def handle_read_discrete_inputs(self, frame):
@@ -300,7 +275,7 @@ class ModbusSlaveRTU:
         start_address = struct.unpack('>H', frame[2:4])[0]
         input_count = struct.unpack('>H', frame[4:6])[0]
 
-        self._log(f"Read Discrete Inputs: addr={start_address}, count={input_count}")
+        self._trace.debug("Read Discrete Inputs: addr=%s, count=%s", start_address, input_count)
 
         # Verificar límites
         if start_address < 0 or start_address >= len(self.discrete_inputs):
@@ -313,15 +288,8 @@ class ModbusSlaveRTU:
         byte_count = (input_count + 7) // 8
         response = bytearray([self.slave_id, 2, byte_count])
 
-        # Empaquetar inputs en bytes
-        inputs_bytes = bytearray(byte_count)
-        for i in range(input_count):
-            if self.discrete_inputs[start_address + i]:
-                byte_index = i // 8
-                bit_index = i % 8
-                inputs_bytes[byte_index] |= (1 << bit_index)
-
-        response.extend(inputs_bytes)
+        # Inputs ya empaquetados desde el banco de bits
+        response.extend(self.discrete_inputs.read_bytes(start_address, input_count))
         return response
 
     def handle_read_input_registers(self, frame):
@@ -332,7 +300,7 @@ class ModbusSlaveRTU:
         start_address = struct.unpack('>H', frame[2:4])[0]
         register_count = struct.unpack('>H', frame[4:6])[0]
 
-        self._log(f"Read Input Registers: addr={start_address}, count={register_count}")
+        self._trace.debug("Read Input Registers: addr=%s, count=%s", start_address, register_count)
 
         # Verificar límites
         if start_address < 0 or start_address >= len(self.input_registers):
@@ -345,14 +313,8 @@ class ModbusSlaveRTU:
         byte_count = register_count * 2
         response = bytearray([self.slave_id, 4, byte_count])
 
-        # Agregar valores de los registros
-        values = []
-        for i in range(register_count):
-            value = self.input_registers[start_address + i]
-            values.append(value)
-            response.extend(value.to_bytes(2, byteorder='big'))
-
-        self._log(f"Valores enviados: {values}")
+        # Agregar valores de los registros (corte del banco ya en big-endian)
+        response.extend(self.input_registers.read_bytes(start_address, register_count))
         return response
 
     def handle_write_single_coils(self, frame):
@@ -364,7 +326,7 @@ class ModbusSlaveRTU:
         value = struct.unpack('>H', frame[4:6])[0]
 
         coil_state = (value == 0xFF00)
-        self._log(f"Write Single Coil: addr={address}, value={coil_state}")
+        self._trace.debug("Write Single Coil: addr=%s, value=%s", address, coil_state)
 
         # Verificar límites
         if address < 0 or address >= len(self.coils):
@@ -385,7 +347,7 @@ class ModbusSlaveRTU:
         coil_count = struct.unpack('>H', frame[4:6])[0]
         byte_count = frame[6]
 
-        self._log(f"Write Multiple Coils: addr={address}, count={coil_count}")
+        self._trace.debug("Write Multiple Coils: addr=%s, count=%s", address, coil_count)
 
         # Verificar límites
         if address < 0 or address >= len(self.coils):
@@ -394,13 +356,11 @@ class ModbusSlaveRTU:
         if address + coil_count > len(self.coils):
             return bytearray([self.slave_id, 15 | 0x80, 2])  # Excepción
 
-        # Extraer y escribir valores de coils
-        for i in range(coil_count):
-            byte_index = i // 8
-            bit_index = i % 8
-            byte_value = frame[7 + byte_index]
-            coil_state = bool(byte_value & (1 << bit_index))
-            self.coils[address + i] = coil_state
+        if byte_count != (coil_count + 7) // 8 or len(frame) < 7 + byte_count:
+            return bytearray([self.slave_id, 15 | 0x80, 3])  # Excepción
+
+        # Escribir los coils directamente desde los bytes de la trama
+        self.coils.write_bytes(address, frame[7:7 + byte_count], coil_count)
 
         # Construir respuesta
         response = bytearray([self.slave_id, 15])
@@ -417,7 +377,7 @@ class ModbusSlaveRTU:
         register_count = struct.unpack('>H', frame[4:6])[0]
         byte_count = frame[6]
 
-        self._log(f"Write Multiple Registers: addr={address}, count={register_count}")
+        self._trace.debug("Write Multiple Registers: addr=%s, count=%s", address, register_count)
 
         # Verificar límites
         if address < 0 or address >= len(self.holding_registers):
@@ -426,14 +386,11 @@ class ModbusSlaveRTU:
         if address + register_count > len(self.holding_registers):
             return bytearray([self.slave_id, 16 | 0x80, 2])  # Excepción
 
-        # Extraer y escribir valores de registros
-        values = []
-        for i in range(register_count):
-            value = struct.unpack('>H', frame[7 + i*2:9 + i*2])[0]
-            self.holding_registers[address + i] = value
-            values.append(value)
+        if byte_count != register_count * 2 or len(frame) < 7 + byte_count:
+            return bytearray([self.slave_id, 16 | 0x80, 3])  # Excepción
 
-        self._log(f"Valores escritos: {values}")
+        # Escribir los registros directamente desde los bytes de la trama
+        self.holding_registers.write_bytes(address, frame[7:7 + byte_count])
 
         # Construir respuesta
         response = bytearray([self.slave_id, 16])
@@ -446,4 +403,4 @@ class ModbusSlaveRTU:
         self.running = False
         if self.serial_port and self.serial_port.is_open:
             self.serial_port.close()
-        self._log("Servidor detenido")
\ No newline at end of file
+        self._trace.info("Servidor detenido")
\ No newline at end of file
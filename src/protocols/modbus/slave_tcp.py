@@ -4,33 +4,63 @@ Slave Modbus TCP - Implementación limpia para ComSuite
 Clase pura de comunicación sin rutinas de prueba.
 """
 
+import selectors
 import socket
 import threading
 import time
 import struct
 import logging
 
+from .mbap_framer import MBAPFramer
+from .register_bank import BitBank, RegisterBank
+from .tracing import Tracer
+
+class _ClientState:
+    """Estado de un cliente en el selector: recepción, respuestas pendientes e interés"""
+
+    __slots__ = ('framer', 'output', 'stalled_since', 'events')
+
+    def __init__(self):
+        self.framer = MBAPFramer()
+        self.output = bytearray()
+        # Último avance del envío (o inicio de la espera si no hubo ninguno)
+        self.stalled_since = 0.0
+        self.events = selectors.EVENT_READ
+
+
 class ModbusSlaveTCP:
     """Slave Modbus TCP completo con todas las funciones Modbus"""
 
-    def __init__(self, ip='127.0.0.1', port=502, slave_id=1):
+    # Bytes de respuestas pendientes a partir de los cuales se deja de leer al cliente
+    MAX_PENDING_OUTPUT = 64 * 1024
+
+    def __init__(self, ip='127.0.0.1', port=502, slave_id=1, max_clients=16):
         self.ip = ip
         self.port = port
         self.slave_id = slave_id
         self.server_socket = None
         self.running = False
-        self.client_socket = None
-        self.timeout = 3.0  # Timeout más generoso
+        self.client_socket = None  # Último cliente aceptado
+        self.timeout = 3.0  # Máximo sin que un cliente acepte sus respuestas
+
+        # Clientes simultáneos: socket -> dirección remota
+        self.max_clients = max(1, int(max_clients))
+        self.clients = {}
+        self._wakeup_reader = None
+        self._wakeup_writer = None
+
+        # Protege los bancos de registros frente a escrituras desde otros hilos
+        # (GUI, simulación). Usar "with slave.lock:" al modificarlos desde fuera.
+        self.lock = threading.RLock()
 
         # Registros - CORRECTAMENTE SEPARADOS
-        self.coils = [False] * 10000  # 0x - Coils
-        self.discrete_inputs = [False] * 10000  # 1x - Discrete Inputs
-        self.input_registers = [0] * 10000  # 3x - Input Registers (solo lectura)
-        self.holding_registers = [0] * 10000  # 4x - Holding Registers (lectura/escritura)
+        self.coils = BitBank(10000)  # 0x - Coils
+        self.discrete_inputs = BitBank(10000)  # 1x - Discrete Inputs
+        self.input_registers = RegisterBank(10000)  # 3x - Input Registers (solo lectura)
+        self.holding_registers = RegisterBank(10000)  # 4x - Holding Registers (lectura/escritura)
 
-        # Callbacks para logging y diagnóstico
-        self.log_callback = None
-        self.frame_callback = None
+        # Trazas de logging y diagnóstico (tramas)
+        self._trace = Tracer("Slave")
 
         # Inicializar con valores de prueba
         self._initialize_test_values()
@@ -54,79 +84,182 @@ class ModbusSlaveTCP:
             self.holding_registers[i] = 1000 + i * 100
 
     def set_log_callback(self, callback):
-        """Establecer callback para logging"""
-        self.log_callback = callback
+        """Establecer callback para logging (recibe el texto ya formateado)"""
+        self._trace.set_log_sink(callback)
 
     def set_frame_callback(self, callback):
         """Establecer callback para tramas"""
-        self.frame_callback = callback
+        self._trace.set_frame_sink(callback)
 
-    def _log(self, message):
-        """Logging interno"""
-        if self.log_callback:
-            self.log_callback(f"Slave: {message}")
-        else:
-            print(f"Slave: {message}")
+    def set_capture(self, writer, device=None):
+        """Grabar las tramas en un CaptureWriter (device por defecto: "ip:puerto")"""
+        self._trace.set_capture(writer, device or f"{self.ip}:{self.port}")
+
+    def set_trace_level(self, level):
+        """Nivel mínimo de trazas ('DEBUG' incluye el detalle de cada petición)"""
+        self._trace.set_level(level)
 
     def start(self):
-        """Iniciar servidor TCP"""
+        """Iniciar servidor TCP (bloquea hasta stop()).
+
+        Un único bucle con selectors atiende a todos los clientes a la vez:
+        un segundo SCADA/HMI ya no espera a que se desconecte el primero.
+        """
+        selector = selectors.DefaultSelector()
         try:
             self.server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
             self.server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
             self.server_socket.bind((self.ip, self.port))
-            self.server_socket.listen(1)
-            self.running = True
+            self.server_socket.listen(self.max_clients)
+            self.server_socket.setblocking(False)
+            selector.register(self.server_socket, selectors.EVENT_READ)
+
+            # Par de sockets para despertar al selector desde stop()
+            self._wakeup_reader, self._wakeup_writer = socket.socketpair()
+            self._wakeup_reader.setblocking(False)
+            selector.register(self._wakeup_reader, selectors.EVENT_READ)
 
-            self._log(f"Servidor iniciado en {self.ip}:{self.port}")
+            self.running = True
+            self._trace.info("Servidor iniciado en %s:%s (máx. %s clientes)", self.ip, self.port, self.max_clients)
 
             while self.running:
-                try:
-                    self.server_socket.settimeout(1.0)
-                    self.client_socket, addr = self.server_socket.accept()
-                    self._log(f"Conexión aceptada desde {addr}")
+                for key, events in selector.select(timeout=1.0):
+                    if key.fileobj is self.server_socket:
+                        self._accept_client(selector)
+                    elif key.fileobj is self._wakeup_reader:
+                        self._wakeup_reader.recv(64)
+                    elif key.fileobj in self.clients:
+                        self._serve_client(selector, key.fileobj, key.data, events)
+                self._close_stalled_clients(selector)
 
-                    while self.running:
-                        try:
-                            self.client_socket.settimeout(self.timeout)
-                            data = self.client_socket.recv(1024)
-                            if not data:
-                                break
+        except Exception as e:
+            self._trace.error("Error al iniciar servidor: %s", e)
+        finally:
+            self.running = False
+            for client in list(self.clients):
+                self._close_client(selector, client)
+            selector.close()
+            if self.server_socket:
+                self.server_socket.close()
+            for wakeup in (self._wakeup_reader, self._wakeup_writer):
+                if wakeup:
+                    wakeup.close()
+            self._wakeup_reader = self._wakeup_writer = None
 
-                            if self.frame_callback:
-                                self.frame_callback("RECIBIDO", data)
+    def _accept_client(self, selector):
+        """Aceptar una conexión nueva si no se superó el máximo de clientes"""
+        try:
+            client, addr = self.server_socket.accept()
+        except (BlockingIOError, socket.timeout):
+            return
+        except Exception as e:
+            self._trace.error("Error al aceptar conexión: %s", e)
+            return
+
+        if len(self.clients) >= self.max_clients:
+            self._trace.warning("Conexión rechazada desde %s: máximo de %s clientes", addr, self.max_clients)
+            client.close()
+            return
+
+        # No bloqueante: un cliente que no lee sus respuestas no debe frenar al resto
+        client.setblocking(False)
+        self.clients[client] = addr
+        self.client_socket = client
+        selector.register(client, selectors.EVENT_READ, _ClientState())
+        self._trace.info("Conexión aceptada desde %s (%s clientes)", addr, len(self.clients))
+
+    def _serve_client(self, selector, client, state, events):
+        """Enviar lo pendiente y leer lo disponible de un cliente, respondiendo cada ADU completa"""
+        try:
+            if events & selectors.EVENT_WRITE:
+                self._flush_client(client, state)
+
+            if events & selectors.EVENT_READ:
+                framer = state.framer
+                try:
+                    if not framer.recv_from(client):
+                        self._close_client(selector, client)
+                        return
+                except BlockingIOError:
+                    pass
 
-                            response = self.process_request(data)
+                # Un recv puede traer varias ADUs o solo parte de una
+                for data in framer.frames():
+                    self._trace.frame("RECIBIDO", data)
 
-                            if response:
-                                if self.frame_callback:
-                                    self.frame_callback("ENVIADO", response)
-                                self.client_socket.send(response)
+                    response = self.process_request(data)
 
-                        except socket.timeout:
-                            continue
-                        except Exception as e:
-                            self._log(f"Error en comunicación: {e}")
-                            break
+                    if response:
+                        self._trace.frame("ENVIADO", response)
+                        if not state.output:
+                            state.stalled_since = time.monotonic()
+                        state.output += response
 
-                    self.client_socket.close()
-                    self._log(f"Conexión cerrada con {addr}")
+                if framer.errors:
+                    self._trace.warning("Flujo MBAP inválido, %s bytes descartados", framer.discarded_bytes)
+                    framer.errors = 0
 
-                except socket.timeout:
-                    continue
-                except Exception as e:
-                    self._log(f"Error al aceptar conexión: {e}")
+                if state.output:
+                    self._flush_client(client, state)
+
+            self._update_interest(selector, client, state)
 
         except Exception as e:
-            self._log(f"Error al iniciar servidor: {e}")
-        finally:
-            if self.server_socket:
-                self.server_socket.close()
+            self._trace.error("Error en comunicación: %s", e)
+            self._close_client(selector, client)
+
+    def _flush_client(self, client, state):
+        """Enviar lo que acepte el socket sin bloquear; el resto queda en el buffer del cliente"""
+        try:
+            sent = client.send(state.output)
+        except BlockingIOError:
+            return
+        if sent:
+            del state.output[:sent]
+            state.stalled_since = time.monotonic()
+
+    def _update_interest(self, selector, client, state):
+        """Esperar EVENT_WRITE mientras haya respuestas pendientes.
+
+        Con demasiado pendiente se deja de leer al cliente hasta que consuma
+        sus respuestas, así su buffer de salida no crece sin límite.
+        """
+        events = 0
+        if len(state.output) < self.MAX_PENDING_OUTPUT:
+            events |= selectors.EVENT_READ
+        if state.output:
+            events |= selectors.EVENT_WRITE
+        if events != state.events:
+            state.events = events
+            selector.modify(client, events, state)
+
+    def _close_stalled_clients(self, selector):
+        """Cerrar los clientes que no aceptan respuestas desde hace más de self.timeout"""
+        now = time.monotonic()
+        for key in list(selector.get_map().values()):
+            state = key.data
+            if isinstance(state, _ClientState) and state.output and now - state.stalled_since > self.timeout:
+                self._trace.warning("Cliente %s no lee sus respuestas (%s bytes pendientes), se cierra",
+                                    self.clients.get(key.fileobj), len(state.output))
+                self._close_client(selector, key.fileobj)
+
+    def _close_client(self, selector, client):
+        """Cerrar la conexión con un cliente"""
+        addr = self.clients.pop(client, None)
+        try:
+            selector.unregister(client)
+        except Exception:
+            pass
+        client.close()
+        if client is self.client_socket:
+            self.client_socket = None
+        self._trace.info("Conexión cerrada con %s", addr)
 
     def process_request(self, data):
         """Procesar petición Modbus - IMPLEMENTACIÓN COMPLETA"""
         try:
             if len(data) < 8:
-                self._log(f"Trama demasiado corta: {len(data)} bytes")
+                self._trace.warning("Trama demasiado corta: %s bytes", len(data))
                 return b""
 
             # Extraer campos de la trama Modbus TCP
@@ -136,67 +269,72 @@ class ModbusSlaveTCP:
             unit_id = data[6]
             function_code = data[7]
 
-            self._log(f"Función: {function_code} (0x{function_code:02x}), Unit ID: {unit_id}")
+            self._trace.debug("Función: %s (0x%02x), Unit ID: %s", function_code, function_code, unit_id)
 
             # Verificar protocol ID (debe ser 0 para Modbus)
             if protocol_id != 0:
-                self._log(f"Protocol ID incorrecto: {protocol_id}")
+                self._trace.warning("Protocol ID incorrecto: %s", protocol_id)
                 return b""
 
             # Verificar longitud
             if length != len(data) - 6:
-                self._log(f"Longitud incorrecta: indicado {length}, real {len(data) - 6}")
+                self._trace.warning("Longitud incorrecta: indicado %s, real %s", length, len(data) - 6)
                 return b""
 
             if unit_id != self.slave_id:
-                self._log(f"Unit ID incorrecto: esperado {self.slave_id}, recibido {unit_id}")
+                self._trace.warning("Unit ID incorrecto: esperado %s, recibido %s", self.slave_id, unit_id)
                 return b""
 
-            # Manejar TODAS las funciones Modbus
-            if function_code == 1:  # Read Coils (FC 01)
-                return self.handle_read_coils(data, transaction_id, unit_id)
-            elif function_code == 2:  # Read Discrete Inputs (FC 02)
-                return self.handle_read_discrete_inputs(data, transaction_id, unit_id)
-            elif function_code == 3:  # Read Holding Registers (FC 03)
-                return self.handle_read_holding_registers(data, transaction_id, unit_id)
-            elif function_code == 4:  # Read Input Registers (FC 04)
-                return self.handle_read_input_registers(data, transaction_id, unit_id)
-            elif function_code == 5:  # Write Single Coil (FC 05)
-                return self.handle_write_single_coil(data, transaction_id, unit_id)
-            elif function_code == 6:  # Write Single Register (FC 06)
-                return self.handle_write_single_register(data, transaction_id, unit_id)
-            elif function_code == 15:  # Write Multiple Coils (FC 15)
-                return self.handle_write_multiple_coils(data, transaction_id, unit_id)
-            elif function_code == 16:  # Write Multiple Registers (FC 16)
-                return self.handle_write_multiple_registers(data, transaction_id, unit_id)
-            else:
-                self._log(f"Función no soportada: {function_code}")
-                return self.create_exception_response(transaction_id, unit_id, function_code, 1)
+            with self.lock:
+                return self._dispatch(data, transaction_id, unit_id, function_code)
 
         except Exception as e:
-            self._log(f"Error al procesar petición: {e}")
+            self._trace.error("Error al procesar petición: %s", e)
             return b""
 
+    def _dispatch(self, data, transaction_id, unit_id, function_code):
+        """Despachar la petición al manejador de su código de función"""
+        # Manejar TODAS las funciones Modbus
+        if function_code == 1:  # Read Coils (FC 01)
+            return self.handle_read_coils(data, transaction_id, unit_id)
+        elif function_code == 2:  # Read Discrete Inputs (FC 02)
+            return self.handle_read_discrete_inputs(data, transaction_id, unit_id)
+        elif function_code == 3:  # Read Holding Registers (FC 03)
+            return self.handle_read_holding_registers(data, transaction_id, unit_id)
+        elif function_code == 4:  # Read Input Registers (FC 04)
+            return self.handle_read_input_registers(data, transaction_id, unit_id)
+        elif function_code == 5:  # Write Single Coil (FC 05)
+            return self.handle_write_single_coil(data, transaction_id, unit_id)
+        elif function_code == 6:  # Write Single Register (FC 06)
+            return self.handle_write_single_register(data, transaction_id, unit_id)
+        elif function_code == 15:  # Write Multiple Coils (FC 15)
+            return self.handle_write_multiple_coils(data, transaction_id, unit_id)
+        elif function_code == 16:  # Write Multiple Registers (FC 16)
+            return self.handle_write_multiple_registers(data, transaction_id, unit_id)
+        else:
+            self._trace.warning("Función no soportada: %s", function_code)
+            return self.create_exception_response(transaction_id, unit_id, function_code, 1)
+
     # === IMPLEMENTACIÓN DE TODAS LAS FUNCIONES MODBUS ===
 
     def handle_read_coils(self, data, transaction_id, unit_id):
         """Manejar lectura de Coils (FC 01)"""
         if len(data) < 12:
-            self._log("Trama demasiado corta para Read Coils")
+            self._trace.warning("Trama demasiado corta para Read Coils")
             return self.create_exception_response(transaction_id, unit_id, 1, 3)
 
         start_address = int.from_bytes(data[8:10], byteorder='big')
         coil_count = int.from_bytes(data[10:12], byteorder='big')
 
-        self._log(f"Read Coils: addr={start_address}, count={coil_count}")
+        self._trace.debug("Read Coils: addr=%s, count=%s", start_address, coil_count)
 
         # Verificar límites
         if start_address < 0 or start_address >= len(self.coils):
-            self._log(f"Dirección de coil fuera de rango: {start_address}")
+            self._trace.warning("Dirección de coil fuera de rango: %s", start_address)
             return self.create_exception_response(transaction_id, unit_id, 1, 2)
 
         if start_address + coil_count > len(self.coils):
-            self._log(f"Conteo de coils excede el rango: {start_address} + {coil_count}")
+            self._trace.warning("Conteo de coils excede el rango: %s + %s", start_address, coil_count)
             return self.create_exception_response(transaction_id, unit_id, 1, 2)
 
         # Construir respuesta
@@ -209,35 +347,28 @@ class ModbusSlaveTCP:
         response.append(1)  # Código de función
         response.append(byte_count)
 
-        # Empaquetar coils en bytes
-        coils_bytes = bytearray(byte_count)
-        for i in range(coil_count):
-            if self.coils[start_address + i]:
-                byte_index = i // 8
-                bit_index = i % 8
-                coils_bytes[byte_index] |= (1 << bit_index)
-
-        response.extend(coils_bytes)
+        # Coils ya empaquetados desde el banco de bits
+        response.extend(self.coils.read_bytes(start_address, coil_count))
         return bytes(response)
 
     def handle_read_discrete_inputs(self, data, transaction_id, unit_id):
         """Manejar lectura de Discrete Inputs (FC 02)"""
         if len(data) < 12:
-            self._log("Trama demasiado corta para Read Discrete Inputs")
+            self._trace.warning("Trama demasiado corta para Read Discrete Inputs")
             return self.create_exception_response(transaction_id, unit_id, 2, 3)
 
         start_address = int.from_bytes(data[8:10], byteorder='big')
         input_count = int.from_bytes(data[10:12], byteorder='big')
 
-        self._log(f"Read Discrete Inputs: addr={start_address}, count={input_count}")
+        self._trace.debug("Read Discrete Inputs: addr=%s, count=%s", start_address, input_count)
 
         # Verificar límites
         if start_address < 0 or start_address >= len(self.discrete_inputs):
-            self._log(f"Dirección de discrete input fuera de rango: {start_address}")
+            self._trace.warning("Dirección de discrete input fuera de rango: %s", start_address)
             return self.create_exception_response(transaction_id, unit_id, 2, 2)
 
         if start_address + input_count > len(self.discrete_inputs):
-            self._log(f"Conteo de discrete inputs excede el rango: {start_address} + {input_count}")
+            self._trace.warning("Conteo de discrete inputs excede el rango: %s + %s", start_address, input_count)
             return self.create_exception_response(transaction_id, unit_id, 2, 2)
 
         # Construir respuesta
@@ -250,35 +381,28 @@ class ModbusSlaveTCP:
         response.append(2)  # Código de función
         response.append(byte_count)
 
-        # Empaquetar inputs en bytes
-        inputs_bytes = bytearray(byte_count)
-        for i in range(input_count):
-            if self.discrete_inputs[start_address + i]:
-                byte_index = i // 8
-                bit_index = i % 8
-                inputs_bytes[byte_index] |= (1 << bit_index)
-
-        response.extend(inputs_bytes)
+        # Inputs ya empaquetados desde el banco de bits
+        response.extend(self.discrete_inputs.read_bytes(start_address, input_count))
         return bytes(response)
 
     def handle_read_holding_registers(self, data, transaction_id, unit_id):
         """Manejar lectura de Holding Registers (FC 03)"""
         if len(data) < 12:
-            self._log("Trama demasiado corta para Read Holding Registers")
+            self._trace.warning("Trama demasiado corta para Read Holding Registers")
             return self.create_exception_response(transaction_id, unit_id, 3, 3)
 
         start_address = int.from_bytes(data[8:10], byteorder='big')
         register_count = int.from_bytes(data[10:12], byteorder='big')
 
-        self._log(f"Read Holding Registers: addr={start_address}, count={register_count}")
+        self._trace.debug("Read Holding Registers: addr=%s, count=%s", start_address, register_count)
 
         # Verificar límites
         if start_address < 0 or start_address >= len(self.holding_registers):
-            self._log(f"Dirección de holding register fuera de rango: {start_address}")
+            self._trace.warning("Dirección de holding register fuera de rango: %s", start_address)
             return self.create_exception_response(transaction_id, unit_id, 3, 2)
 
         if start_address + register_count > len(self.holding_registers):
-            self._log(f"Conteo de holding registers excede el rango: {start_address} + {register_count}")
+            self._trace.warning("Conteo de holding registers excede el rango: %s + %s", start_address, register_count)
             return self.create_exception_response(transaction_id, unit_id, 3, 2)
 
         # Construir respuesta
@@ -291,34 +415,28 @@ class ModbusSlaveTCP:
         response.append(3)  # Código de función
         response.append(byte_count)
 
-        # Agregar valores de los registros
-        values = []
-        for i in range(register_count):
-            value = self.holding_registers[start_address + i]
-            values.append(value)
-            response.extend(value.to_bytes(2, byteorder='big'))
-
-        self._log(f"Valores enviados: {values}")
+        # Agregar valores de los registros (corte del banco ya en big-endian)
+        response.extend(self.holding_registers.read_bytes(start_address, register_count))
         return bytes(response)
 
     def handle_read_input_registers(self, data, transaction_id, unit_id):
         """Manejar lectura de Input Registers (FC 04)"""
         if len(data) < 12:
-            self._log("Trama demasiado corta para Read Input Registers")
+            self._trace.warning("Trama demasiado corta para Read Input Registers")
             return self.create_exception_response(transaction_id, unit_id, 4, 3)
 
         start_address = int.from_bytes(data[8:10], byteorder='big')
         register_count = int.from_bytes(data[10:12], byteorder='big')
 
-        self._log(f"Read Input Registers: addr={start_address}, count={register_count}")
+        self._trace.debug("Read Input Registers: addr=%s, count=%s", start_address, register_count)
 
         # Verificar límites
         if start_address < 0 or start_address >= len(self.input_registers):
-            self._log(f"Dirección de input register fuera de rango: {start_address}")
+            self._trace.warning("Dirección de input register fuera de rango: %s", start_address)
             return self.create_exception_response(transaction_id, unit_id, 4, 2)
 
         if start_address + register_count > len(self.input_registers):
-            self._log(f"Conteo de input registers excede el rango: {start_address} + {register_count}")
+            self._trace.warning("Conteo de input registers excede el rango: %s + %s", start_address, register_count)
             return self.create_exception_response(transaction_id, unit_id, 4, 2)
 
         # Construir respuesta
@@ -331,36 +449,30 @@ class ModbusSlaveTCP:
         response.append(4)  # Código de función
         response.append(byte_count)
 
-        # Agregar valores de los registros
-        values = []
-        for i in range(register_count):
-            value = self.input_registers[start_address + i]
-            values.append(value)
-            response.extend(value.to_bytes(2, byteorder='big'))
-
-        self._log(f"Valores enviados: {values}")
+        # Agregar valores de los registros (corte del banco ya en big-endian)
+        response.extend(self.input_registers.read_bytes(start_address, register_count))
         return bytes(response)
 
     def handle_write_single_coil(self, data, transaction_id, unit_id):
         """Manejar escritura de Single Coil (FC 05)"""
         if len(data) < 12:
-            self._log("Trama demasiado corta para Write Single Coil")
+            self._trace.warning("Trama demasiado corta para Write Single Coil")
             return self.create_exception_response(transaction_id, unit_id, 5, 3)
 
         address = int.from_bytes(data[8:10], byteorder='big')
         value = int.from_bytes(data[10:12], byteorder='big')
 
         coil_state = (value == 0xFF00)
-        self._log(f"Write Single Coil: addr={address}, value={coil_state}")
+        self._trace.debug("Write Single Coil: addr=%s, value=%s", address, coil_state)
 
         # Verificar límites
         if address < 0 or address >= len(self.coils):
-            self._log(f"Dirección de coil fuera de rango: {address}")
+            self._trace.warning("Dirección de coil fuera de rango: %s", address)
             return self.create_exception_response(transaction_id, unit_id, 5, 2)
 
         # Escribir valor
         self.coils[address] = coil_state
-        self._log(f"Coil en dirección {address} establecido a {coil_state}")
+        self._trace.debug("Coil en dirección %s establecido a %s", address, coil_state)
 
         # Construir respuesta (eco de la petición)
         response = bytearray(data)
@@ -369,22 +481,22 @@ class ModbusSlaveTCP:
     def handle_write_single_register(self, data, transaction_id, unit_id):
         """Manejar escritura de Single Register (FC 06)"""
         if len(data) < 12:
-            self._log("Trama demasiado corta para Write Single Register")
+            self._trace.warning("Trama demasiado corta para Write Single Register")
             return self.create_exception_response(transaction_id, unit_id, 6, 3)
 
         address = int.from_bytes(data[8:10], byteorder='big')
         value = int.from_bytes(data[10:12], byteorder='big')
 
-        self._log(f"Write Single Register: addr={address}, value={value}")
+        self._trace.debug("Write Single Register: addr=%s, value=%s", address, value)
 
         # Verificar límites
         if address < 0 or address >= len(self.holding_registers):
-            self._log(f"Dirección de holding register fuera de rango: {address}")
+            self._trace.warning("Dirección de holding register fuera de rango: %s", address)
             return self.create_exception_response(transaction_id, unit_id, 6, 2)
 
         # Escribir valor
         self.holding_registers[address] = value
-        self._log(f"Holding register en dirección {address} establecido a {value}")
+        self._trace.debug("Holding register en dirección %s establecido a %s", address, value)
 
         # Construir respuesta (eco de la petición)
         response = bytearray(data)
@@ -393,7 +505,7 @@ class ModbusSlaveTCP:
     def handle_write_multiple_coils(self, data, transaction_id, unit_id):
         """Manejar escritura de Multiple Coils (FC 15)"""
         if len(data) < 13:
-            self._log("Trama demasiado corta para Write Multiple Coils")
+            self._trace.warning("Trama demasiado corta para Write Multiple Coils")
             return self.create_exception_response(transaction_id, unit_id, 15, 3)
 
         address = int.from_bytes(data[8:10], byteorder='big')
@@ -402,29 +514,28 @@ class ModbusSlaveTCP:
 
         # Verificar que la trama tenga suficientes datos
         if len(data) < 13 + byte_count:
-            self._log("Trama incompleta para Write Multiple Coils")
+            self._trace.warning("Trama incompleta para Write Multiple Coils")
             return self.create_exception_response(transaction_id, unit_id, 15, 3)
 
-        self._log(f"Write Multiple Coils: addr={address}, count={coil_count}")
+        self._trace.debug("Write Multiple Coils: addr=%s, count=%s", address, coil_count)
 
         # Verificar límites
         if address < 0 or address >= len(self.coils):
-            self._log(f"Dirección de coil fuera de rango: {address}")
+            self._trace.warning("Dirección de coil fuera de rango: %s", address)
             return self.create_exception_response(transaction_id, unit_id, 15, 2)
 
         if address + coil_count > len(self.coils):
-            self._log(f"Conteo de coils excede el rango: {address} + {coil_count}")
+            self._trace.warning("Conteo de coils excede el rango: %s + %s", address, coil_count)
             return self.create_exception_response(transaction_id, unit_id, 15, 2)
 
-        # Extraer y escribir valores de coils
-        for i in range(coil_count):
-            byte_index = i // 8
-            bit_index = i % 8
-            byte_value = data[13 + byte_index]
-            coil_state = bool(byte_value & (1 << bit_index))
-            self.coils[address + i] = coil_state
+        if byte_count != (coil_count + 7) // 8:
+            self._trace.warning("Byte count incorrecto: %s para %s coils", byte_count, coil_count)
+            return self.create_exception_response(transaction_id, unit_id, 15, 3)
+
+        # Escribir los coils directamente desde los bytes de la trama
+        self.coils.write_bytes(address, data[13:13 + byte_count], coil_count)
 
-        self._log(f"{coil_count} coils escritos desde dirección {address}")
+        self._trace.debug("%s coils escritos desde dirección %s", coil_count, address)
 
         # Construir respuesta
         response = bytearray()
@@ -441,7 +552,7 @@ class ModbusSlaveTCP:
     def handle_write_multiple_registers(self, data, transaction_id, unit_id):
         """Manejar escritura de Multiple Registers (FC 16)"""
         if len(data) < 13:
-            self._log("Trama demasiado corta para Write Multiple Registers")
+            self._trace.warning("Trama demasiado corta para Write Multiple Registers")
             return self.create_exception_response(transaction_id, unit_id, 16, 3)
 
         address = int.from_bytes(data[8:10], byteorder='big')
@@ -450,28 +561,28 @@ class ModbusSlaveTCP:
 
         # Verificar que la trama tenga suficientes datos
         if len(data) < 13 + byte_count:
-            self._log("Trama incompleta para Write Multiple Registers")
+            self._trace.warning("Trama incompleta para Write Multiple Registers")
             return self.create_exception_response(transaction_id, unit_id, 16, 3)
 
-        self._log(f"Write Multiple Registers: addr={address}, count={register_count}")
+        self._trace.debug("Write Multiple Registers: addr=%s, count=%s", address, register_count)
 
         # Verificar límites
         if address < 0 or address >= len(self.holding_registers):
-            self._log(f"Dirección de holding register fuera de rango: {address}")
+            self._trace.warning("Dirección de holding register fuera de rango: %s", address)
             return self.create_exception_response(transaction_id, unit_id, 16, 2)
 
         if address + register_count > len(self.holding_registers):
-            self._log(f"Conteo de holding registers excede el rango: {address} + {register_count}")
+            self._trace.warning("Conteo de holding registers excede el rango: %s + %s", address, register_count)
             return self.create_exception_response(transaction_id, unit_id, 16, 2)
 
-        # Extraer y escribir valores de registros
-        values = []
-        for i in range(register_count):
-            value = int.from_bytes(data[13 + i*2:15 + i*2], byteorder='big')
-            self.holding_registers[address + i] = value
-            values.append(value)
+        if byte_count != register_count * 2:
+            self._trace.warning("Byte count incorrecto: %s para %s registros", byte_count, register_count)
+            return self.create_exception_response(transaction_id, unit_id, 16, 3)
+
+        # Escribir los registros directamente desde los bytes de la trama
+        self.holding_registers.write_bytes(address, data[13:13 + byte_count])
 
-        self._log(f"{register_count} holding registers escritos desde dirección {address}: {values}")
+        self._trace.debug("%s holding registers escritos desde dirección %s", register_count, address)
 
         # Construir respuesta
         response = bytearray()
@@ -495,14 +606,16 @@ class ModbusSlaveTCP:
         response.append(function_code | 0x80)  # Function code con bit de excepción
         response.append(exception_code)
 
-        self._log(f"Excepción: función={function_code}, código={exception_code}")
+        self._trace.warning("Excepción: función=%s, código=%s", function_code, exception_code)
         return bytes(response)
 
     def stop(self):
         """Detener servidor"""
         self.running = False
-        if self.client_socket:
-            self.client_socket.close()
-        if self.server_socket:
-            self.server_socket.close()
-        self._log("Servidor detenido")
\ No newline at end of file
+        # El bucle del selector cierra clientes y socket de escucha al salir
+        if self._wakeup_writer:
+            try:
+                self._wakeup_writer.send(b"\x00")
+            except OSError:
+                pass
+        self._trace.info("Servidor detenido")
\ No newline at end of file
@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+"""
+Trazas de Modbus - Implementación limpia para ComSuite
+Sustituye el patrón log_callback/frame_callback + print de masters y slaves:
+- cada componente tiene un Tracer con nivel; un nivel desactivado cuesta una
+  comparación y no formatea nada
+- los eventos activos se guardan sin formatear en un anillo acotado compartido
+- el formateo y la entrega a callbacks, listeners y logging ocurren en un hilo
+  de fondo, fuera del camino de las peticiones
+"""
+
+import logging
+import queue
+import threading
+import time
+from collections import deque
+from typing import NamedTuple, Optional
+
+# Mismos valores numéricos que el módulo logging
+DEBUG = logging.DEBUG
+INFO = logging.INFO
+WARNING = logging.WARNING
+ERROR = logging.ERROR
+
+LEVELS = {
+    'DEBUG': DEBUG,
+    'INFO': INFO,
+    'WARNING': WARNING,
+    'ERROR': ERROR,
+}
+
+# Nivel por defecto: el detalle por petición (DEBUG) queda desactivado
+DEFAULT_LEVEL = INFO
+
+# Eventos recientes que conserva el anillo en memoria
+DEFAULT_CAPACITY = 10000
+
+_STOP = object()
+
+# Argumentos que se copian al emitir: el texto se arma más tarde en otro hilo
+_MUTABLE_BUFFERS = (bytearray, memoryview)
+
+
+def parse_level(level):
+    """Nivel numérico desde un número o un nombre ('DEBUG', 'info', ...)"""
+    if isinstance(level, str):
+        try:
+            return LEVELS[level.upper()]
+        except KeyError:
+            raise ValueError(f"Nivel de traza desconocido: {level}")
+    return int(level)
+
+
+def _render(value):
+    """Representación diferida de un argumento: los bytes se muestran en hexadecimal"""
+    if isinstance(value, bytes):
+        return value.hex()
+    return value
+
+
+class TraceEvent(NamedTuple):
+    """Evento de traza; el texto se formatea solo cuando alguien lo pide"""
+    timestamp: float
+    level: int
+    source: str
+    message: str
+    args: tuple
+    frame: Optional[bytes] = None
+
+    @property
+    def level_name(self):
+        return logging.getLevelName(self.level)
+
+    @property
+    def text(self):
+        """Mensaje formateado con su origen, como lo entregaba _log()"""
+        if self.frame is not None:
+            return f"{self.source}: {self.message}: {self.frame.hex()}"
+        if self.args:
+            return f"{self.source}: " + self.message % tuple(map(_render, self.args))
+        return f"{self.source}: {self.message}"
+
+
+class TraceHub:
+    """Anillo de eventos recientes y hilo de fondo que formatea y entrega las trazas"""
+
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        self._ring = deque(maxlen=capacity)
+        self._queue = queue.SimpleQueue()
+        self._listeners = []
+        self._thread = None
+        self._thread_lock = threading.Lock()
+        self.logger = logging.getLogger('protocols.modbus')
+        # Sin callback propio, los eventos de un tracer van al módulo logging
+        self.forward_to_logging = True
+
+    @property
+    def capacity(self):
+        return self._ring.maxlen
+
+    def add_listener(self, listener):
+        """Recibir cada TraceEvent (desde el hilo de fondo)"""
+        if listener not in self._listeners:
+            self._listeners = self._listeners + [listener]
+
+    def remove_listener(self, listener):
+        """Dejar de recibir eventos"""
+        self._listeners = [item for item in self._listeners if item is not listener]
+
+    def has_listeners(self):
+        return bool(self._listeners)
+
+    def record(self, tracer, event, deliver, keep=True):
+        """Guardar un evento en el anillo y, si alguien lo espera, encolarlo para entrega"""
+        if keep:
+            self._ring.append(event)
+        if deliver or self._listeners:
+            self._queue.put((tracer, event, keep))
+            if self._thread is None:
+                self._start()
+
+    def recent(self, count=None, level=DEBUG, source=None):
+        """Últimos eventos del anillo (más antiguo primero), filtrados por nivel y origen"""
+        events = [TraceEvent._make(item) for item in list(self._ring)
+                  if item[1] >= level and (source is None or item[2] == source)]
+        return events[-count:] if count else events
+
+    def clear(self):
+        """Vaciar el anillo"""
+        self._ring.clear()
+
+    def flush(self, timeout=1.0):
+        """Esperar a que el hilo de fondo entregue los eventos encolados"""
+        if self._thread is None:
+            return True
+        done = threading.Event()
+        self._queue.put((None, done, False))
+        return done.wait(timeout)
+
+    def _start(self):
+        with self._thread_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='modbus-trace', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        """Formatear y entregar eventos fuera del hilo que los generó"""
+        while True:
+            tracer, event, logged = self._queue.get()
+            if tracer is None:
+                if event is _STOP:
+                    break
+                event.set()  # Marca de flush()
+                continue
+            try:
+                self._deliver(tracer, TraceEvent._make(event), logged)
+            except Exception as e:
+                self.logger.error(f"Error entregando traza: {e}")
+
+    def _deliver(self, tracer, event, logged):
+        if event.frame is not None:
+            for sink in tracer.frame_sinks:
+                sink(event.message, event.frame)
+        # Las tramas también se registran como texto si DEBUG estaba activo al emitirlas
+        if logged:
+            if tracer.log_sink is not None:
+                tracer.log_sink(event.text)
+            elif self.forward_to_logging:
+                self.logger.log(event.level, event.text)
+        if logged:
+            for listener in self._listeners:
+                listener(event)
+
+    def stop(self):
+        """Detener el hilo de fondo tras entregar lo pendiente"""
+        with self._thread_lock:
+            if self._thread is None:
+                return
+            self._queue.put((None, _STOP, False))
+            self._thread.join(timeout=2.0)
+            self._thread = None
+
+
+_default_hub = None
+_default_hub_lock = threading.Lock()
+
+
+def get_default_hub():
+    """Concentrador de trazas compartido por todos los componentes Modbus"""
+    global _default_hub
+    with _default_hub_lock:
+        if _default_hub is None:
+            _default_hub = TraceHub()
+        return _default_hub
+
+
+class Tracer:
+    """
+    Trazas de un componente (master, slave, bus...).
+    Los mensajes usan formato % con argumentos diferidos: con el nivel
+    desactivado no se construye ningún texto.
+    """
+
+    __slots__ = ('source', 'level', 'hub', 'log_sink', 'frame_sinks', 'capture', 'capture_device')
+
+    def __init__(self, source, level=DEFAULT_LEVEL, hub=None):
+        self.source = source
+        self.level = parse_level(level)
+        self.hub = hub or get_default_hub()
+        self.log_sink = None
+        self.frame_sinks = ()
+        self.capture = None
+        self.capture_device = None
+
+    def set_level(self, level):
+        """Cambiar el nivel mínimo registrado"""
+        self.level = parse_level(level)
+
+    def is_enabled(self, level):
+        return level >= self.level
+
+    def set_log_sink(self, callback):
+        """Entregar los mensajes formateados a callback (o None para volver a logging)"""
+        self.log_sink = callback
+
+    def set_frame_sink(self, callback):
+        """Entregar las tramas (dirección, bytes) a callback, o None para dejar de hacerlo"""
+        self.frame_sinks = (callback,) if callback else ()
+
+    def set_capture(self, writer, device):
+        """Grabar cada trama en un CaptureWriter (en el hilo que la envía), o None para dejar de hacerlo"""
+        self.capture_device = writer.device_id(device) if writer is not None else None
+        self.capture = writer
+
+    def debug(self, message, *args):
+        if self.level <= DEBUG:
+            self._emit(DEBUG, message, args)
+
+    def info(self, message, *args):
+        if self.level <= INFO:
+            self._emit(INFO, message, args)
+
+    def warning(self, message, *args):
+        if self.level <= WARNING:
+            self._emit(WARNING, message, args)
+
+    def error(self, message, *args):
+        if self.level <= ERROR:
+            self._emit(ERROR, message, args)
+
+    def frame(self, direction, data):
+        """Trama enviada o recibida; con DEBUG desactivado solo llega a la captura y los frame sinks"""
+        capture = self.capture
+        if capture is not None:
+            capture.write(self.capture_device, direction, data)
+        sinks = self.frame_sinks
+        if self.level > DEBUG and not sinks:
+            return
+        enabled = self.level <= DEBUG
+        event = (time.time(), DEBUG, self.source, direction, (), bytes(data))
+        deliver = bool(sinks) or (enabled and (self.log_sink is not None or self.hub.forward_to_logging))
+        self.hub.record(self, event, deliver, keep=enabled)
+
+    def _emit(self, level, message, args):
+        for arg in args:
+            if isinstance(arg, _MUTABLE_BUFFERS):
+                args = tuple(bytes(item) if isinstance(item, _MUTABLE_BUFFERS) else item for item in args)
+                break
+        event = (time.time(), level, self.source, message, args, None)
+        self.hub.record(self, event, self.log_sink is not None or self.hub.forward_to_logging)
+
+
+# Tracer que no registra nada, para componentes creados sin uno
+NULL_TRACER = Tracer('', level=ERROR + 10)
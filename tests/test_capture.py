@@ -0,0 +1,42 @@
+import time
+
+from src.protocols.modbus import capture
+from src.protocols.modbus.capture import CaptureReader, CaptureWriter
+
+CHUNK = 64 * 1024
+
+
+def test_write_and_read_back(tmp_path):
+    path = str(tmp_path / 'a.cap')
+    with CaptureWriter(path, chunk_size=CHUNK) as writer:
+        for index in range(10):
+            writer.write('plc1' if index % 2 else 'plc2', 'ENVIADO', bytes([index]) * 8)
+    with CaptureReader(path) as reader:
+        assert len(reader) == 10
+        assert [record.data[0] for record in reader.read(device='plc1')] == [1, 3, 5, 7, 9]
+        assert all(record.direction == 'ENVIADO' for record in reader)
+
+
+def test_resume_after_reboot_keeps_timestamps_increasing(tmp_path, monkeypatch):
+    path = str(tmp_path / 'reboot.cap')
+    # Primera sesión: el reloj monotónico del equipo iba muy adelantado
+    before_reboot = time.monotonic_ns() + 10 ** 15
+    monkeypatch.setattr(capture.time, 'monotonic_ns', lambda: before_reboot)
+    with CaptureWriter(path, chunk_size=CHUNK) as writer:
+        writer.write('plc', 'ENVIADO', b'\x01' * 8)
+    monkeypatch.undo()
+
+    # Tras el reinicio el reloj monotónico vuelve a empezar más abajo
+    with CaptureWriter(path, chunk_size=CHUNK) as writer:
+        for _ in range(3):
+            writer.write('plc', 'RECIBIDO', b'\x02' * 8)
+
+    with CaptureReader(path) as reader:
+        records = list(reader)
+        stamps = [record.timestamp for record in records]
+        assert len(records) == 4
+        assert stamps == sorted(stamps)
+        assert abs(reader.wall_time(stamps[-1]) - time.time()) < 5
+        # La búsqueda por tiempo sigue encontrando los registros anexados
+        assert len(list(reader.read(start=stamps[1]))) == 3
+        assert len(list(reader.read(end=stamps[1]))) == 1
@@ -0,0 +1,77 @@
+import socket
+import threading
+import time
+
+import pytest
+
+from src.protocols.modbus.connection_registry import ConnectionRegistry
+from src.protocols.modbus.slave_tcp import ModbusSlaveTCP
+from src.protocols.modbus.tracing import get_default_hub
+
+
+@pytest.fixture
+def slave():
+    with socket.socket() as probe:
+        probe.bind(('127.0.0.1', 0))
+        port = probe.getsockname()[1]
+    server = ModbusSlaveTCP('127.0.0.1', port, slave_id=1)
+    server.set_log_callback(lambda message: None)
+    thread = threading.Thread(target=server.start, daemon=True)
+    thread.start()
+    deadline = time.monotonic() + 2.0
+    while not server.running and time.monotonic() < deadline:
+        time.sleep(0.01)
+    yield server
+    server.stop()
+    thread.join(timeout=2.0)
+
+
+def test_frames_reach_only_the_unit_that_sent_them(slave):
+    registry = ConnectionRegistry()
+    first = registry.acquire('127.0.0.1', slave.port, unit_id=1)
+    second = registry.acquire('127.0.0.1', slave.port, unit_id=2)
+    frames = {1: [], 2: []}
+    logs = {1: [], 2: []}
+    for unit in (first, second):
+        unit.set_frame_callback(lambda direction, data, unit_id=unit.slave_id: frames[unit_id].append(data[6]))
+        unit.set_log_callback(logs[unit.slave_id].append)
+
+    assert first.connect()
+    assert first.read_holding_registers(0, 2) is not None
+    get_default_hub().flush()
+
+    assert frames[1] == [1, 1]
+    assert frames[2] == []
+    # Los mensajes de la conexión llegan a todos sus dispositivos
+    assert logs[1] and logs[1] == logs[2]
+
+    second.disconnect()
+    first.read_holding_registers(0, 2)
+    get_default_hub().flush()
+    assert frames[1] == [1, 1, 1, 1]
+    first.disconnect()
+
+
+def test_callbacks_follow_the_unit_after_reconnect(slave):
+    registry = ConnectionRegistry()
+    unit = registry.acquire('127.0.0.1', slave.port, unit_id=1)
+    frames = []
+    unit.set_frame_callback(lambda direction, data: frames.append(direction))
+    assert unit.connect()
+    unit.disconnect()
+
+    assert unit.connect()
+    unit.read_holding_registers(0, 1)
+    get_default_hub().flush()
+    assert len(frames) == 2
+    unit.disconnect()
+
+
+def test_max_in_flight_mismatch_is_rejected():
+    registry = ConnectionRegistry()
+    first = registry.acquire('127.0.0.1', 1502, unit_id=1, max_in_flight=4)
+    assert registry.acquire('127.0.0.1', 1502, unit_id=2, max_in_flight=4) is not None
+    with pytest.raises(ValueError):
+        registry.acquire('127.0.0.1', 1502, unit_id=3, max_in_flight=1)
+    assert registry.acquire('127.0.0.1', 1502, unit_id=3, engine='asyncio', max_in_flight=1) is not None
+    assert first.master.max_in_flight == 4
@@ -0,0 +1,66 @@
+import random
+
+import pytest
+
+from src.protocols.modbus import crc16 as crc_module
+from src.protocols.modbus.crc16 import check_crc, crc16, crc16_bytes
+
+
+def crc16_bitwise(data):
+    """Cálculo bit a bit original de ModbusMasterRTU/ModbusSlaveRTU"""
+    crc = 0xFFFF
+    for byte in data:
+        crc ^= byte
+        for _ in range(8):
+            if crc & 0x0001:
+                crc = (crc >> 1) ^ 0xA001
+            else:
+                crc >>= 1
+    return crc
+
+
+def random_frames(count=500, seed=7):
+    rng = random.Random(seed)
+    return [rng.randbytes(rng.randint(0, 256)) for _ in range(count)]
+
+
+def test_crc16_matches_bitwise_reference():
+    for frame in random_frames():
+        assert crc16(frame) == crc16_bitwise(frame)
+
+
+def test_table_matches_bitwise_reference():
+    for frame in random_frames():
+        assert crc_module._crc16_table(frame) == crc16_bitwise(frame)
+
+
+def test_known_modbus_vector():
+    # Lectura de 10 holding registers del slave 1: CRC C5 CD
+    request = bytes.fromhex('01030000000a')
+    assert crc16(request) == 0xCDC5
+    assert crc16_bytes(request) == bytes.fromhex('c5cd')
+    assert check_crc(request + bytes.fromhex('c5cd'))
+    assert not check_crc(request + bytes.fromhex('c5ce'))
+
+
+def test_incremental_initial_value():
+    rng = random.Random(11)
+    for frame in random_frames(200, seed=3):
+        cut = rng.randint(0, len(frame))
+        assert crc16(frame[cut:], crc16(frame[:cut])) == crc16_bitwise(frame)
+        assert crc_module._crc16_table(frame[cut:], crc_module._crc16_table(frame[:cut])) == crc16_bitwise(frame)
+
+
+def test_accepts_bytearray_and_memoryview():
+    frame = bytes.fromhex('01030000000a')
+    assert crc16(bytearray(frame)) == crc16(memoryview(frame)) == crc16_bitwise(frame)
+
+
+def test_crcmod_path_matches_reference():
+    pytest.importorskip('crcmod._crcfunext', reason="crcmod con extensión en C no instalado")
+    assert crc_module.HAS_C_CRC
+    rng = random.Random(5)
+    for frame in random_frames(200, seed=9):
+        cut = rng.randint(0, len(frame))
+        assert crc_module._crc16_fast(frame) == crc16_bitwise(frame)
+        assert crc_module._crc16_fast(frame[cut:], crc_module._crc16_fast(frame[:cut])) == crc16_bitwise(frame)
@@ -0,0 +1,79 @@
+import numpy as np
+import pytest
+
+from src.core.deadband import ChangeFilter, Deadband, compile_filter, span_of
+from src.core.value_codec import ValueSpec
+
+
+def select(change_filter, values, valid=None):
+    values = np.array(values, dtype=np.float64)
+    valid = np.ones(len(values), dtype=bool) if valid is None else np.array(valid)
+    return change_filter.select(values, valid)
+
+
+def test_first_reading_reports_everything():
+    change_filter = ChangeFilter(['a', 'b'], [Deadband(1.0), None])
+    assert select(change_filter, [1.0, 2.0]) == {'a': 1.0, 'b': 2.0}
+
+
+def test_absolute_deadband_and_slow_drift():
+    change_filter = ChangeFilter(['a'], [Deadband(1.0)])
+    select(change_filter, [10.0])
+    assert select(change_filter, [10.6]) == {}
+    # El último valor reportado no avanza: la deriva acumulada termina reportándose
+    assert select(change_filter, [11.2]) == {'a': 11.2}
+
+
+def test_percent_of_span_and_of_last_value():
+    change_filter = ChangeFilter(['span', 'value'], [Deadband(percent=10), Deadband(percent=10)], [50.0, None])
+    select(change_filter, [100.0, 100.0])
+    # 10 % del rango = 5; 10 % del último valor = 10
+    assert select(change_filter, [106.0, 106.0]) == {'span': 106.0}
+    assert select(change_filter, [106.0, 111.0]) == {'value': 111.0}
+
+
+def test_larger_of_absolute_and_percent():
+    change_filter = ChangeFilter(['a'], [Deadband(absolute=3.0, percent=1)], [100.0])
+    select(change_filter, [0.0])
+    assert select(change_filter, [2.5]) == {}
+    assert select(change_filter, [3.5]) == {'a': 3.5}
+
+
+def test_invalid_reported_once_and_recovery():
+    change_filter = ChangeFilter(['a'], [Deadband(5.0)])
+    select(change_filter, [1.0])
+    assert select(change_filter, [1.0], [False]) == {'a': None}
+    assert select(change_filter, [1.0], [False]) == {}
+    assert select(change_filter, [1.0], [True]) == {'a': 1.0}
+
+
+def test_reset_forces_integrity_report():
+    change_filter = ChangeFilter(['a'], [Deadband(5.0)])
+    select(change_filter, [1.0])
+    change_filter.reset()
+    assert select(change_filter, [1.0]) == {'a': 1.0}
+    assert select(change_filter, [1.0]) == {}
+
+
+def test_filter_mapping_keeps_original_values_and_objects():
+    change_filter = ChangeFilter(['flag', 'level'], [None, Deadband(1.0)])
+    first = change_filter.filter_mapping({'flag': True, 'level': 5, 'block': [1, 2]})
+    assert first == {'flag': True, 'level': 5, 'block': [1, 2]}
+    assert change_filter.filter_mapping({'flag': True, 'level': 5.5, 'block': [1, 2]}) == {}
+    assert change_filter.filter_mapping({'flag': False, 'level': 5.5, 'block': [1, 3]}) == {
+        'flag': False, 'block': [1, 3]}
+
+
+def test_negative_deadband_rejected():
+    with pytest.raises(ValueError):
+        Deadband(-1.0)
+
+
+def test_compile_filter_uses_template_span():
+    specs = {'v': ValueSpec('v', minimum=0.0, maximum=200.0)}
+    assert span_of(specs['v']) == 200.0
+    assert span_of(ValueSpec('w')) is None
+    change_filter = compile_filter(['v'], {'v': Deadband(percent=1)}, specs)
+    select(change_filter, [10.0])
+    assert select(change_filter, [11.5]) == {}
+    assert select(change_filter, [12.5]) == {'v': 12.5}
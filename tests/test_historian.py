@@ -0,0 +1,93 @@
+import csv
+from datetime import datetime
+
+from src.core.historian import Historian
+
+T0 = 1_700_000_000.0
+
+
+def sample_batch():
+    return [('plc1', 'temp', 20.5 + i, T0 + i) for i in range(10)] + \
+           [('plc1', 'pressure', 100 + i, T0 + i + 0.5) for i in range(10)] + \
+           [('plc2', 'temp', bool(i % 2), T0 + i) for i in range(4)]
+
+
+def test_record_batch_persists_across_reopen(tmp_path):
+    path = str(tmp_path / 'history.db')
+    with Historian(path, flush_interval=0.01) as historian:
+        assert historian.record_batch(sample_batch())
+        # Valores no numéricos no se historizan
+        assert historian.record_batch([('plc1', 'raw', [1, 2], T0), ('plc1', 'name', 'x', T0),
+                                       ('plc1', 'temp', None, T0 + 20)])
+        historian.flush()
+        assert historian.get_statistics()['written'] == 24
+        assert historian.get_statistics()['pending'] == 0
+
+    with Historian(path, flush_interval=0.01) as historian:
+        assert historian.query('plc1', 'temp')[:2] == [(T0, 20.5), (T0 + 1, 21.5)]
+        assert historian.query('plc2', 'temp') == [(T0, 0.0), (T0 + 1, 1.0), (T0 + 2, 0.0), (T0 + 3, 1.0)]
+        assert historian.query('plc1', 'raw') == []
+
+        # Un tag nuevo tras reabrir no reutiliza el ID de uno existente
+        historian.record('plc3', 'level', 7.0, T0)
+        historian.flush()
+        assert historian.query('plc3', 'level') == [(T0, 7.0)]
+        assert len(historian.query('plc1', 'pressure')) == 10
+
+
+def test_same_timestamp_replaces_previous_sample(tmp_path):
+    with Historian(str(tmp_path / 'history.db'), flush_interval=0.01) as historian:
+        historian.record('plc1', 'temp', 1.0, T0)
+        historian.flush()
+        historian.record('plc1', 'temp', 2.0, T0)
+        historian.flush()
+        assert historian.query('plc1', 'temp') == [(T0, 2.0)]
+
+
+def test_range_queries(tmp_path):
+    with Historian(str(tmp_path / 'history.db'), flush_interval=0.01) as historian:
+        historian.record_batch(sample_batch())
+        historian.flush()
+
+        # [start, end): el inicio se incluye y el final no
+        assert [ts for ts, _ in historian.query('plc1', 'temp', T0 + 2, T0 + 5)] == [T0 + 2, T0 + 3, T0 + 4]
+        assert historian.query('plc1', 'temp', start=T0 + 9) == [(T0 + 9, 29.5)]
+        assert historian.query('plc1', 'temp', end=T0) == []
+
+        chunks = list(historian.iter_chunks(T0, T0 + 3, tags=[('plc1', 'temp'), ('plc1', 'pressure')],
+                                            chunk_size=4))
+        assert [len(chunk) for chunk in chunks] == [4, 2]
+        rows = [row for chunk in chunks for row in chunk]
+        assert [row[0] for row in rows] == sorted(row[0] for row in rows)
+        assert {row[1:3] for row in rows} == {('plc1', 'temp'), ('plc1', 'pressure')}
+        assert list(historian.iter_chunks(tags=[('otro', 'tag')])) == []
+
+        assert historian.purge_before(T0 + 5) == 14
+        assert historian.query('plc1', 'temp')[0] == (T0 + 5, 25.5)
+
+
+def test_export_csv(tmp_path):
+    path = tmp_path / 'export.csv'
+    with Historian(str(tmp_path / 'history.db'), flush_interval=0.01) as historian:
+        historian.record_batch(sample_batch())
+        historian.flush()
+        count = historian.export_csv(str(path), start=T0, end=T0 + 2, chunk_size=3)
+
+    with open(path, newline='', encoding='utf-8') as f:
+        rows = list(csv.reader(f))
+    assert rows[0] == ['timestamp', 'device_id', 'key', 'value']
+    assert count == len(rows) - 1 == 6
+    assert rows[1] == [datetime.fromtimestamp(T0).isoformat(timespec='microseconds'), 'plc1', 'temp', '20.5']
+    assert [(row[1], row[2]) for row in rows[1:]] == [
+        ('plc1', 'temp'), ('plc2', 'temp'), ('plc1', 'pressure'),
+        ('plc1', 'temp'), ('plc2', 'temp'), ('plc1', 'pressure'),
+    ]
+
+
+def test_record_batch_drops_when_writer_falls_behind(tmp_path):
+    with Historian(str(tmp_path / 'history.db'), max_pending=5, flush_interval=0.01) as historian:
+        assert not historian.record_batch(sample_batch())
+        assert historian.dropped == 24
+        assert historian.record_batch(sample_batch()[:5])
+        historian.flush()
+        assert historian.get_statistics()['written'] == 5
@@ -0,0 +1,67 @@
+import os
+
+import pytest
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+pytest.importorskip('PySide6')
+
+from src.core.log_store import LogStore
+
+
+@pytest.fixture
+def LogListModel(tmp_path, monkeypatch):
+    # El paquete gui carga el gestor de plantillas al importarse y exige su base de datos
+    (tmp_path / 'config').mkdir()
+    (tmp_path / 'config' / 'vfd_templates.db').touch()
+    monkeypatch.chdir(tmp_path)
+    from src.gui.panels.log_viewer import LogListModel
+    return LogListModel
+
+
+class RacingStore(LogStore):
+    """Almacén que recibe una entrada nueva justo antes de cada consulta"""
+
+    racing = True
+
+    def query(self, *args, **kwargs):
+        if self.racing:
+            self.append('INFO', 'llega durante la consulta')
+        return super().query(*args, **kwargs)
+
+
+def test_refresh_does_not_duplicate_entry_appended_during_query(LogListModel):
+    store = RacingStore()
+    model = LogListModel(store)
+    store.racing = False
+    store.append('INFO', 'primera')
+    store.racing = True
+    model.refresh()
+    store.racing = False
+    model.refresh()
+    store.append('INFO', 'tercera')
+    model.refresh()
+    assert model._seqs == [0, 1, 2]
+
+
+def test_set_filter_does_not_duplicate_entry_appended_during_query(LogListModel):
+    store = RacingStore()
+    store.racing = False
+    store.append('INFO', 'primera')
+    model = LogListModel(store)
+    store.racing = True
+    model.set_filter(min_level='INFO')
+    store.racing = False
+    model.refresh()
+    assert model._seqs == [0, 1]
+
+
+def test_refresh_with_filter_skips_excluded_entries_once(LogListModel):
+    store = LogStore()
+    model = LogListModel(store)
+    model.set_filter(device='plc1')
+    store.append('INFO', 'otro', device='plc2')
+    store.append('INFO', 'propio', device='plc1')
+    store.append('INFO', 'otro', device='plc2')
+    assert model.refresh()
+    assert not model.refresh()
+    assert model._seqs == [1]
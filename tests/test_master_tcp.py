@@ -0,0 +1,189 @@
+import socket
+import struct
+import threading
+import time
+
+import pytest
+
+from src.protocols.modbus.master_tcp import ModbusMasterTCP
+
+
+def recv_exactly(conn, size):
+    data = b''
+    while len(data) < size:
+        chunk = conn.recv(size - len(data))
+        if not chunk:
+            return None
+        data += chunk
+    return data
+
+
+def read_adu(conn):
+    """Leer una ADU completa del socket (None si se cerró)"""
+    header = recv_exactly(conn, 7)
+    if header is None:
+        return None
+    rest = recv_exactly(conn, struct.unpack('>H', header[4:6])[0] - 1)
+    return None if rest is None else header + rest
+
+
+def fc03_request(transaction_id, address, count=1, unit_id=1):
+    return struct.pack('>HHHBBHH', transaction_id, 0, 6, unit_id, 3, address, count)
+
+
+def fc03_response(request):
+    """Respuesta FC03 cuyos registros valen la dirección pedida"""
+    transaction_id, _, _, unit_id, _, address, count = struct.unpack('>HHHBBHH', request)
+    body = bytes([3, 2 * count]) + b''.join(struct.pack('>H', address + i) for i in range(count))
+    return struct.pack('>HHHB', transaction_id, 0, len(body) + 1, unit_id) + body
+
+
+class ScriptedSlave:
+    """Slave de prueba: cada conexión aceptada la atiende el siguiente handler"""
+
+    def __init__(self, *handlers):
+        self.handlers = list(handlers)
+        self.server = socket.socket()
+        self.server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.server.bind(('127.0.0.1', 0))
+        self.server.listen(8)
+        self.port = self.server.getsockname()[1]
+        self.connections = 0
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        while self.handlers:
+            try:
+                conn, _ = self.server.accept()
+            except OSError:
+                return
+            self.connections += 1
+            handler = self.handlers.pop(0)
+            threading.Thread(target=self._serve, args=(handler, conn), daemon=True).start()
+
+    @staticmethod
+    def _serve(handler, conn):
+        with conn:
+            try:
+                handler(conn)
+            except OSError:
+                pass
+
+    def close(self):
+        self.server.close()
+
+
+def answer_all(conn):
+    while True:
+        request = read_adu(conn)
+        if request is None:
+            return
+        conn.sendall(fc03_response(request))
+
+
+@pytest.fixture
+def make_master():
+    masters, slaves = [], []
+
+    def make(*handlers, max_in_flight=4, timeout=1.0):
+        slave = ScriptedSlave(*handlers)
+        master = ModbusMasterTCP('127.0.0.1', slave.port, max_in_flight=max_in_flight)
+        master.timeout = timeout
+        masters.append(master)
+        slaves.append(slave)
+        return master
+
+    yield make
+    for master in masters:
+        master.disconnect()
+    for slave in slaves:
+        slave.close()
+
+
+def test_out_of_order_responses_reach_their_transaction(make_master):
+    def reverse_order(conn):
+        requests = [read_adu(conn) for _ in range(4)]
+        for request in reversed(requests):
+            conn.sendall(fc03_response(request))
+        answer_all(conn)
+
+    master = make_master(reverse_order)
+    responses = master.send_requests([fc03_request(10 + i, 100 + i) for i in range(4)])
+    assert [struct.unpack('>H', response[9:11])[0] for response in responses] == [100, 101, 102, 103]
+    assert [struct.unpack('>H', response[0:2])[0] for response in responses] == [10, 11, 12, 13]
+    assert master._pending == {}
+
+
+def test_read_api_in_pipeline_from_many_threads(make_master):
+    master = make_master(answer_all, max_in_flight=8)
+    results = {}
+
+    def worker(address):
+        results[address] = [master.read_holding_registers(address, 2) for _ in range(20)]
+
+    threads = [threading.Thread(target=worker, args=(address,)) for address in range(0, 160, 10)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert all(values == [[address, address + 1]] * 20 for address, values in results.items())
+
+
+def test_timeout_of_one_transaction_does_not_block_the_others(make_master):
+    def drop_address_2(conn):
+        while True:
+            request = read_adu(conn)
+            if request is None:
+                return
+            if struct.unpack('>H', request[8:10])[0] != 2:
+                conn.sendall(fc03_response(request))
+
+    master = make_master(drop_address_2, timeout=0.3)
+    started = time.monotonic()
+    responses = master.send_requests([fc03_request(1 + i, i) for i in range(4)])
+    assert responses[2] is None
+    assert [struct.unpack('>H', responses[i][9:11])[0] for i in (0, 1, 3)] == [0, 1, 3]
+    assert time.monotonic() - started < 1.0
+
+    # El hueco de la transacción vencida se liberó y el socket sigue en uso
+    assert master._pending == {}
+    assert master.read_holding_registers(7, 1) == [7]
+    assert master.connected
+
+
+def test_reconnect_while_requests_are_in_flight(make_master):
+    received = threading.Event()
+
+    def close_without_answering(conn):
+        for _ in range(4):
+            read_adu(conn)
+        received.set()
+
+    master = make_master(close_without_answering, answer_all, timeout=2.0)
+    results = []
+
+    def worker(address):
+        results.append(master.read_holding_registers(address, 1))
+
+    threads = [threading.Thread(target=worker, args=(address,)) for address in range(4)]
+    started = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # El cierre del slave completa las transacciones en vuelo sin esperar el timeout
+    assert received.is_set()
+    assert time.monotonic() - started < 1.0
+    assert results == [[0]] * 4
+    assert not master.connected
+    assert master._pending == {}
+
+    # La siguiente petición abre una conexión nueva con su propio receptor
+    assert master.read_holding_registers(5, 2) == [5, 6]
+    assert master.connected
+    deadline = time.monotonic() + 1.0
+    while master._receiver_thread is None and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert master._receiver_thread is not None and master._receiver_thread.is_alive()
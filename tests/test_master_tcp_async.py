@@ -0,0 +1,69 @@
+import asyncio
+import struct
+
+from src.protocols.modbus.master_tcp_async import AsyncModbusMasterTCP
+
+
+async def _closing_server(delay=0.05):
+    """Servidor que acepta la conexión y la cierra sin responder"""
+    async def handle(reader, writer):
+        await asyncio.sleep(delay)
+        writer.close()
+
+    server = await asyncio.start_server(handle, '127.0.0.1', 0)
+    return server, server.sockets[0].getsockname()[1]
+
+
+async def _echo_server():
+    """Servidor que responde a FC03 con registros a cero"""
+    async def handle(reader, writer):
+        try:
+            while True:
+                header = await reader.readexactly(7)
+                transaction_id, _, length, unit_id = struct.unpack('>HHHB', header)
+                pdu = await reader.readexactly(length - 1)
+                count = struct.unpack('>H', pdu[3:5])[0]
+                body = bytes([pdu[0], 2 * count]) + bytes(2 * count)
+                writer.write(struct.pack('>HHHB', transaction_id, 0, len(body) + 1, unit_id) + body)
+        except asyncio.IncompleteReadError:
+            writer.close()
+
+    server = await asyncio.start_server(handle, '127.0.0.1', 0)
+    return server, server.sockets[0].getsockname()[1]
+
+
+def test_waiting_requests_fail_cleanly_when_server_closes():
+    async def scenario():
+        server, port = await _closing_server()
+        master = AsyncModbusMasterTCP(port=port)
+        master.timeout = 1.0
+        assert await master.connect()
+        results = await asyncio.gather(*(master.read_holding_registers(0, 2) for _ in range(3)))
+        server.close()
+        await server.wait_closed()
+        return master, results
+
+    master, results = asyncio.run(scenario())
+    assert results == [[0, 0]] * 3
+    assert not master.connected
+
+
+def test_late_connection_lost_does_not_drop_new_connection():
+    async def scenario():
+        server, port = await _echo_server()
+        master = AsyncModbusMasterTCP(port=port)
+        assert await master.connect()
+        old_transport = master._transport
+        await master.disconnect()
+        assert await master.connect()
+        master._on_connection_lost(old_transport, None)
+        connected = master.connected
+        values = await master.read_holding_registers(0, 3)
+        await master.disconnect()
+        server.close()
+        await server.wait_closed()
+        return connected, values
+
+    connected, values = asyncio.run(scenario())
+    assert connected
+    assert values == [0, 0, 0]
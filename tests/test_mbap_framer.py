@@ -0,0 +1,58 @@
+import random
+import struct
+
+from src.protocols.modbus.mbap_framer import MBAPFramer
+
+
+def adu(transaction_id, pdu, unit_id=1):
+    return struct.pack('>HHHB', transaction_id, 0, len(pdu) + 1, unit_id) + pdu
+
+
+def test_split_and_coalesced_segments():
+    adus = [adu(i, bytes([3, 2 * (i % 100)]) + bytes(2 * (i % 100))) for i in range(300)]
+    stream = b''.join(adus)
+    framer = MBAPFramer(buffer_size=512)
+    rng = random.Random(4)
+    received = []
+    position = 0
+    while position < len(stream):
+        size = rng.randint(1, 700)
+        framer.feed(stream[position:position + size])
+        position += size
+        received.extend(bytes(frame) for frame in framer.frames())
+    assert received == adus
+    assert framer.pending == 0
+    assert framer.frames_count == len(adus)
+
+
+def test_partial_adu_waits_for_rest():
+    frame = adu(1, bytes([3, 4, 0, 1, 0, 2]))
+    framer = MBAPFramer()
+    framer.feed(frame[:8])
+    assert list(framer.frames()) == []
+    assert framer.pending == 8
+    framer.feed(frame[8:])
+    assert [bytes(item) for item in framer.frames()] == [frame]
+
+
+def test_invalid_header_discards_stream():
+    framer = MBAPFramer()
+    framer.feed(struct.pack('>HHHB', 1, 5, 6, 1) + bytes(5))
+    assert list(framer.frames()) == []
+    assert framer.errors == 1
+    assert framer.pending == 0
+    # Tras descartar, el flujo siguiente se procesa normalmente
+    frame = adu(2, bytes([6, 0, 1, 0, 7]))
+    framer.feed(frame)
+    assert [bytes(item) for item in framer.frames()] == [frame]
+
+
+def test_growing_buffer_while_a_frame_is_held():
+    first = adu(1, bytes([3, 2, 0, 7]))
+    framer = MBAPFramer(buffer_size=0)
+    framer.feed(first)
+    held = next(framer.frames())
+    large = b''.join(adu(2 + i, bytes([3, 250]) + bytes(250)) for i in range(8))
+    framer.feed(large)
+    assert bytes(held) == first
+    assert [bytes(frame) for frame in framer.frames()] == [large[i:i + 259] for i in range(0, len(large), 259)]
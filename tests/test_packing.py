@@ -0,0 +1,58 @@
+import random
+from array import array
+
+from src.protocols.modbus.packing import (
+    empty_registers, pack_bits, pack_registers, unpack_bits, unpack_registers,
+)
+
+
+def pack_bits_reference(values):
+    data = bytearray((len(values) + 7) // 8)
+    for index, value in enumerate(values):
+        if value:
+            data[index // 8] |= 1 << (index % 8)
+    return bytes(data)
+
+
+def test_pack_bits_matches_reference():
+    rng = random.Random(1)
+    for count in list(range(0, 20)) + [2000]:
+        values = [rng.random() < 0.5 for _ in range(count)]
+        assert pack_bits(values) == pack_bits_reference(values)
+
+
+def test_pack_bits_lsb_first():
+    # Ejemplo de la especificación Modbus (FC15): 10 coils 1,0,1,1,0,0,1,1,1,0 -> CD 01
+    assert pack_bits([1, 0, 1, 1, 0, 0, 1, 1, 1, 0]) == bytes([0xCD, 0x01])
+
+
+def test_pack_bits_truthy_values():
+    assert pack_bits([2, 0, 'x', None]) == bytes([0b0101])
+
+
+def test_unpack_bits_roundtrip():
+    rng = random.Random(2)
+    for count in (1, 7, 8, 9, 2000):
+        values = [rng.random() < 0.5 for _ in range(count)]
+        assert unpack_bits(pack_bits(values), count) == values
+
+
+def test_unpack_bits_pads_short_data():
+    assert unpack_bits(b'\x01', 10) == [True] + [False] * 9
+    assert unpack_bits(b'\xff', 0) == []
+
+
+def test_registers_are_big_endian():
+    assert pack_registers([0x1234, 0xABCD]) == bytes.fromhex('1234abcd')
+    assert unpack_registers(bytes.fromhex('1234abcd')) == [0x1234, 0xABCD]
+
+
+def test_unpack_registers_as_array_and_odd_length():
+    registers = unpack_registers(bytes.fromhex('0001000203'), as_array=True)
+    assert isinstance(registers, array)
+    assert registers.tolist() == [1, 2]
+
+
+def test_empty_registers():
+    assert empty_registers(3) == [0, 0, 0]
+    assert empty_registers(2, as_array=True).tolist() == [0, 0]
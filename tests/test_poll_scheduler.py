@@ -0,0 +1,152 @@
+import threading
+import time
+
+import pytest
+
+pytest.importorskip('PySide6')
+
+from PySide6.QtCore import QCoreApplication
+
+from src.core.poll_scheduler import PollScheduler
+
+
+class FakeDevice:
+    """Dispositivo que devuelve la dirección como valor de cada registro"""
+
+    def __init__(self, device_id, registers=None, delay=0.0):
+        self.device_id = device_id
+        self.registers = registers or []
+        self.delay = delay
+        self.reads = []
+        self.lock = threading.Lock()
+
+    def read_plan_blocks(self, plan):
+        if self.delay:
+            time.sleep(self.delay)
+        with self.lock:
+            self.reads.append((time.monotonic(), [(b.start, b.count) for b in plan.blocks]))
+        return [list(range(b.start, b.start + b.count)) for b in plan.blocks]
+
+    def read_plan(self, plan):
+        return plan.demultiplex(self.read_plan_blocks(plan))
+
+
+def tag_keys(scheduler, device_id):
+    return {(key[1], key[2], tag) for key, group in scheduler._groups.items()
+            if key[0] == device_id for tag in group.tags}
+
+
+def test_remove_device_with_owner_keeps_other_consumers_tags():
+    scheduler = PollScheduler()
+    device = FakeDevice('plc1', [{'name': 'a', 'function': '4x', 'address': 0},
+                                 {'name': 'b', 'function': '4x', 'address': 5}])
+    scheduler.add_tag(device, 'historico', 10, scan_class='slow')
+    scheduler.add_device_registers(device, 1.0, owner='monitor')
+    scheduler.add_device_registers(device, 0.5, owner='otro')
+
+    scheduler.remove_device('plc1', 'monitor')
+    assert tag_keys(scheduler, 'plc1') == {(10.0, None, 'historico'), (0.5, 'otro', 'a'), (0.5, 'otro', 'b')}
+    assert 'plc1' in scheduler._device_locks
+
+    scheduler.remove_device('plc1')
+    assert tag_keys(scheduler, 'plc1') == set()
+    assert 'plc1' not in scheduler._device_locks
+
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.005)
+    return condition()
+
+
+def recording(device, order):
+    read = device.read_plan_blocks
+
+    def read_plan_blocks(plan):
+        order.append((device.device_id, time.monotonic()))
+        return read(plan)
+    return read_plan_blocks
+
+
+def test_groups_fire_in_deadline_order():
+    scheduler = PollScheduler(batch_interval=0.02)
+    fast = FakeDevice('fast')
+    slow = FakeDevice('slow')
+    order = []
+    fast.read_plan_blocks = recording(fast, order)
+    slow.read_plan_blocks = recording(slow, order)
+
+    scheduler.add_tag(fast, 'a', 0, scan_class=0.2)
+    scheduler.start()
+    time.sleep(0.07)
+    scheduler.add_tag(slow, 'b', 0, scan_class=0.5)
+    try:
+        assert wait_for(lambda: len(order) >= 7)
+    finally:
+        scheduler.stop()
+
+    assert [device for device, _ in order[:7]] == ['fast', 'slow', 'fast', 'fast', 'slow', 'fast', 'fast']
+    fast_times = [at for device, at in order if device == 'fast']
+    gaps = [b - a for a, b in zip(fast_times, fast_times[1:])]
+    assert all(0.15 < gap < 0.3 for gap in gaps), gaps
+
+
+def test_group_still_polling_is_skipped_not_queued():
+    scheduler = PollScheduler(batch_interval=0.02)
+    device = FakeDevice('plc', delay=0.25)
+    active = []
+    overlaps = []
+    read = device.read_plan_blocks
+
+    def read_plan_blocks(plan):
+        active.append(1)
+        overlaps.append(len(active))
+        try:
+            return read(plan)
+        finally:
+            active.pop()
+
+    device.read_plan_blocks = read_plan_blocks
+    scheduler.add_tag(device, 'a', 0, scan_class=0.05)
+    scheduler.start()
+    time.sleep(0.6)
+    scheduler.stop()
+
+    assert max(overlaps) == 1
+    assert 2 <= len(device.reads) <= 3
+    assert scheduler.get_statistics()['overruns'] >= 5
+
+
+def test_add_and_remove_device_while_running():
+    # results_ready se emite desde el hilo planificador: llega por el event loop
+    app = QCoreApplication.instance() or QCoreApplication([])
+    scheduler = PollScheduler(batch_interval=0.02)
+    batches = []
+    scheduler.results_ready.connect(batches.append)
+    first = FakeDevice('first')
+    second = FakeDevice('second')
+
+    scheduler.add_tag(first, 'a', 3, scan_class=0.05)
+    scheduler.start()
+    try:
+        assert wait_for(lambda: len(first.reads) >= 2)
+
+        # Un dispositivo agregado con el planificador en marcha se lee enseguida
+        added = time.monotonic()
+        scheduler.add_tag(second, 'b', 8, scan_class=10.0)
+        assert wait_for(lambda: second.reads)
+        assert second.reads[0][0] - added < 0.1
+
+        scheduler.remove_device('first')
+        time.sleep(0.05)
+        count = len(first.reads)
+        time.sleep(0.2)
+        assert len(first.reads) == count
+        assert scheduler.get_statistics()['groups'] == 1
+    finally:
+        scheduler.stop()
+    app.processEvents()
+
+    values = {(device_id, key): value for batch in batches for device_id, key, value, _ in batch}
+    assert values == {('first', 'a'): 3, ('second', 'b'): 8}
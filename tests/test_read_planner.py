@@ -0,0 +1,62 @@
+import pytest
+
+from src.protocols.modbus.read_planner import (
+    MAX_READ_COUNT, ReadBlock, plan_reads, plan_register_list,
+)
+
+
+def blocks(plan):
+    return [(block.function_code, block.start, block.count) for block in plan.blocks]
+
+
+def test_merges_addresses_within_gap():
+    plan = plan_reads([0, 1, 5, 20], max_gap=8)
+    assert blocks(plan) == [(3, 0, 6), (3, 20, 1)]
+    assert plan.demux[5] == (0, 5, 1)
+    assert plan.demux[20] == (1, 0, 1)
+
+
+def test_respects_max_count():
+    plan = plan_reads(range(0, 300), 3)
+    assert [block.count for block in plan.blocks] == [125, 125, 50]
+    assert all(block.count <= MAX_READ_COUNT[3] for block in plan.blocks)
+
+
+def test_multi_register_items_stay_in_one_block():
+    plan = plan_reads([('a', 123, 2), ('b', 124, 2), ('c', 126)], 3, max_count=125)
+    for key in 'abc':
+        block_index, offset, size = plan.demux[key]
+        assert offset + size <= plan.blocks[block_index].count
+
+
+def test_item_larger_than_request_is_rejected():
+    with pytest.raises(ValueError):
+        plan_reads([('big', 0, 126)], 3)
+
+
+def test_demultiplex():
+    plan = plan_reads([('a', 10), ('b', 12, 2), ('c', 100)], 3, max_gap=4)
+    assert blocks(plan) == [(3, 10, 4), (3, 100, 1)]
+    results = plan.demultiplex([[1, 2, 3, 4], None])
+    assert results == {'a': 1, 'b': [3, 4], 'c': None}
+
+
+def test_plan_register_list_by_function():
+    registers = [
+        {'function': '4x', 'address': 0},
+        {'function': '3x', 'address': 0},
+        {'function': '4x', 'address': 1},
+        {'function': 'bad', 'address': 0},
+        {'function': 6, 'address': 0},
+    ]
+    plan = plan_register_list(registers)
+    assert sorted(blocks(plan)) == [(3, 0, 2), (4, 0, 1)]
+    assert set(plan.demux) == {0, 1, 2}
+
+
+def test_extend_offsets_block_indexes():
+    plan = plan_reads([('a', 0)], 1)
+    plan.extend(plan_reads([('b', 0)], 2))
+    assert plan.blocks[1] == ReadBlock(2, 0, 1)
+    assert plan.demux['b'] == (1, 0, 1)
+    assert plan.request_count == 2
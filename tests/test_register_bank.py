@@ -0,0 +1,42 @@
+import pytest
+
+from src.protocols.modbus.register_bank import BitBank, RegisterBank
+
+
+def test_register_slices_and_16_bit_wrap():
+    bank = RegisterBank(10)
+    bank[2:5] = [1, 0x1FFFF, 3]
+    assert bank[2:5] == [1, 0xFFFF, 3]
+    bank[0] = -1
+    assert bank[0] == 0xFFFF
+
+
+def test_register_slice_length_mismatch_rejected():
+    bank = RegisterBank(10)
+    with pytest.raises(ValueError):
+        bank[0:3] = [1, 2]
+    with pytest.raises(ValueError):
+        bank[8:10] = [1, 2, 3]
+    assert len(bank) == 10
+
+
+def test_register_bytes_roundtrip_and_bounds():
+    bank = RegisterBank(4)
+    assert bank.write_bytes(1, bytes.fromhex('1234abcd')) == 2
+    assert bank.read_bytes(1, 2) == bytes.fromhex('1234abcd')
+    with pytest.raises(IndexError):
+        bank.write_bytes(3, bytes.fromhex('00010002'))
+    assert len(bank) == 4
+
+
+def test_bit_bank_slices_and_bytes():
+    bank = BitBank(20)
+    bank[3:6] = [True, False, True]
+    assert bank[2:7] == [False, True, False, True, False]
+    assert bank.read_bytes(3, 3) == bytes([0b101])
+    bank.write_bytes(10, bytes([0b11]), 2)
+    assert bank[10] and bank[11] and not bank[12]
+    with pytest.raises(ValueError):
+        bank[0:3] = [True]
+    with pytest.raises(IndexError):
+        bank.write_bytes(19, bytes([0b11]), 2)
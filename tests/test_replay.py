@@ -0,0 +1,18 @@
+from src.protocols.modbus.replay import percentile
+
+
+def test_percentile_nearest_rank():
+    values = list(range(1, 101))
+    assert percentile(values, 0.50) == 50
+    assert percentile(values, 0.90) == 90
+    assert percentile(values, 0.99) == 99
+    assert percentile(values, 1.0) == 100
+    assert percentile(list(range(1, 11)), 0.50) == 5
+    assert percentile(list(range(1, 11)), 0.99) == 10
+
+
+def test_percentile_edges():
+    assert percentile([], 0.5) is None
+    assert percentile([7], 0.0) == 7
+    assert percentile([7], 0.99) == 7
+    assert percentile([1, 2], 0.0) == 1
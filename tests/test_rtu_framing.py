@@ -0,0 +1,146 @@
+import time
+
+from src.protocols.modbus.crc16 import crc16_bytes
+from src.protocols.modbus.rtu_framing import (
+    RTURequestParser, RTUResponseReader, response_frame_length,
+)
+from src.protocols.modbus.rtu_timing import RTUTiming
+
+
+def with_crc(hex_frame):
+    frame = bytes.fromhex(hex_frame)
+    return frame + crc16_bytes(frame)
+
+
+class FakeSerial:
+    """Puerto serie simulado que entrega los bytes en trozos"""
+
+    def __init__(self, data, chunk=None):
+        self.data = bytearray(data)
+        self.chunk = chunk
+        self.timeout = None
+
+    def read(self, size):
+        size = min(size, self.chunk or size)
+        chunk = bytes(self.data[:size])
+        del self.data[:size]
+        return chunk
+
+
+def test_response_frame_length():
+    assert response_frame_length(bytes([1, 3, 4])) == 9
+    assert response_frame_length(bytes([1, 0x83, 2])) == 5
+    assert response_frame_length(bytes([1, 16, 0])) == 8
+    assert response_frame_length(bytes([1, 43, 0])) is None
+
+
+def test_reader_reads_exact_response():
+    response = with_crc('0103040001000a')
+    port = FakeSerial(response + b'\xAA', chunk=2)
+    frame = RTUResponseReader(port).read_response(1, 3, len(response), deadline=float('inf'))
+    assert frame == response
+    assert port.data == b'\xAA'
+
+
+def test_reader_resynchronizes_after_noise():
+    response = with_crc('0103020007')
+    reader = RTUResponseReader(FakeSerial(b'\x00\x01\x03\xff' + response))
+    assert reader.read_response(1, 3, len(response), deadline=float('inf')) == response
+    assert reader.discarded_bytes == 4
+
+
+def test_reader_returns_exception_response():
+    response = with_crc('018302')
+    reader = RTUResponseReader(FakeSerial(response))
+    assert reader.read_response(1, 3, 9, deadline=float('inf')) == response
+
+
+def test_reader_timeout_returns_none():
+    reader = RTUResponseReader(FakeSerial(with_crc('0103020007')[:4]))
+    assert reader.read_response(1, 3, 7, deadline=float('inf')) is None
+
+
+def make_parser(unit_id=1):
+    return RTURequestParser(unit_id, RTUTiming(9600))
+
+
+def test_parser_splits_back_to_back_requests():
+    parser = make_parser()
+    read = with_crc('010300000002')
+    write = with_crc('011000010002040001000a')
+    stream = read + write
+    for index in range(0, len(stream), 3):
+        parser.feed(stream[index:index + 3], now=0.0)
+    assert list(parser.frames(now=0.0)) == [read, write]
+    assert parser.pending == 0
+
+
+def test_parser_skips_foreign_frames():
+    parser = make_parser()
+    foreign_request = with_crc('020300000002')
+    foreign_response = with_crc('02030400010002')
+    own = with_crc('010300050001')
+    parser.feed(foreign_request + foreign_response + own, now=0.0)
+    assert list(parser.frames(now=0.0)) == [own]
+    assert parser.foreign_frames == 2
+
+
+def test_parser_resynchronizes_after_bad_crc():
+    parser = make_parser()
+    good = with_crc('010600010005')
+    corrupt = bytearray(good)
+    corrupt[-1] ^= 0xFF
+    parser.feed(bytes(corrupt) + good, now=0.0)
+    frames = list(parser.frames(now=0.0))
+    # Algún byte del CRC corrupto puede parecer el inicio de una trama más larga:
+    # se espera a más datos o al silencio t3.5, que la descarta sin perder la buena
+    frames += list(parser.frames(now=parser.timing.t3_5 * 2))
+    assert frames == [good]
+    assert parser.discarded_bytes == len(corrupt)
+
+
+def test_parser_silence_discards_partial_frame():
+    parser = make_parser()
+    timing = parser.timing
+    good = with_crc('010300000001')
+    parser.feed(good[:4], now=0.0)
+    parser.feed(good, now=timing.t3_5 * 2)
+    assert list(parser.frames(now=timing.t3_5 * 2)) == [good]
+    assert parser.discarded_bytes == 4
+
+
+class CountingSerial(FakeSerial):
+    """Cuenta las reconfiguraciones del timeout, como tcsetattr en pyserial"""
+
+    def __init__(self, data, chunk=None, timeout=3.0):
+        self.timeout_changes = 0
+        super().__init__(data, chunk)
+        self._timeout = timeout
+        self.timeout_changes = 0
+
+    @property
+    def timeout(self):
+        return self._timeout
+
+    @timeout.setter
+    def timeout(self, value):
+        self._timeout = value
+        self.timeout_changes += 1
+
+
+def test_reader_keeps_port_timeout_within_transaction():
+    response = with_crc('0103040001000a')
+    port = CountingSerial(response * 3, chunk=1, timeout=3.0)
+    for _ in range(3):
+        reader = RTUResponseReader(port)
+        assert reader.read_response(1, 3, len(response), time.monotonic() + 3.0) == response
+    assert port.timeout_changes == 0
+
+
+def test_reader_restores_timeout_lowered_by_previous_transaction():
+    response = with_crc('0103020007')
+    port = CountingSerial(response, timeout=0.5)
+    reader = RTUResponseReader(port)
+    assert reader.read_response(1, 3, len(response), time.monotonic() + 3.0) == response
+    assert port.timeout_changes == 1
+    assert port.timeout > 2.5
@@ -0,0 +1,44 @@
+import os
+
+import pytest
+
+from src.protocols.modbus.serial_bus import SerialBusManager
+
+
+@pytest.fixture
+def pty_port():
+    master_fd, slave_fd = os.openpty()
+    yield os.ttyname(slave_fd)
+    os.close(master_fd)
+    os.close(slave_fd)
+
+
+def test_released_bus_does_not_reopen_the_port(pty_port):
+    manager = SerialBusManager()
+    unit = manager.acquire(pty_port, baudrate=115200, unit_id=1)
+    stale_bus = unit.bus
+    assert unit.connect()
+    assert stale_bus.submit(lambda: 'ok').result(1.0) == 'ok'
+
+    unit.disconnect()
+    assert stale_bus.closed
+    assert manager.get_bus(pty_port) is None
+
+    assert stale_bus.submit(lambda: 'ok').result(1.0) is None
+    assert not stale_bus.start()
+    assert not stale_bus.connected
+    assert stale_bus._thread is None
+
+
+def test_reconnect_after_release_uses_a_new_bus(pty_port):
+    manager = SerialBusManager()
+    unit = manager.acquire(pty_port, baudrate=115200, unit_id=1)
+    assert unit.connect()
+    old_bus = unit.bus
+    unit.disconnect()
+
+    assert unit.connect()
+    assert unit.bus is not old_bus
+    assert manager.get_bus(pty_port) is unit.bus
+    assert unit.bus.submit(lambda: 'ok').result(1.0) == 'ok'
+    unit.disconnect()
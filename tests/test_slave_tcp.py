@@ -0,0 +1,156 @@
+import socket
+import struct
+import threading
+import time
+
+import pytest
+
+from src.protocols.modbus.slave_tcp import ModbusSlaveTCP
+
+
+@pytest.fixture
+def slave():
+    server = ModbusSlaveTCP('127.0.0.1', 0, slave_id=1)
+    server.set_log_callback(lambda message: None)
+    thread = threading.Thread(target=server.start, daemon=True)
+    thread.start()
+    deadline = time.monotonic() + 2.0
+    while not server.running and time.monotonic() < deadline:
+        time.sleep(0.01)
+    server.port = server.server_socket.getsockname()[1]
+    yield server
+    server.stop()
+    thread.join(timeout=2.0)
+
+
+def connect(server, rcvbuf=None):
+    client = socket.socket()
+    if rcvbuf:
+        client.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, rcvbuf)
+    client.settimeout(2.0)
+    client.connect(('127.0.0.1', server.port))
+    return client
+
+
+def fc03_request(transaction_id, address, count):
+    return struct.pack('>HHHBBHH', transaction_id, 0, 6, 1, 3, address, count)
+
+
+def recv_exactly(client, size):
+    data = b''
+    while len(data) < size:
+        chunk = client.recv(size - len(data))
+        assert chunk, "conexión cerrada por el slave"
+        data += chunk
+    return data
+
+
+def read_response(client):
+    header = recv_exactly(client, 7)
+    return header + recv_exactly(client, struct.unpack('>H', header[4:6])[0] - 1)
+
+
+def registers(response):
+    count = response[8] // 2
+    return list(struct.unpack(f'>{count}H', response[9:9 + 2 * count]))
+
+
+def test_concurrent_clients_each_get_their_own_responses(slave):
+    errors = []
+
+    def client_loop(index):
+        try:
+            with connect(slave) as client:
+                for transaction_id in range(50):
+                    client.sendall(fc03_request(transaction_id, index, 2))
+                    response = read_response(client)
+                    assert struct.unpack('>H', response[0:2])[0] == transaction_id
+                    assert registers(response) == [1000 + index * 100, 1100 + index * 100]
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=client_loop, args=(index,)) for index in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+
+
+def test_partial_writes_keep_responses_framed_and_other_clients_served(slave, monkeypatch):
+    # Buffers de envío mínimos en el slave: cada respuesta grande sale por partes
+    accept, flush = slave._accept_client, slave._flush_client
+    partial = []
+
+    def accept_with_small_buffer(selector):
+        accept(selector)
+        for client in slave.clients:
+            client.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, 4096)
+
+    def counting_flush(client, state):
+        flush(client, state)
+        if state.output:
+            partial.append(len(state.output))
+
+    monkeypatch.setattr(slave, '_accept_client', accept_with_small_buffer)
+    monkeypatch.setattr(slave, '_flush_client', counting_flush)
+
+    # Un cliente con buffer de recepción mínimo pide muchas respuestas grandes
+    # y tarda en leerlas
+    slow = connect(slave, rcvbuf=4096)
+    count = 2000
+    sender = threading.Thread(target=slow.sendall,
+                              args=(b''.join(fc03_request(i % 65536, 0, 125) for i in range(count)),))
+    sender.start()
+    time.sleep(0.3)
+
+    with connect(slave) as fast:
+        started = time.monotonic()
+        fast.sendall(fc03_request(1, 0, 1))
+        assert registers(read_response(fast)) == [1000]
+        assert time.monotonic() - started < 0.5
+
+    for transaction_id in range(count):
+        response = read_response(slow)
+        assert struct.unpack('>H', response[0:2])[0] == transaction_id
+        assert len(response) == 9 + 250
+        assert registers(response)[:2] == [1000, 1100]
+    sender.join()
+    slow.close()
+    assert partial
+
+
+def test_client_that_never_reads_is_closed(slave):
+    slave.timeout = 0.3
+    stalled = connect(slave, rcvbuf=4096)
+    # Inundar sin bloquear hasta que el slave deje de leer al cliente
+    stalled.setblocking(False)
+    try:
+        for i in range(20000):
+            stalled.send(fc03_request(i, 0, 125))
+    except BlockingIOError:
+        pass
+    deadline = time.monotonic() + 3.0
+    while slave.clients and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert slave.clients == {}
+    stalled.close()
+
+
+def test_client_disconnecting_mid_frame(slave):
+    request = fc03_request(7, 0, 2)
+    with connect(slave) as client:
+        client.sendall(request[:5])
+    deadline = time.monotonic() + 2.0
+    while slave.clients and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert slave.clients == {}
+
+    # Otro cliente que envía la ADU en trozos recibe su respuesta
+    with connect(slave) as client:
+        for i in range(len(request)):
+            client.sendall(request[i:i + 1])
+            time.sleep(0.005)
+        response = read_response(client)
+    assert struct.unpack('>H', response[0:2])[0] == 7
+    assert registers(response) == [1000, 1100]
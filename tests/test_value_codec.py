@@ -0,0 +1,79 @@
+import struct
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from src.core.value_codec import ValueSpec, compile_codec, specs_from_template
+from src.protocols.modbus.read_planner import plan_reads
+
+
+def make_codec(specs, extra=()):
+    items = [(spec.key, address, spec.size) for spec, address in specs] + list(extra)
+    return compile_codec(plan_reads(items, 3, max_gap=10), [spec for spec, _ in specs])
+
+
+def test_decode_types_scale_and_word_order():
+    bits = struct.unpack('>I', struct.pack('>f', 12.5))[0]
+    specs = [
+        (ValueSpec('u16', 'uint16', scale=0.1), 0),
+        (ValueSpec('i16', 'int16'), 1),
+        (ValueSpec('u32', 'uint32'), 2),
+        (ValueSpec('i32', 'int32', word_order='little'), 4),
+        (ValueSpec('f32', 'float32'), 6),
+    ]
+    codec = make_codec(specs)
+    registers = [1234, 0xFFFE, 0x0001, 0x0002, 0xFFFF, 0xFFFF, bits >> 16, bits & 0xFFFF]
+    values = codec.decode([registers])
+    assert values['u16'] == pytest.approx(123.4)
+    assert values['i16'] == -2
+    assert values['u32'] == 0x00010002
+    assert values['i32'] == -1
+    assert values['f32'] == pytest.approx(12.5)
+
+
+def test_clip_to_range():
+    codec = make_codec([(ValueSpec('v', minimum=0.0, maximum=50.0), 0)])
+    assert codec.decode([[70]]) == {'v': 50.0}
+
+
+def test_failed_block_gives_none_and_raw_keys_pass_through():
+    specs = [(ValueSpec('a'), 0), (ValueSpec('b'), 100)]
+    codec = make_codec(specs, extra=[('raw', 1, 2)])
+    values = codec.decode([[5, 6, 7], None])
+    assert values == {'a': 5.0, 'b': None, 'raw': [6, 7]}
+
+
+def test_decode_batch_matches_decode():
+    specs = [(ValueSpec('a', 'int16', scale=2.0), 0), (ValueSpec('b', 'uint32'), 1)]
+    codec = make_codec(specs)
+    readings = [[[1, 0, 5]], [[0xFFFF, 1, 0]]]
+    matrix, valid = codec.decode_batch(readings)
+    assert valid.all()
+    for row, reading in enumerate(readings):
+        expected = codec.decode(reading)
+        assert dict(zip(codec.keys, matrix[row].tolist())) == expected
+
+
+def test_spec_larger_than_planned_registers():
+    plan = plan_reads([('x', 0)], 3)
+    with pytest.raises(ValueError):
+        compile_codec(plan, [ValueSpec('x', 'float32')])
+
+
+def test_invalid_spec():
+    with pytest.raises(ValueError):
+        ValueSpec('x', 'int64')
+    with pytest.raises(ValueError):
+        ValueSpec('x', word_order='middle')
+
+
+def test_specs_from_template():
+    parametros = [
+        SimpleNamespace(nombre_parametro='vel', rango_min=-100, rango_max=100, factor_escala=0.1),
+        SimpleNamespace(nombre_parametro='frec', rango_min=0, rango_max=0, factor_escala=0),
+    ]
+    vel, frec = specs_from_template(parametros)
+    assert (vel.data_type, vel.minimum, vel.maximum, vel.scale) == ('int16', -100, 100, 0.1)
+    assert (frec.data_type, frec.minimum, frec.maximum, frec.scale) == ('uint16', None, None, 1.0)
+    assert np.isclose(vel.scale, 0.1)